@@ -0,0 +1,250 @@
+"""
+Regression tests for backend/libs/areng_cartoonify/cartoon.py
+
+Run with: python -m unittest discover -s backend/__tests__ -p "test_*.py"
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "libs", "areng_cartoonify"))
+
+try:
+    import cv2
+    import numpy as np
+    import cartoon
+except ImportError:
+    cartoon = None
+
+
+def texture(height, width, seed=1):
+    """Gradients, flat discs and a little noise, like a game texture"""
+    rng = np.random.default_rng(seed)
+    yy, xx = np.mgrid[0:height, 0:width]
+    img = np.stack([xx * 255 // width, yy * 255 // height, (xx + yy) % 256], axis=-1).astype(np.uint8)
+    for _ in range(40):
+        center = (int(rng.integers(0, width)), int(rng.integers(0, height)))
+        color = tuple(int(c) for c in rng.integers(0, 255, 3))
+        cv2.circle(img, center, int(rng.integers(10, 80)), color, -1)
+    return cv2.add(img, rng.integers(0, 20, img.shape, dtype=np.uint8))
+
+
+@unittest.skipIf(cartoon is None, "OpenCV is not installed")
+class TiledTests(unittest.TestCase):
+    def assert_within_rounding(self, a, b):
+        self.assertEqual(a.shape, b.shape)
+        self.assertLessEqual(int(np.abs(a.astype(np.int16) - b).max()), 1)
+
+    def test_tiles_match_whole_image(self):
+        # Tiles narrower than the image plus its halo, so every tile is cropped
+        img = texture(400, 1000)
+        tiled = cartoon.filter_tiled(img, cartoon.cartoonify, cartoon.TILE_HALO, 300)
+        self.assert_within_rounding(tiled, cartoon.cartoonify(img))
+
+    def test_fast_strips_match_whole_image(self):
+        img = texture(400, 1000)
+        budget = 10 * 1024 * 1024
+        self.assertLess(cartoon.strip_rows_for_budget(budget, 1000, 4), 400)
+        tiled = cartoon.cartoonify_tiled(img, budget, fast=True, out=cartoon.disk_array(img, copy=False))
+        self.assertIsInstance(tiled, np.memmap)
+        self.assert_within_rounding(tiled, cartoon.cartoonify(img, fast=True))
+
+    def test_budget_below_minimum_fails(self):
+        img = texture(1200, 1200)
+        for fast in (False, True):
+            with self.assertRaisesRegex(ValueError, "too small"):
+                cartoon.cartoonify_tiled(img, 4 * 1024 * 1024, fast)
+
+    def test_cli_rejects_budget_below_one_tile(self):
+        script = os.path.join(os.path.dirname(cartoon.__file__), "cartoon.py")
+        result = subprocess.run([sys.executable, script, "--max-memory", "94", "missing.png"],
+                                capture_output=True, text=True)
+        self.assertEqual(result.returncode, 2)
+        self.assertIn("at least 95 MB", result.stderr)
+
+    def test_image_written_with_budget_matches(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        input_path = os.path.join(tmp.name, "in.png")
+        cv2.imwrite(input_path, texture(300, 400))
+        outputs = []
+        for max_memory in (None, 64 * 1024 * 1024):
+            output_path = os.path.join(tmp.name, f"out_{max_memory}.png")
+            cartoon.cartoonify_image(input_path, fast=True, output_path=output_path, max_memory=max_memory)
+            outputs.append(cv2.imread(output_path))
+        self.assert_within_rounding(*outputs)
+
+
+@unittest.skipIf(cartoon is None, "OpenCV is not installed")
+class FastModeTests(unittest.TestCase):
+    def test_fast_mode_quality_on_detailed_textures(self):
+        # Lossy on noise and fine detail; guards against it getting worse
+        for height, width, seed in ((300, 400, 1), (512, 512, 2), (400, 1000, 3)):
+            img = texture(height, width, seed)
+            psnr, similarity = cartoon.quality_report(img, cartoon.cartoonify(img, fast=True))
+            self.assertGreaterEqual(psnr, 28.5, (height, width))
+            self.assertGreaterEqual(similarity, 0.965, (height, width))
+
+    def test_smooth_textures_meet_tolerance(self):
+        img = cv2.GaussianBlur(texture(300, 400), (0, 0), 6)
+        quality = cartoon.quality_report(img, cartoon.cartoonify(img, fast=True))
+        self.assertTrue(cartoon.within_tolerance(quality), quality)
+
+    def test_compare_flags_results_below_tolerance(self):
+        self.assertGreaterEqual(cartoon.FAST_MIN_PSNR, 35.0)
+        self.assertGreaterEqual(cartoon.FAST_MIN_SSIM, 0.98)
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        detailed = os.path.join(tmp.name, "detailed.png")
+        smooth = os.path.join(tmp.name, "smooth.png")
+        cv2.imwrite(detailed, texture(200, 200))
+        cv2.imwrite(smooth, cv2.GaussianBlur(texture(200, 200), (0, 0), 6))
+        options = {"fast": True, "compare": True, "output_path": os.path.join(tmp.name, "out.png")}
+        _success, message, _hit = cartoon.process_image(detailed, **options)
+        self.assertIn("below fast mode tolerance", message)
+        _success, message, _hit = cartoon.process_image(smooth, **options)
+        self.assertNotIn("below", message)
+
+
+@unittest.skipIf(cartoon is None, "OpenCV is not installed")
+class CacheTests(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = tmp.name
+        self.cache_dir = os.path.join(self.dir, "cache")
+        self.inputs = []
+        for seed in range(3):
+            path = os.path.join(self.dir, f"in{seed}.png")
+            cv2.imwrite(path, texture(64, 96, seed))
+            self.inputs.append(path)
+
+    def run_cli(self, *args):
+        script = os.path.join(os.path.dirname(cartoon.__file__), "cartoon.py")
+        result = subprocess.run([sys.executable, script, "--cache-dir", self.cache_dir, *args],
+                                capture_output=True, text=True, check=True)
+        return result.stdout.strip().splitlines()[-1]
+
+    def cache_entries(self):
+        return {os.path.join(root, name) for root, _dirs, files in os.walk(self.cache_dir) for name in files}
+
+    def test_second_run_hits(self):
+        outputs = [os.path.join(self.dir, f"out{i}.png") for i in range(3)]
+        options = [arg for path in outputs for arg in ("--output", path)]
+        self.assertIn("(cache: 0 hits, 3 misses)", self.run_cli(*self.inputs, *options))
+        first = [cv2.imread(path) for path in outputs]
+        for path in outputs:
+            os.remove(path)
+
+        self.assertIn("(cache: 3 hits, 0 misses)", self.run_cli(*self.inputs, *options))
+        for path, expected in zip(outputs, first):
+            np.testing.assert_array_equal(cv2.imread(path), expected)
+
+    def test_cache_size_evicts_everything_over_the_limit(self):
+        output = os.path.join(self.dir, "out.png")
+        self.run_cli(self.inputs[0], "--output", output, "--cache-size", "0")
+        self.assertEqual(self.cache_entries(), set())
+        self.assertIn("(cache: 0 hits, 1 misses)", self.run_cli(self.inputs[0], "--output", output))
+        self.assertEqual(len(self.cache_entries()), 1)
+
+    def test_eviction_drops_least_recently_used(self):
+        outputs = [os.path.join(self.dir, f"out{i}.png") for i in range(3)]
+        # Entries used in input order, one second apart
+        for i, (path, output) in enumerate(zip(self.inputs, outputs)):
+            before = self.cache_entries()
+            cartoon.cartoonify_image(path, cache_dir=self.cache_dir, output_path=output)
+            (entry,) = self.cache_entries() - before
+            os.utime(entry, (i + 1, i + 1))
+        # A hit makes the oldest entry the most recently used
+        _quality, hit = cartoon.cartoonify_image(self.inputs[0], cache_dir=self.cache_dir, output_path=outputs[0])
+        self.assertTrue(hit)
+
+        total = sum(os.path.getsize(entry) for entry in self.cache_entries())
+        cartoon.prune_cache(self.cache_dir, total - 1)
+        self.assertEqual(len(self.cache_entries()), 2)
+        for path, output, kept in zip(self.inputs, outputs, (True, False, True)):
+            _quality, hit = cartoon.cartoonify_image(path, cache_dir=self.cache_dir, output_path=output)
+            self.assertEqual(hit, kept, path)
+
+    def test_budget_is_part_of_the_key(self):
+        # Tiled results can differ from whole-image ones by rounding
+        output = os.path.join(self.dir, "out.png")
+        for max_memory in (None, 64 * 1024 * 1024):
+            _quality, hit = cartoon.cartoonify_image(self.inputs[0], cache_dir=self.cache_dir,
+                                                     output_path=output, max_memory=max_memory)
+            self.assertFalse(hit)
+        self.assertEqual(len(self.cache_entries()), 2)
+
+
+@unittest.skipIf(cartoon is None, "OpenCV is not installed")
+class JobsTests(unittest.TestCase):
+    def test_parallel_matches_serial(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        inputs = []
+        for seed in range(3):
+            path = os.path.join(tmp.name, f"in{seed}.png")
+            cv2.imwrite(path, texture(64, 96, seed))
+            inputs.append(path)
+        corrupt = os.path.join(tmp.name, "corrupt.png")
+        with open(corrupt, "wb") as f:
+            f.write(b"not a png")
+        inputs[1:1] = [os.path.join(tmp.name, "missing.png"), corrupt]
+
+        script = os.path.join(os.path.dirname(cartoon.__file__), "cartoon.py")
+        runs = []
+        for jobs in ("1", "2"):
+            outputs = [os.path.join(tmp.name, f"out{jobs}_{i}.png") for i in range(len(inputs))]
+            options = [arg for path in outputs for arg in ("--output", path)]
+            result = subprocess.run([sys.executable, script, "--jobs", jobs, *inputs, *options],
+                                    capture_output=True, text=True, check=True)
+            # Parallel lines are numbered in completion order, so compare them without the index
+            lines = result.stdout.strip().splitlines()
+            progress = sorted(line.split(":", 1)[0] + ": " + line.split(" - ", 1)[1] for line in lines[:-1])
+            files = []
+            for path in outputs:
+                if not os.path.exists(path):
+                    files.append(None)
+                    continue
+                with open(path, "rb") as f:
+                    files.append(f.read())
+            runs.append((progress, lines[-1], files))
+
+        serial, parallel = runs
+        self.assertEqual(parallel, serial)
+        self.assertEqual(sum(line.startswith("ERROR") for line in serial[0]), 2)
+        self.assertEqual([data is None for data in serial[2]], [False, True, True, False, False])
+
+
+@unittest.skipIf(cartoon is None, "OpenCV is not installed")
+class OutputTests(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = tmp.name
+        self.input_path = os.path.join(self.dir, "in.png")
+        self.alpha = np.tile(np.arange(0, 256, 2, dtype=np.uint8), (64, 1))
+        cv2.imwrite(self.input_path, np.dstack((texture(64, 128), self.alpha)))
+
+    def test_raw_output_keeps_alpha(self):
+        script = os.path.join(os.path.dirname(cartoon.__file__), "cartoon.py")
+        result = subprocess.run([sys.executable, script, "-o", "-", self.input_path],
+                                capture_output=True, check=True)
+        header, pixels = result.stdout.split(b"\n", 1)
+        self.assertEqual(header, b"RGBA 128 64")
+        rgba = np.frombuffer(pixels, dtype=np.uint8).reshape(64, 128, 4)
+        np.testing.assert_array_equal(rgba[..., 3], self.alpha)
+
+    def test_resized_file_keeps_alpha(self):
+        output_path = os.path.join(self.dir, "out.png")
+        cartoon.cartoonify_image(self.input_path, output_path=output_path, pow2=True)
+        result = cv2.imread(output_path, cv2.IMREAD_UNCHANGED)
+        self.assertEqual(result.shape, (128, 128, 4))
+        self.assertEqual((int(result[..., 3].min()), int(result[..., 3].max())), (0, 254))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,615 @@
+"""
+Regression tests for backend/libs/areng_obj23ds/convert_obj_to_3ds.py
+
+Run with: python -m unittest discover -s backend/__tests__ -p "test_*.py"
+"""
+
+import contextlib
+import io
+import json
+import math
+import os
+import random
+import struct
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "libs", "areng_obj23ds"))
+
+import convert_obj_to_3ds as converter  # noqa: E402
+
+
+def legacy_write_3ds_file(vertices, faces, output_path):
+    """The original concatenating writer, kept as the byte-for-byte reference"""
+    with open(output_path, 'wb') as f:
+        vertex_data = struct.pack('<H', len(vertices))
+        for vertex in vertices:
+            vertex_data += struct.pack('<fff', float(vertex[0]), float(vertex[1]), float(vertex[2]))
+
+        face_data = struct.pack('<H', len(faces))
+        for face in faces:
+            face_data += struct.pack('<HHH', int(face[0]), int(face[1]), int(face[2]))
+            face_data += struct.pack('<H', 0)
+
+        trimesh_data = b''
+        trimesh_data += struct.pack('<H', 0x4110)
+        trimesh_data += struct.pack('<I', 6 + len(vertex_data))
+        trimesh_data += vertex_data
+        trimesh_data += struct.pack('<H', 0x4120)
+        trimesh_data += struct.pack('<I', 6 + len(face_data))
+        trimesh_data += face_data
+
+        object_data = b'collision\x00'
+        object_data += struct.pack('<H', 0x4100)
+        object_data += struct.pack('<I', 6 + len(trimesh_data))
+        object_data += trimesh_data
+
+        editor_data = struct.pack('<H', 0x4000)
+        editor_data += struct.pack('<I', 6 + len(object_data))
+        editor_data += object_data
+
+        main_data = struct.pack('<H', 0x3D3D)
+        main_data += struct.pack('<I', 6 + len(editor_data))
+        main_data += editor_data
+
+        f.write(struct.pack('<H', 0x4D4D))
+        f.write(struct.pack('<I', 6 + len(main_data)))
+        f.write(main_data)
+
+
+def random_obj(path, vertex_count, face_count, seed=0):
+    """Write an OBJ mixing triangles, quads and pentagons with v/vt/vn references"""
+    rng = random.Random(seed)
+    with open(path, 'w') as f:
+        for _ in range(vertex_count):
+            f.write("v %.6f %.6f %.6f\n" % tuple(rng.uniform(-512, 512) for _ in range(3)))
+        for _ in range(face_count):
+            corners = [rng.randint(1, vertex_count) for _ in range(rng.choice((3, 4, 5)))]
+            form = rng.choice(("{0}", "{0}/{0}", "{0}/{0}/{0}", "{0}//{0}"))
+            f.write("f " + " ".join(form.format(i) for i in corners) + "\n")
+
+
+def read_3ds_objects(path):
+    """Read (name, vertices, faces) for every object block in a 3DS file"""
+    with open(path, 'rb') as f:
+        data = f.read()
+
+    objects = []
+    main_id, main_length = struct.unpack_from('<HI', data, 0)
+    editor_id, editor_length = struct.unpack_from('<HI', data, 6)
+    assert (main_id, main_length, editor_id) == (0x4D4D, len(data), 0x3D3D)
+
+    offset = 12
+    while offset < 6 + editor_length:
+        chunk_id, length = struct.unpack_from('<HI', data, offset)
+        assert chunk_id == 0x4000
+        name_end = data.index(b'\x00', offset + 6)
+        name = data[offset + 6:name_end].decode('ascii')
+        mesh = name_end + 1 + 6  # Skip the 0x4100 header
+
+        count, = struct.unpack_from('<H', data, mesh + 6)
+        vertices = [struct.unpack_from('<fff', data, mesh + 8 + 12 * i) for i in range(count)]
+        faces_offset = mesh + 8 + 12 * count
+        face_count, = struct.unpack_from('<H', data, faces_offset + 6)
+        faces = [struct.unpack_from('<HHH', data, faces_offset + 8 + 8 * i) for i in range(face_count)]
+
+        objects.append((name, vertices, faces))
+        offset += length
+    return objects
+
+
+def triangle_set(vertices, faces):
+    """Faces as a sorted list of float32 corner coordinates, independent of indexing"""
+    pack = converter.pack_vertices
+    return sorted(
+        tuple(struct.unpack('<fff', pack([vertices[i]])) for i in face)
+        for face in faces
+    )
+
+
+class Write3DSTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.obj_path = os.path.join(self.tmp.name, "mesh.obj")
+        random_obj(self.obj_path, 3000, 2000)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write_both(self, vertices, faces):
+        legacy_path = os.path.join(self.tmp.name, "legacy.3ds")
+        new_path = os.path.join(self.tmp.name, "new.3ds")
+        with contextlib.redirect_stdout(io.StringIO()):
+            legacy_write_3ds_file(vertices, faces, legacy_path)
+            converter.write_3ds_file(vertices, faces, new_path)
+        with open(legacy_path, 'rb') as legacy, open(new_path, 'rb') as new:
+            return legacy.read(), new.read()
+
+    def parse(self, parser):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return parser(self.obj_path, 0.9, 90, 30, 45)
+
+    def test_matches_legacy_writer_for_lists(self):
+        vertices, faces = self.parse(converter.parse_obj_file_stdlib)
+        legacy, new = self.write_both(vertices, faces)
+        self.assertEqual(legacy, new)
+
+    @unittest.skipIf(converter.np is None, "NumPy not installed")
+    def test_matches_legacy_writer_for_arrays(self):
+        vertices, faces = self.parse(converter.parse_obj_file_numpy)
+        legacy, new = self.write_both(vertices, faces)
+        self.assertEqual(legacy, new)
+
+    @unittest.skipIf(converter.np is None, "NumPy not installed")
+    def test_parsers_agree(self):
+        stdlib_vertices, stdlib_faces = self.parse(converter.parse_obj_file_stdlib)
+        numpy_vertices, numpy_faces = self.parse(converter.parse_obj_file_numpy)
+        self.assertEqual(stdlib_faces, numpy_faces.tolist())
+        self.assertEqual(converter.pack_vertices(stdlib_vertices), converter.pack_vertices(numpy_vertices))
+
+    def test_single_triangle(self):
+        legacy, new = self.write_both([[0, 0, 0], [1, 0, 0], [0, 1, 0]], [[0, 1, 2]])
+        self.assertEqual(legacy, new)
+
+
+class PartitionTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.obj_path = os.path.join(self.tmp.name, "mesh.obj")
+        random_obj(self.obj_path, 3000, 2000)
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.vertices, self.faces = converter.parse_obj_file_stdlib(self.obj_path)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def check_parts(self, parts, vertices, faces, limit):
+        self.assertGreater(len(parts), 1)
+        combined = []
+        for part_vertices, part_faces in parts:
+            self.assertLessEqual(len(part_vertices), limit)
+            self.assertLessEqual(len(part_faces), limit)
+            combined.extend(triangle_set(part_vertices, part_faces))
+        self.assertEqual(sorted(combined), triangle_set(vertices, faces))
+
+    def test_stdlib_partition_keeps_every_face(self):
+        parts = converter.partition_mesh(self.vertices, self.faces, limit=500)
+        self.check_parts(parts, self.vertices, self.faces, 500)
+
+    @unittest.skipIf(converter.np is None, "NumPy not installed")
+    def test_numpy_partition_keeps_every_face(self):
+        vertices = converter.np.array(self.vertices)
+        faces = converter.np.array(self.faces)
+        parts = converter.partition_mesh(vertices, faces, limit=500)
+        self.check_parts(parts, self.vertices, self.faces, 500)
+
+    def test_small_mesh_is_one_object(self):
+        self.assertEqual(len(converter.partition_mesh(self.vertices, self.faces)), 1)
+
+    @unittest.skipIf(converter.np is None, "NumPy not installed")
+    def test_large_mesh_writes_multiple_objects(self):
+        # A 300 x 300 grid: 90000 vertices, 178802 triangles
+        np = converter.np
+        side = 300
+        xs, ys = np.meshgrid(np.arange(side, dtype=np.float64), np.arange(side, dtype=np.float64))
+        vertices = np.stack([xs.ravel(), ys.ravel(), np.zeros(side * side)], axis=1)
+        corner = (np.arange(side - 1)[None, :] + side * np.arange(side - 1)[:, None]).ravel()
+        faces = np.concatenate([
+            np.stack([corner, corner + 1, corner + side], axis=1),
+            np.stack([corner + 1, corner + side + 1, corner + side], axis=1),
+        ])
+
+        path = os.path.join(self.tmp.name, "large.3ds")
+        with contextlib.redirect_stdout(io.StringIO()):
+            converter.write_3ds_file(vertices, faces, path)
+
+        objects = read_3ds_objects(path)
+        self.assertGreater(len(objects), 1)
+        self.assertEqual(sum(len(obj[2]) for obj in objects), len(faces))
+        for _name, part_vertices, part_faces in objects:
+            self.assertLessEqual(len(part_vertices), converter.MAX_3DS_COUNT)
+            self.assertLess(max(max(face) for face in part_faces), len(part_vertices))
+
+
+def grid_mesh(side):
+    """A flat side x side vertex grid in the XY plane as (vertices, faces) lists"""
+    vertices = [[float(x), float(y), 0.0] for y in range(side) for x in range(side)]
+    faces = []
+    for y in range(side - 1):
+        for x in range(side - 1):
+            corner = y * side + x
+            faces.append([corner, corner + 1, corner + side])
+            faces.append([corner + 1, corner + side + 1, corner + side])
+    return vertices, faces
+
+
+class DecimateTests(unittest.TestCase):
+    def test_reaches_target_count(self):
+        vertices, faces = grid_mesh(30)
+        new_vertices, new_faces, stats = converter.decimate_mesh(vertices, faces, target_faces=200)
+        self.assertLessEqual(len(new_faces), 200)
+        self.assertEqual(stats["facesBefore"], len(faces))
+        self.assertEqual(stats["facesAfter"], len(new_faces))
+        self.assertEqual(stats["verticesAfter"], len(new_vertices))
+        for face in new_faces:
+            self.assertTrue(all(0 <= corner < len(new_vertices) for corner in face))
+
+    def test_flat_mesh_collapses_without_error(self):
+        vertices, faces = grid_mesh(20)
+        new_vertices, new_faces, stats = converter.decimate_mesh(vertices, faces, max_error=1e-6)
+        self.assertLess(len(new_faces), len(faces) // 10)
+        self.assertLess(stats["maxDeviation"], 1e-6)
+        # Every vertex stays in the plane and inside the original square
+        for x, y, z in new_vertices:
+            self.assertAlmostEqual(z, 0.0)
+            self.assertTrue(-1e-6 <= x <= 19 + 1e-6 and -1e-6 <= y <= 19 + 1e-6)
+
+    def test_max_deviation_is_a_surface_distance(self):
+        side = 30
+        vertices, faces = grid_mesh(side)
+        for vertex in vertices:
+            vertex[2] = 0.3 * math.sin(vertex[0] / 4) * math.cos(vertex[1] / 5)
+        new_vertices, new_faces, stats = converter.decimate_mesh(vertices, faces, max_error=0.05)
+        self.assertLess(len(new_faces), len(faces) // 2)
+        self.assertLessEqual(stats["maxDeviation"], 0.05)
+
+        def distance(point, mesh_vertices, mesh_faces):
+            return min(converter.point_triangle_distance(point, *(mesh_vertices[i] for i in face))
+                       for face in mesh_faces)
+
+        # Brute force both ways; the reported figure bounds them
+        measured = max(max(distance(v, vertices, faces) for v in new_vertices),
+                       max(distance(v, new_vertices, new_faces) for v in vertices))
+        self.assertLessEqual(measured, stats["maxDeviation"] + 1e-9)
+
+    def test_collapses_keep_the_mesh_manifold(self):
+        # Every edge of a tetrahedron fails the link condition
+        tetrahedron = [[0, 0, 0], [1, 0, 0], [0, 1, 0], [0, 0, 1]]
+        tetra_faces = [[0, 2, 1], [0, 1, 3], [1, 2, 3], [0, 3, 2]]
+        _vertices, new_faces, _stats = converter.decimate_mesh(tetrahedron, tetra_faces, target_faces=2)
+        self.assertEqual(len(new_faces), 4)
+
+        vertices, faces = grid_mesh(12)
+        _vertices, new_faces, _stats = converter.decimate_mesh(vertices, faces, target_faces=4)
+        edges = {}
+        for face in new_faces:
+            for i in range(3):
+                edge = tuple(sorted((face[i], face[(i + 1) % 3])))
+                edges[edge] = edges.get(edge, 0) + 1
+        self.assertTrue(all(count <= 2 for count in edges.values()))
+
+    def test_no_options_keeps_mesh(self):
+        vertices, faces = grid_mesh(5)
+        _vertices, new_faces, stats = converter.decimate_mesh(vertices, faces)
+        self.assertEqual(len(new_faces), len(faces))
+        self.assertEqual(stats["maxDeviation"], 0.0)
+
+    @unittest.skipIf(converter.np is None, "NumPy not installed")
+    def test_arrays_in_arrays_out(self):
+        vertices, faces = grid_mesh(10)
+        np = converter.np
+        new_vertices, new_faces, _stats = converter.decimate_mesh(np.array(vertices), np.array(faces), target_faces=20)
+        self.assertIsInstance(new_faces, np.ndarray)
+        self.assertEqual(new_faces.shape[1], 3)
+
+    @unittest.skipIf(converter.np is None, "NumPy not installed")
+    def test_arrays_match_lists(self):
+        # Open borders and a curved surface, so every setup term is used
+        vertices, faces = grid_mesh(16)
+        for vertex in vertices:
+            vertex[2] = 0.5 * math.sin(vertex[0] / 3) * math.cos(vertex[1] / 4)
+        np = converter.np
+        for options in ({"target_faces": 60}, {"max_error": 0.02}):
+            list_vertices, list_faces, list_stats = converter.decimate_mesh(vertices, faces, **options)
+            array_vertices, array_faces, array_stats = converter.decimate_mesh(
+                np.array(vertices), np.array(faces), **options)
+            self.assertEqual(array_faces.tolist(), list_faces)
+            self.assertEqual(array_vertices.tolist(), list_vertices)
+            self.assertAlmostEqual(array_stats.pop("maxDeviation"), list_stats.pop("maxDeviation"))
+            self.assertEqual(array_stats, list_stats)
+
+    @unittest.skipIf(converter.np is None, "NumPy not installed")
+    def test_batched_distances_match(self):
+        rng = random.Random(4)
+        points, triangles = [], []
+        for index in range(500):
+            points.append([rng.uniform(-2, 2) for _ in range(3)])
+            corners = [[rng.uniform(-1, 1) for _ in range(3)] for _ in range(3)]
+            # Some with repeated corners or all three in a line
+            if index % 5 == 1:
+                corners[1] = corners[0]
+            elif index % 5 == 2:
+                corners[2] = [(a + b) / 2 for a, b in zip(corners[0], corners[1])]
+            elif index % 5 == 3:
+                corners[1] = corners[2] = corners[0]
+            triangles.append(corners)
+        np = converter.np
+        corners = np.array(triangles)
+        distances = converter.point_triangle_distances(np.array(points), corners[:, 0], corners[:, 1], corners[:, 2])
+        for point, triangle, distance in zip(points, triangles, distances):
+            self.assertAlmostEqual(distance, converter.point_triangle_distance(point, *triangle))
+
+    def test_negative_max_error_is_rejected(self):
+        vertices, faces = grid_mesh(5)
+        with self.assertRaises(ValueError):
+            converter.decimate_mesh(vertices, faces, max_error=-0.1)
+
+        argv = ["convert_obj_to_3ds.py", "in.obj", "out.3ds", "--max-error", "-0.1"]
+        with contextlib.redirect_stderr(io.StringIO()) as stderr, self.assertRaises(SystemExit) as exit:
+            with mock.patch.object(sys, "argv", argv):
+                converter.main()
+        self.assertEqual(exit.exception.code, 2)
+        self.assertIn("--max-error: must not be negative", stderr.getvalue())
+
+
+class WeldTests(unittest.TestCase):
+    def unwelded_grid(self, side, jitter):
+        """grid_mesh with every face given its own (slightly jittered) corners"""
+        rng = random.Random(1)
+        vertices, faces = grid_mesh(side)
+        split_vertices, split_faces = [], []
+        for face in faces:
+            split_faces.append([len(split_vertices) + i for i in range(3)])
+            for corner in face:
+                split_vertices.append([c + rng.uniform(-jitter, jitter) for c in vertices[corner]])
+        return split_vertices, split_faces
+
+    def test_merges_repeated_corners(self):
+        vertices, faces = self.unwelded_grid(8, 1e-5)
+        new_vertices, new_faces, stats = converter.weld_vertices(vertices, faces, 1e-3)
+        self.assertEqual(len(new_vertices), 64)
+        self.assertEqual(len(new_faces), len(faces))
+        self.assertEqual(stats["verticesBefore"], len(vertices))
+        self.assertEqual(stats["verticesAfter"], 64)
+
+    def test_drops_degenerate_and_duplicate_faces(self):
+        vertices, faces = grid_mesh(3)
+        vertices = vertices + [[0.5, 0.0, 0.0], [0.0, 0.0, 0.0]]
+        extra = [
+            [0, 1, 9],    # Sliver: all three corners on the x axis
+            [0, 10, 3],   # Vertex 10 welds onto vertex 0
+            faces[0],     # Exact duplicate
+            faces[0][1:] + faces[0][:1],  # Same triangle, rotated
+            faces[0][::-1],  # Opposite winding is kept
+        ]
+        new_vertices, new_faces, stats = converter.weld_vertices(vertices, faces + extra, 1e-6)
+        self.assertEqual(stats["degenerateFaces"], 2)
+        self.assertEqual(stats["duplicateFaces"], 2)
+        self.assertEqual(len(new_faces), len(faces) + 1)
+        self.assertEqual(len(new_vertices), 9)
+
+    def test_exact_weld_ignores_near_misses(self):
+        vertices, faces = self.unwelded_grid(4, 1e-5)
+        new_vertices, _faces, _stats = converter.weld_vertices(vertices, faces, 0.0)
+        self.assertEqual(len(new_vertices), len(vertices))
+
+    @unittest.skipIf(converter.np is None, "NumPy not installed")
+    def test_arrays_match_lists(self):
+        vertices, faces = self.unwelded_grid(6, 1e-5)
+        np = converter.np
+        list_result = converter.weld_vertices(vertices, faces, 1e-3)
+        array_result = converter.weld_vertices(np.array(vertices), np.array(faces), 1e-3)
+        self.assertEqual(array_result[1].tolist(), list_result[1])
+        self.assertEqual(array_result[2], list_result[2])
+
+    @unittest.skipIf(converter.np is None, "NumPy not installed")
+    def test_arrays_drop_the_same_faces(self):
+        vertices, faces = grid_mesh(3)
+        vertices = vertices + [[0.5, 0.0, 0.0], [0.0, 0.0, 0.0]]
+        faces = faces + [[0, 1, 9], [0, 10, 3], faces[0], faces[0][1:] + faces[0][:1], faces[0][::-1]]
+        np = converter.np
+        list_result = converter.weld_vertices(vertices, faces, 1e-6)
+        array_result = converter.weld_vertices(np.array(vertices), np.array(faces), 1e-6)
+        self.assertEqual(array_result[0].tolist(), list_result[0])
+        self.assertEqual(array_result[1].tolist(), list_result[1])
+        self.assertEqual(array_result[2], list_result[2])
+
+    @unittest.skipIf(converter.np is None, "NumPy not installed")
+    def test_arrays_never_weld_past_tolerance(self):
+        # Clusters too wide to always merge on the snapping grids
+        vertices, faces = self.unwelded_grid(6, 0.1)
+        np = converter.np
+        new_vertices, new_faces, stats = converter.weld_vertices(np.array(vertices), np.array(faces), 0.3)
+        self.assertEqual(stats["facesAfter"], len(faces))
+        self.assertGreaterEqual(stats["verticesAfter"], 36)
+        moved = np.linalg.norm(new_vertices[new_faces] - np.array(vertices)[np.array(faces)], axis=2)
+        self.assertLessEqual(moved.max(), 0.3)
+
+
+class CollisionShapeTests(unittest.TestCase):
+    def random_points(self, count, low, high, seed=3):
+        rng = random.Random(seed)
+        return [[rng.uniform(low[k], high[k]) for k in range(3)] for _ in range(count)]
+
+    def assert_closed_convex(self, points, vertices, faces):
+        edges = {(face[i], face[(i + 1) % 3]) for face in faces for i in range(3)}
+        self.assertTrue(all((b, a) in edges for a, b in edges))
+        for a, b, c in faces:
+            normal = converter.cross(converter.sub(vertices[b], vertices[a]), converter.sub(vertices[c], vertices[a]))
+            for point in points:
+                self.assertLessEqual(converter.dot(normal, converter.sub(point, vertices[a])), 1e-9)
+
+    def test_hull_is_closed_and_contains_points(self):
+        points = self.random_points(2000, (-3, -2, -1), (3, 2, 1))
+        vertices, faces = converter.convex_hull(points)
+        self.assert_closed_convex(points, vertices, faces)
+        volume = converter.hull_volume(vertices, faces)
+        self.assertTrue(42 < volume <= 48, volume)  # Points fill a 6 x 4 x 2 box
+
+    def test_hull_rejects_flat_points(self):
+        with self.assertRaises(ValueError):
+            converter.convex_hull([[0, 0, 0], [1, 0, 0], [0, 1, 0], [1, 1, 0], [0.5, 0.5, 0]])
+
+    def test_box_follows_rotated_points(self):
+        matrix = converter.rotation_matrix(30, 20, 10)
+        points = [list(converter.apply_rotation(matrix, *p))
+                  for p in self.random_points(3000, (-5, -1, -0.5), (5, 1, 0.5))]
+        vertices, faces = converter.oriented_box(points)
+        self.assertEqual(len(faces), 12)
+        self.assert_closed_convex(points, vertices, faces)
+        self.assertLess(converter.hull_volume(vertices, faces), 22)  # Points span 10 x 2 x 1
+
+    def test_sampled_box_still_covers_every_point(self):
+        matrix = converter.rotation_matrix(30, 20, 10)
+        points = [list(converter.apply_rotation(matrix, *p))
+                  for p in self.random_points(3 * converter.BOX_FRAME_SAMPLE, (-5, -1, -0.5), (5, 1, 0.5))]
+        vertices, faces = converter.oriented_box(points)
+        self.assert_closed_convex(points, vertices, faces)
+        self.assertLess(converter.hull_volume(vertices, faces), 22)
+
+    def test_pieces_become_objects(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        obj_path = os.path.join(tmp.name, "mesh.obj")
+        output_path = os.path.join(tmp.name, "mesh.3ds")
+        random_obj(obj_path, 500, 400)
+        with contextlib.redirect_stdout(io.StringIO()):
+            converter.convert_obj_to_3ds(obj_path, output_path, collision="hull", pieces=4)
+        objects = read_3ds_objects(output_path)
+        self.assertEqual([name for name, _v, _f in objects], ["coll_000", "coll_001", "coll_002", "coll_003"])
+
+
+class ManifestTests(unittest.TestCase):
+    def test_runs_every_job_and_reports_failures(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        obj_path = os.path.join(tmp.name, "mesh.obj")
+        random_obj(obj_path, 200, 150)
+        jobs = [
+            {"input": obj_path, "output": os.path.join(tmp.name, "out", "a.3ds"), "scale": 0.9, "roll": 90},
+            {"input": os.path.join(tmp.name, "missing.obj"), "output": os.path.join(tmp.name, "b.3ds")},
+            {"input": obj_path, "output": os.path.join(tmp.name, "c.3ds"), "collision": "box"},
+        ]
+
+        stream = io.StringIO()
+        summary = converter.run_manifest(jobs, stream=stream)
+        lines = [json.loads(line) for line in stream.getvalue().splitlines()]
+
+        self.assertEqual(lines[-1], summary)
+        self.assertEqual((summary["total"], summary["succeeded"], summary["failed"]), (3, 2, 1))
+        results = {line["index"]: line for line in lines[:-1]}
+        self.assertTrue(results[0]["success"])
+        self.assertFalse(results[1]["success"])
+        self.assertIn("not found", results[1]["error"])
+        self.assertEqual(len(read_3ds_objects(jobs[2]["output"])[0][2]), 12)
+
+        # Same bytes as converting the job on its own
+        single_path = os.path.join(tmp.name, "single.3ds")
+        with contextlib.redirect_stdout(io.StringIO()):
+            converter.convert_obj_to_3ds(obj_path, single_path, 0.9, 90)
+        with open(single_path, 'rb') as single, open(jobs[0]["output"], 'rb') as batched:
+            self.assertEqual(single.read(), batched.read())
+
+
+class AtlasSplitTests(unittest.TestCase):
+    # Packed cells of different sizes, as (x, y, width, height)
+    CELLS = [(0.0, 0.0, 256.0, 256.0), (256.0, 0.0, 184.0, 400.0)]
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = tmp.name
+        rng = random.Random(3)
+
+        # Two items centred in their packed cells, as merge.py lays them out
+        self.items = []
+        layout = []
+        for index, (x, y, width, height) in enumerate(self.CELLS):
+            vertices = [[rng.uniform(-60, 60) for _ in range(3)] for _ in range(40)]
+            faces = [rng.sample(range(40), 3) for _ in range(30)]
+            offset = (x + width / 2, y + height / 2, 0.0)
+            self.items.append((vertices, faces))
+            layout.append({"name": f"item{index}", "index": index, "slot": index,
+                           "cellX": x, "cellY": y, "cellWidth": width, "cellHeight": height,
+                           "offsetX": offset[0], "offsetY": offset[1], "offsetZ": offset[2]})
+        self.layout_path = os.path.join(self.dir, "atlas_layout.json")
+        with open(self.layout_path, 'w') as f:
+            json.dump({"packing": "skyline", "width": 440.0, "height": 400.0, "layout": layout}, f)
+
+        # Atlas OBJ (OBJ axes: Source x, z, -y) with interleaved faces and v/vt/vn references
+        self.obj_path = os.path.join(self.dir, "atlas.obj")
+        with open(os.path.join(self.dir, "atlas.mtl"), 'w') as f:
+            f.write("newmtl wall\n")
+        with open(self.obj_path, 'w') as f:
+            f.write("mtllib atlas.mtl\n")
+            for index, (vertices, _faces) in enumerate(self.items):
+                item = layout[index]
+                for x, y, z in vertices:
+                    f.write(f"v {x + item['offsetX']} {y + item['offsetZ']} {z - item['offsetY']}\n")
+            f.write("vt 0.25 0.75\nvn 0 1 0\nusemtl wall\n")
+            for a, b in zip(*(item[1] for item in self.items)):
+                f.write("f " + " ".join(f"{i + 1}/1/1" for i in a) + "\n")
+                f.write("f " + " ".join(f"{i + 41}//1" for i in b) + "\n")
+
+    def split(self, output_format, **options):
+        output_dir = os.path.join(self.dir, output_format)
+        with contextlib.redirect_stdout(io.StringIO()):
+            return converter.split_atlas(self.obj_path, self.layout_path, output_dir, output_format,
+                                         "piece", **options)
+
+    def test_obj_cells_match_items(self):
+        result = self.split("obj")
+        self.assertEqual([cell["name"] for cell in result["cells"]], ["piece_0", "piece_1"])
+        for cell, (vertices, faces) in zip(result["cells"], self.items):
+            with contextlib.redirect_stdout(io.StringIO()):
+                split_vertices, split_faces = converter.parse_obj_file(cell["path"])
+            self.assertEqual(triangle_set(split_vertices, split_faces), triangle_set(vertices, faces))
+            self.assertTrue(os.path.exists(cell["mtlPath"]))
+            with open(cell["path"]) as f:
+                text = f.read()
+            self.assertTrue(text.startswith(f"mtllib {cell['name']}.mtl"))
+            self.assertIn("usemtl wall", text)
+
+    def test_3ds_cells_match_single_conversion(self):
+        result = self.split("3ds", scale=0.9, roll=90)
+        for cell, (vertices, faces) in zip(result["cells"], self.items):
+            item_path = os.path.join(self.dir, f"{cell['name']}.obj")
+            with open(item_path, 'w') as f:
+                f.writelines(f"v {x} {y} {z}\n" for x, y, z in vertices)
+                f.writelines(f"f {a + 1} {b + 1} {c + 1}\n" for a, b, c in faces)
+            single_path = os.path.join(self.dir, f"{cell['name']}.3ds")
+            with contextlib.redirect_stdout(io.StringIO()):
+                converter.convert_obj_to_3ds(item_path, single_path, 0.9, 90)
+
+            (_name, split_vertices, split_faces), = read_3ds_objects(cell["path"])
+            (_name, single_vertices, single_faces), = read_3ds_objects(single_path)
+            self.assertEqual(triangle_set(split_vertices, split_faces),
+                             triangle_set(single_vertices, single_faces))
+        # Spill files are cleaned up
+        self.assertEqual(sorted(os.listdir(os.path.join(self.dir, "3ds"))), ["piece_0.3ds", "piece_1.3ds"])
+
+    def test_clean_cells_keep_their_files(self):
+        first = self.split("obj")
+        os.utime(first["cells"][0]["path"], (1, 1))
+        os.utime(first["cells"][1]["path"], (1, 1))
+
+        result = self.split("obj", dirty_cells={1})
+        clean, dirty = result["cells"]
+        self.assertTrue(clean["reused"])
+        for key in ("name", "originalName", "index", "path", "mtlPath"):
+            self.assertEqual(clean[key], first["cells"][0][key], key)
+        self.assertEqual(os.path.getmtime(clean["path"]), 1)
+        self.assertNotEqual(os.path.getmtime(dirty["path"]), 1)
+        self.assertNotIn("reused", dirty)
+
+        # A clean cell whose file is gone is written again
+        os.remove(clean["path"])
+        result = self.split("obj", dirty_cells=set())
+        self.assertNotIn("reused", result["cells"][0])
+        self.assertTrue(result["cells"][1]["reused"])
+        with contextlib.redirect_stdout(io.StringIO()):
+            vertices, faces = converter.parse_obj_file(clean["path"])
+        self.assertEqual(triangle_set(vertices, faces), triangle_set(*self.items[0]))
+
+    def test_grid_layouts_still_resolve(self):
+        # Layouts from before packing share one square cellSize
+        layout = converter.AtlasLayout({"cellSize": 256.0, "layout": [
+            {"cellX": 0.0, "cellY": 0.0}, {"cellX": 256.0, "cellY": 0.0}, {"cellX": 0.0, "cellY": 256.0}]})
+        self.assertEqual([layout.cell_at(x, y) for x, y in [(10, 10), (300, 200), (100, 300), (600, 300)]],
+                         [0, 1, 2, 1])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,347 @@
+"""
+Regression tests for backend/libs/areng_mdlDepend/find_mdl_deps.py
+
+Run with: python -m unittest discover -s backend/__tests__ -p "test_*.py"
+"""
+
+import contextlib
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "libs", "areng_mdlDepend"))
+
+try:
+    import srctools.vpk
+    with contextlib.redirect_stdout(io.StringIO()):
+        import find_mdl_deps
+except (ImportError, SystemExit):
+    find_mdl_deps = None
+
+
+GAMEINFO = """"GameInfo"
+{
+	game	"Test"
+	FileSystem
+	{
+		SearchPaths
+		{
+			Game	|gameinfo_path|.
+		}
+	}
+}
+"""
+
+
+def write_file(root, path, data):
+    """Write data (str or bytes) to root/path, creating folders"""
+    full_path = os.path.join(root, *path.split("/"))
+    os.makedirs(os.path.dirname(full_path), exist_ok=True)
+    with open(full_path, "wb") as f:
+        f.write(data.encode() if isinstance(data, str) else data)
+    return full_path
+
+
+def write_vpk(path, files):
+    """Write a VPK holding {path: bytes}"""
+    if os.path.exists(path):
+        os.remove(path)
+    vpk = srctools.vpk.VPK(path, mode="w")
+    for name, data in files.items():
+        vpk.add_file(name, data)
+    vpk.write_dirfile()
+
+
+@unittest.skipIf(find_mdl_deps is None, "srctools is not installed")
+class GameFixture(unittest.TestCase):
+    """A game folder with a gameinfo.txt whose only search path is itself"""
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.game_dir = os.path.join(tmp.name, "game")
+        write_file(self.game_dir, "gameinfo.txt", GAMEINFO)
+
+
+class CacheFingerprintTests(GameFixture):
+    def resolve(self, cache):
+        fsys = find_mdl_deps.build_filesystem(self.game_dir)
+        # The fixture models are not real MDLs; only the cache path is under test
+        with mock.patch.object(find_mdl_deps.srctools.packlist.PackList, "eval_dependencies"):
+            return find_mdl_deps.resolve_mdl(fsys, "models/a.mdl", cache)
+
+    def fingerprint(self):
+        fsys = find_mdl_deps.build_filesystem(self.game_dir)
+        return find_mdl_deps.file_fingerprint(find_mdl_deps.owning_file(fsys, "models/a.mdl"))
+
+    def test_loose_fingerprint_follows_the_file(self):
+        full_path = write_file(self.game_dir, "models/a.mdl", b"one")
+        before = self.fingerprint()
+        self.assertEqual(before[:2], ["file", os.path.normcase(full_path)])
+
+        write_file(self.game_dir, "models/a.mdl", b"longer")
+        self.assertNotEqual(self.fingerprint(), before)
+
+    def test_vpk_fingerprint_follows_the_archive(self):
+        vpk_path = os.path.join(self.game_dir, "pak01_dir.vpk")
+        write_vpk(vpk_path, {"models/a.mdl": b"one"})
+        before = self.fingerprint()
+        self.assertEqual(before[:2], ["vpk", os.path.normcase(vpk_path)])
+
+        write_vpk(vpk_path, {"models/a.mdl": b"longer", "models/b.mdl": b"new"})
+        self.assertNotEqual(self.fingerprint(), before)
+
+    def test_edited_model_misses_the_cache(self):
+        write_file(self.game_dir, "models/a.mdl", b"one")
+        cache = find_mdl_deps.DependencyCache(None)
+        self.assertTrue(self.resolve(cache)["success"])
+        self.assertTrue(self.resolve(cache)["success"])
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+        write_file(self.game_dir, "models/a.mdl", b"longer")
+        self.resolve(cache)
+        self.assertEqual((cache.hits, cache.misses), (1, 2))
+
+    def test_changed_dependency_misses_the_cache(self):
+        write_file(self.game_dir, "models/a.mdl", b"one")
+        write_file(self.game_dir, "materials/a.vmt", '"LightmappedGeneric" {}')
+
+        def pack_material(packlist):
+            packlist.pack_file("materials/a.vmt")
+
+        cache = find_mdl_deps.DependencyCache(None)
+        fsys = find_mdl_deps.build_filesystem(self.game_dir)
+        with mock.patch.object(find_mdl_deps.srctools.packlist.PackList, "eval_dependencies",
+                               autospec=True, side_effect=pack_material):
+            self.assertIn("materials/a.vmt", find_mdl_deps.resolve_mdl(fsys, "models/a.mdl", cache)["materials"])
+            find_mdl_deps.resolve_mdl(fsys, "models/a.mdl", cache)
+            self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+            write_file(self.game_dir, "materials/a.vmt", '"VertexLitGeneric" {}')
+            find_mdl_deps.resolve_mdl(fsys, "models/a.mdl", cache)
+        self.assertEqual((cache.hits, cache.misses), (1, 2))
+
+    def test_cache_is_kept_per_search_path_layout(self):
+        write_file(self.game_dir, "models/a.mdl", b"one")
+        cache_path = os.path.join(self.game_dir, "..", "cache.json")
+        extra = os.path.join(self.game_dir, "..", "extra")
+        os.makedirs(extra)
+
+        def resolve(extra_paths=None):
+            with mock.patch.object(find_mdl_deps.srctools.packlist.PackList, "eval_dependencies"):
+                return find_mdl_deps.find_mdl_dependencies(
+                    ["models/a.mdl"], self.game_dir, extra_paths, cache_path=cache_path)["cache"]
+
+        self.assertEqual(resolve()["misses"], 1)
+        self.assertEqual(resolve()["hits"], 1)
+        # Same model file, but an added search path could change what it depends on
+        self.assertEqual(resolve([extra])["misses"], 1)
+        self.assertEqual(resolve([extra])["hits"], 1)
+
+    def test_serial_lookups_are_not_recorded(self):
+        write_file(self.game_dir, "models/a.mdl", b"one")
+        cache = find_mdl_deps.DependencyCache(None)
+        self.resolve(cache)
+        self.resolve(cache)
+        self.assertIsNone(cache.lookups)
+
+    def test_missing_model_is_an_error_with_or_without_cache(self):
+        uncached = self.resolve(None)
+        cached = self.resolve(find_mdl_deps.DependencyCache(None))
+        self.assertFalse(uncached["success"])
+        self.assertEqual(uncached, cached)
+
+
+class MaterialDependencyTests(GameFixture):
+    def setUp(self):
+        super().setUp()
+        write_file(self.game_dir, "materials/props/base.vmt",
+                   '"LightmappedGeneric"\n{\n"$basetexture" "props/base"\n}\n')
+        write_file(self.game_dir, "materials/props/glass.vmt", """"Patch"
+{
+    "include" "materials/props/base.vmt"
+    "insert"
+    {
+        "$bumpmap" "Props\\Glass_Normal"
+        "$envmap" "env_cubemap"
+        "$bottommaterial" "props/glass_bottom"
+    }
+}
+""")
+        write_file(self.game_dir, "materials/props/base.vtf", b"vtf")
+        write_file(self.game_dir, "materials/props/glass_normal.vtf", b"vtf!")
+
+    def test_material_lists_textures_and_patch_parent(self):
+        fsys = find_mdl_deps.build_filesystem(self.game_dir)
+        file_path = "materials/props/glass.vmt"
+        children = find_mdl_deps.direct_dependencies(fsys, file_path, fsys[file_path])
+        self.assertCountEqual(children, [
+            "materials/props/base.vmt",
+            "materials/props/base.vtf",
+            "materials/props/glass_normal.vtf",
+            "materials/props/glass_bottom.vmt",
+        ])
+
+    def test_loose_texture_size(self):
+        fsys = find_mdl_deps.build_filesystem(self.game_dir)
+        file = find_mdl_deps.owning_file(fsys, "materials/props/glass_normal.vtf")
+        self.assertEqual(find_mdl_deps.file_size(file), 4)
+
+
+class SearchPathFixture(GameFixture):
+    """Numbered paks, a suffix-less VPK search path and loose files"""
+
+    def setUp(self):
+        super().setUp()
+        self.index_path = os.path.join(self.game_dir, "..", "index.json")
+        write_file(self.game_dir, "gameinfo.txt", GAMEINFO.replace(
+            "Game\t|gameinfo_path|.", "Game\t|gameinfo_path|.\n\t\t\tGame\t|gameinfo_path|extra"))
+        write_vpk(os.path.join(self.game_dir, "pak01_dir.vpk"), {"models/a.mdl": b"stock"})
+        write_vpk(os.path.join(self.game_dir, "pak02_dir.vpk"), {"models/b.mdl": b"stock"})
+        write_vpk(os.path.join(self.game_dir, "extra_dir.vpk"), {"models/c.mdl": b"stock"})
+        write_file(self.game_dir, "models/a.mdl", b"loose copy")
+        write_file(self.game_dir, "models/custom.mdl", b"loose")
+
+
+class ContentIndexTests(SearchPathFixture):
+    def query(self, *paths):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return find_mdl_deps.query_content_index(self.index_path, list(paths))
+
+    def test_layout_matches_the_game_filesystem(self):
+        fsys = find_mdl_deps.srctools.game.Game(self.game_dir).get_filesystem()
+        expected = [
+            ("vpk" if isinstance(system, find_mdl_deps.srctools.filesys.VPKFileSystem) else "folder",
+             os.path.abspath(str(system.path)))
+            for system, _prefix in fsys.systems
+        ]
+        layout = find_mdl_deps.search_path_layout(self.game_dir)
+        self.assertEqual(layout, expected)
+        self.assertEqual([os.path.basename(path) for kind, path in layout if kind == "vpk"],
+                         ["pak01_dir.vpk", "pak02_dir.vpk", "extra_dir.vpk"])
+
+    def test_index_reports_the_file_the_game_picks(self):
+        find_mdl_deps.build_content_index(self.game_dir, self.index_path)
+        results = self.query("models/a.mdl", "models/b.mdl", "models/c.mdl", "models/custom.mdl",
+                             "models/missing.mdl")["results"]
+        # The VPK copy wins over the loose one, as in the mounted filesystem
+        self.assertEqual(results["models/a.mdl"]["type"], "vpk")
+        self.assertTrue(results["models/a.mdl"]["archive"].endswith("pak01_dir.vpk"))
+        self.assertTrue(results["models/b.mdl"]["archive"].endswith("pak02_dir.vpk"))
+        self.assertTrue(results["models/c.mdl"]["archive"].endswith("extra_dir.vpk"))
+        self.assertEqual(results["models/custom.mdl"]["type"], "folder")
+        self.assertEqual(results["models/custom.mdl"]["size"], 5)
+        self.assertFalse(results["models/missing.mdl"]["exists"])
+
+    def test_new_loose_file_rebuilds_the_index(self):
+        find_mdl_deps.build_content_index(self.game_dir, self.index_path)
+        write_file(self.game_dir, "models/new/added.mdl", b"new")
+        result = self.query("models/new/added.mdl")
+        self.assertTrue(result["rebuilt"])
+        self.assertTrue(result["results"]["models/new/added.mdl"]["exists"])
+
+    def test_current_index_is_checked_without_walking(self):
+        find_mdl_deps.build_content_index(self.game_dir, self.index_path)
+        checked = []
+        is_current = find_mdl_deps.source_is_current
+
+        def check(source):
+            checked.append(source["type"])
+            return is_current(source)
+
+        with mock.patch("os.walk", side_effect=AssertionError("loose folder was walked")), \
+                mock.patch.object(find_mdl_deps, "source_is_current", side_effect=check):
+            # Archive hits can't change with the loose folders, so those aren't checked
+            self.assertFalse(self.query("models/a.mdl", "models/b.mdl")["rebuilt"])
+            self.assertNotIn("folder", checked)
+            result = self.query("models/missing.mdl")
+        self.assertFalse(result["rebuilt"])
+        self.assertIn("folder", checked)
+
+
+class LazyFilesystemTests(SearchPathFixture):
+    def lookups(self, fsys):
+        names = {}
+        for name in ("models/a.mdl", "models/b.mdl", "models/c.mdl", "models/custom.mdl"):
+            file = find_mdl_deps.owning_file(fsys, name)
+            with file.open_bin() as f:
+                names[name] = (os.path.abspath(str(file.sys.path)), f.read())
+        return names
+
+    def test_lazy_and_eager_resolve_the_same_files(self):
+        eager = find_mdl_deps.build_filesystem(self.game_dir)
+        lazy = find_mdl_deps.build_filesystem(self.game_dir, lazy=True)
+        self.assertEqual(self.lookups(lazy), self.lookups(eager))
+
+    def test_index_answers_misses_without_mounting(self):
+        find_mdl_deps.build_content_index(self.game_dir, self.index_path)
+        with mock.patch("os.walk", side_effect=AssertionError("loose folder was walked")):
+            fsys = find_mdl_deps.build_filesystem(self.game_dir, lazy=True, index_path=self.index_path)
+        with mock.patch("os.path.isfile", side_effect=AssertionError("loose folder was touched")):
+            with self.assertRaises(FileNotFoundError):
+                fsys["models/missing.mdl"]
+        self.assertEqual(find_mdl_deps.filesystem_stats(fsys)["archivesMounted"], 0)
+
+        # Only the archive that owns the file is opened, and that cost is reported
+        fsys["models/b.mdl"]
+        timing = find_mdl_deps.timing_report(fsys, 1.0, 0.0)
+        self.assertEqual(timing["archivesMounted"], 1)
+        self.assertEqual(timing["coldStartMs"], round(1.0 + timing["deferredMountMs"], 1))
+
+
+class ParallelResolveTests(GameFixture):
+    def test_bad_game_dir_fails_before_starting_workers(self):
+        with mock.patch.object(find_mdl_deps.multiprocessing, "Pool") as pool:
+            result = find_mdl_deps.find_mdl_dependencies(
+                ["models/a.mdl", "models/b.mdl"], os.path.join(self.game_dir, "missing"), jobs=2)
+        self.assertFalse(result["success"])
+        pool.assert_not_called()
+
+    def test_worker_mount_failure_is_reported_per_model(self):
+        self.addCleanup(find_mdl_deps._worker_state.clear)
+        with mock.patch.object(find_mdl_deps, "build_filesystem", side_effect=OSError("disk gone")):
+            find_mdl_deps._init_worker(self.game_dir, None, False, None, None)
+        result, lookups, (_pid, timing) = find_mdl_deps._worker_resolve("props/a")
+        self.assertEqual(result["mdlPath"], "models/props/a.mdl")
+        self.assertFalse(result["success"])
+        self.assertIn("disk gone", result["error"])
+        self.assertEqual(lookups, [])
+        self.assertIsInstance(timing["mountMs"], float)
+
+    def run_cli(self, *args):
+        script = os.path.join(os.path.dirname(find_mdl_deps.__file__), "find_mdl_deps.py")
+        result = subprocess.run([sys.executable, script, *args], capture_output=True, text=True, check=True)
+        return json.loads(result.stdout)
+
+    def test_parallel_output_matches_serial(self):
+        # Unreadable and missing models both give per-model errors
+        write_file(self.game_dir, "models/a.mdl", b"not a model")
+        write_file(self.game_dir, "models/b.mdl", b"also not a model")
+        models = ["models/a.mdl", "models/b.mdl", "models/missing.mdl", "models/a.mdl"]
+        for extra in ([], ["--lazy"]):
+            serial = self.run_cli(*models, self.game_dir, *extra)
+            parallel = self.run_cli(*models, self.game_dir, "--jobs", "2", *extra)
+            serial_timing, parallel_timing = serial.pop("timing"), parallel.pop("timing")
+            self.assertEqual(parallel, serial)
+            self.assertEqual(parallel_timing.keys(), serial_timing.keys())
+            for key, value in parallel_timing.items():
+                self.assertIsInstance(value, type(serial_timing[key]), key)
+
+
+class CommandLineTests(GameFixture):
+    def test_vmf_mode_rejects_cache_and_jobs(self):
+        for flags in (["--jobs", "2"], ["--cache", os.path.join(self.game_dir, "cache.json")]):
+            argv = ["find_mdl_deps.py", self.game_dir, "--vmf", "item.vmf"] + flags
+            with mock.patch.object(sys, "argv", argv), contextlib.redirect_stderr(io.StringIO()):
+                with self.assertRaises(SystemExit) as exit:
+                    find_mdl_deps.main()
+            self.assertEqual(exit.exception.code, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,290 @@
+"""
+Regression tests for backend/libs/areng_vmfMerge/merge.py
+
+Run with: python -m unittest discover -s backend/__tests__ -p "test_*.py"
+"""
+
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "libs", "areng_vmfMerge"))
+
+try:
+    from srctools import VMF, Vec
+    import merge
+except ImportError:
+    merge = None
+
+
+def overlaps(a, b):
+    """Whether two layout cells overlap"""
+    return (a['cellX'] < b['cellX'] + b['cellWidth'] and b['cellX'] < a['cellX'] + a['cellWidth']
+            and a['cellY'] < b['cellY'] + b['cellHeight'] and b['cellY'] < a['cellY'] + a['cellHeight'])
+
+
+def write_vmf(path, brush_origins, entity_origins=()):
+    """Write a VMF with a 16-unit cube brush at each origin and a prop at each entity origin"""
+    vmf = VMF()
+    for origin in brush_origins:
+        start = Vec(*origin)
+        vmf.add_brush(vmf.make_prism(start, start + Vec(16, 16, 16)).solid)
+    for origin in entity_origins:
+        vmf.create_ent('prop_static', origin=f"{origin[0]} {origin[1]} {origin[2]}", model="models/a.mdl")
+    with open(path, 'w') as f:
+        vmf.export(f)
+    return vmf
+
+
+@unittest.skipIf(merge is None, "srctools is not installed")
+class MergeGridTests(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = tmp.name
+        self.paths = []
+        for index in range(3):
+            path = os.path.join(self.dir, f"item{index}.vmf")
+            write_vmf(path, [(0, 0, 0), (64 * (index + 1), 32, 0)], [(8, 8, 8)])
+            self.paths.append(path)
+
+    def merge(self, **kwargs):
+        """Merge self.paths; incremental=True opts in to keeping the fragments for the next merge"""
+        output = os.path.join(self.dir, "combined.vmf")
+        if kwargs.pop('incremental', False):
+            kwargs['previous_layout'] = os.path.join(self.dir, "combined_layout.json")
+        with contextlib.redirect_stdout(io.StringIO()):
+            return merge.merge_vmfs_grid(self.paths, output, 256, **kwargs)
+
+    def test_parses_each_input_once(self):
+        with mock.patch.object(merge.VMF, 'parse', wraps=merge.VMF.parse) as parse:
+            result = self.merge(workers=1)
+        self.assertEqual(parse.call_count, len(self.paths))
+        self.assertEqual(result['timings']['parses'], len(self.paths))
+
+    def test_parses_serially_by_default(self):
+        with mock.patch.object(merge, 'ProcessPoolExecutor') as pool:
+            result = self.merge()
+        pool.assert_not_called()
+        self.assertEqual(result['timings']['workers'], 1)
+
+    def test_merged_contents_follow_layout(self):
+        result = self.merge(workers=1)
+        with open(result['layout']) as f:
+            layout = json.load(f)
+        self.assertEqual([item['name'] for item in layout['layout']], ["item0", "item1", "item2"])
+
+        merged = VMF.parse(result['output'])
+        self.assertEqual(len(merged.brushes), 6)
+        self.assertEqual(len(list(merged.by_class['prop_static'])), 3)
+
+        # Every item's bounds land inside its own cell, with the gutter around them
+        for item in layout['layout']:
+            bounds = item['bounds']
+            self.assertEqual(item['cellWidth'], bounds['maxX'] - bounds['minX'] + 256)
+            self.assertEqual(item['cellHeight'], bounds['maxY'] - bounds['minY'] + 256)
+            self.assertGreaterEqual(bounds['minX'], item['cellX'])
+            self.assertLessEqual(bounds['maxX'], item['cellX'] + item['cellWidth'])
+            self.assertGreaterEqual(bounds['minY'], item['cellY'])
+            self.assertLessEqual(bounds['maxY'], item['cellY'] + item['cellHeight'])
+
+    def test_cells_are_packed_tighter_than_the_grid(self):
+        # One tall item used to size every cell
+        write_vmf(self.paths[0], [(0, 0, 0), (0, 0, 1024)])
+        for index in range(3, 6):
+            path = os.path.join(self.dir, f"item{index}.vmf")
+            write_vmf(path, [(0, 0, 0), (32 * index, 0, 0)])
+            self.paths.append(path)
+
+        result = self.merge(workers=1)
+        with open(result['layout']) as f:
+            layout = json.load(f)
+        items = layout['layout']
+        for a in items:
+            self.assertFalse(any(overlaps(a, b) for b in items if b is not a))
+        self.assertEqual(layout['area'], layout['width'] * layout['height'])
+        self.assertLess(layout['area'], layout['gridArea'])
+        self.assertEqual(result['areaReduction'], round((1 - layout['area'] / layout['gridArea']) * 100, 1))
+
+    def test_scan_bounds(self):
+        path = os.path.join(self.dir, "mixed.vmf")
+        vmf = VMF()
+        vmf.add_brush(vmf.make_prism(Vec(-40, 0, 0), Vec(16, 24, 8)).solid)
+        hidden = vmf.make_prism(Vec(0, -300, 0), Vec(8, 8, 8)).solid
+        hidden.hidden = True
+        vmf.add_brush(hidden)
+        # Hidden world brushes and entities count; brush entity solids and bad origins do not
+        vmf.create_ent('func_detail').solids.append(vmf.make_prism(Vec(900, 900, 900), Vec(999, 999, 999)).solid)
+        vmf.create_ent('prop_static', origin="0 0 500").hidden = True
+        vmf.create_ent('light', origin="not a vector")
+        with open(path, 'w') as f:
+            vmf.export(f)
+
+        self.assertEqual(tuple(merge.scan_vmf(path)['bounds']), (-40, 16, -300, 24, 0, 500))
+
+        with open(path, 'w') as f:
+            VMF().export(f)
+        self.assertEqual(tuple(merge.scan_vmf(path)['bounds']), (0, 128, 0, 128, 0, 128))
+
+    def test_merged_ids_are_unique(self):
+        # Every input starts numbering from 1; overlays point at side IDs
+        for path in self.paths:
+            vmf = write_vmf(path, [(0, 0, 0), (64, 32, 0)], [(8, 8, 8)])
+            vmf.create_ent('info_overlay', origin="0 0 16", sides=str(vmf.brushes[1].sides[0].id))
+            with open(path, 'w') as f:
+                vmf.export(f)
+
+        merged = VMF.parse(self.merge(workers=1)['output'], preserve_ids=True)
+        solids = list(merged.brushes)
+        sides = [side.id for solid in solids for side in solid.sides]
+        entities = [ent.id for ent in merged.entities]
+        self.assertEqual(len({solid.id for solid in solids}), len(solids))
+        self.assertEqual(len(set(sides)), len(sides))
+        self.assertEqual(len(set(entities)), len(entities))
+
+        overlays = list(merged.by_class['info_overlay'])
+        self.assertEqual(len(overlays), 3)
+        for overlay in overlays:
+            side_id = int(overlay['sides'])
+            owner = next(solid for solid in solids if side_id in [side.id for side in solid.sides])
+            self.assertEqual(owner.sides[0].id, side_id)
+            self.assertEqual(solids.index(owner) % 2, 1)
+
+    def test_parallel_load_keeps_input_order(self):
+        serial = self.merge(workers=1)
+        with open(serial['output']) as f:
+            serial_text = f.read()
+        parallel = self.merge(workers=2)
+        with open(parallel['output']) as f:
+            self.assertEqual(f.read(), serial_text)
+
+    def test_incremental_merge_only_parses_changed_inputs(self):
+        first = self.merge(workers=1, incremental=True)
+        previous = first['layout']
+
+        with mock.patch.object(merge.VMF, 'parse', wraps=merge.VMF.parse) as parse:
+            unchanged = self.merge(workers=1, previous_layout=previous)
+        self.assertEqual(parse.call_count, 0)
+        self.assertTrue(unchanged['incremental'])
+        self.assertEqual(unchanged['dirtyCells'], [])
+
+        # Move the item without resizing it; only its cell is rebuilt
+        write_vmf(self.paths[1], [(8, 0, 0), (136, 32, 0)], [(16, 8, 8)])
+        with mock.patch.object(merge.VMF, 'parse', wraps=merge.VMF.parse) as parse:
+            changed = self.merge(workers=1, previous_layout=previous)
+        self.assertEqual(parse.call_count, 1)
+        self.assertEqual(changed['dirtyCells'], [1])
+        with open(changed['output']) as f:
+            incremental_text = f.read()
+
+        # Same result as merging everything from scratch
+        os.remove(previous)
+        full = self.merge(workers=1)
+        self.assertFalse(full['incremental'])
+        with open(full['output']) as f:
+            self.assertEqual(f.read(), incremental_text)
+
+    def test_new_input_takes_a_removed_cell(self):
+        previous = self.merge(workers=1, incremental=True)['layout']
+        with open(previous) as f:
+            removed = json.load(f)['layout'][1]
+        added = os.path.join(self.dir, "item3.vmf")
+        write_vmf(added, [(0, 0, 0)])
+        self.paths = [self.paths[0], self.paths[2], added]
+
+        result = self.merge(workers=1, previous_layout=previous)
+        with open(result['layout']) as f:
+            layout = json.load(f)
+        # item2 keeps its cell but moves up to input 1
+        self.assertEqual(result['dirtyCells'], [1, 2])
+        self.assertEqual(result['timings']['parses'], 1)
+        self.assertEqual(result['removedCells'], ["item1"])
+        added = layout['layout'][2]
+        self.assertEqual(merge.cell_rect(added), merge.cell_rect(removed))
+        self.assertEqual(added['slot'], removed['slot'])
+        self.assertEqual([item['slot'] for item in layout['layout']], [0, 2, 1])
+
+    def test_outgrown_cell_moves_alone(self):
+        previous = self.merge(workers=1, incremental=True)['layout']
+        write_vmf(self.paths[0], [(0, 0, 0), (512, 0, 0)])
+        result = self.merge(workers=1, previous_layout=previous)
+        self.assertTrue(result['incremental'])
+        self.assertEqual(result['dirtyCells'], [0])
+        self.assertEqual(result['timings']['parses'], 1)
+
+        with open(result['layout']) as f:
+            items = json.load(f)['layout']
+        self.assertEqual(items[0]['cellWidth'], 528 + 256)
+        self.assertFalse(any(overlaps(items[0], item) for item in items[1:]))
+
+    def test_repeated_input_keeps_one_cell_per_occurrence(self):
+        self.paths = [self.paths[0], self.paths[1], self.paths[0]]
+        first = self.merge(workers=1, incremental=True)
+        with open(first['output']) as f:
+            full_text = f.read()
+
+        with mock.patch.object(merge.VMF, 'parse', wraps=merge.VMF.parse) as parse:
+            again = self.merge(workers=1, previous_layout=first['layout'])
+        self.assertEqual(parse.call_count, 0)
+        self.assertEqual((again['dirtyCells'], again['removedCells']), ([], []))
+        with open(again['output']) as f:
+            self.assertEqual(f.read(), full_text)
+
+        merged = VMF.parse(again['output'], preserve_ids=True)
+        solids = list(merged.brushes)
+        self.assertEqual(len(solids), 6)
+        self.assertEqual(len({solid.id for solid in solids}), 6)
+        with open(again['layout']) as f:
+            items = json.load(f)['layout']
+        self.assertEqual(len({item['part'] for item in items}), 3)
+        self.assertFalse(overlaps(items[0], items[2]))
+
+    def test_layout_without_version_or_keys_is_merged_in_full(self):
+        previous = self.merge(workers=1, incremental=True)['layout']
+        parts_dir = os.path.join(self.dir, "combined_parts")
+        with open(previous) as f:
+            self.assertEqual(json.load(f)['version'], merge.LAYOUT_VERSION)
+
+        stale_edits = (
+            lambda layout: layout.pop('version'),
+            lambda layout: layout.update(version=merge.LAYOUT_VERSION - 1),
+            lambda layout: layout.pop('shell'),
+            lambda layout: layout['layout'][1].pop('bounds'),
+        )
+        for edit in stale_edits:
+            self.assertIsNotNone(merge.load_previous_layout(previous, parts_dir, 256))
+            with open(previous) as f:
+                layout = json.load(f)
+            edit(layout)
+            with open(previous, 'w') as f:
+                json.dump(layout, f)
+            self.assertIsNone(merge.load_previous_layout(previous, parts_dir, 256))
+            result = self.merge(workers=1, previous_layout=previous)
+            self.assertFalse(result['incremental'])
+            self.assertEqual(result['dirtyCells'], [0, 1, 2])
+
+    def test_fragments_are_kept_only_for_incremental_merges(self):
+        parts_dir = os.path.join(self.dir, "combined_parts")
+        self.merge(workers=1)
+        self.assertFalse(os.path.exists(parts_dir))
+        self.merge(workers=1, incremental=True)
+        self.assertEqual(len(os.listdir(parts_dir)), 2 * len(self.paths) + 1)
+
+    def test_sparse_layout_is_packed_again(self):
+        previous = self.merge(workers=1, incremental=True)['layout']
+        self.paths = self.paths[:1]
+        result = self.merge(workers=1, previous_layout=previous)
+        self.assertFalse(result['incremental'])
+        self.assertEqual(result['dirtyCells'], [0])
+        with open(result['layout']) as f:
+            item = json.load(f)['layout'][0]
+        self.assertEqual((item['cellX'], item['cellY']), (0, 0))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -11,6 +11,29 @@ const { Instance } = require("../items/Instance")
 const { fixInstancePath } = require("./instanceHandlers")
 const { closeAllModelPreviewWindows } = require("../items/itemEditor")
 
+// Collision simplification for the generated 3DS models, overridable through
+// the conversion options. Welding exact duplicates (tolerance 0) and dropping
+// degenerate faces doesn't change the collision shape, so it is always on;
+// decimation and hull/box shapes are opt-in
+const DEFAULT_COLLISION_OPTIONS = {
+    collisionWeld: 0,
+    collisionDecimate: null,
+    collisionMaxError: null,
+    collisionShape: "mesh",
+    collisionPieces: null,
+}
+
+/**
+ * Pick the collision options for convertAndInstallMDL out of the conversion options
+ */
+function getCollisionOptions(options = {}) {
+    const collision = {}
+    for (const [key, value] of Object.entries(DEFAULT_COLLISION_OPTIONS)) {
+        collision[key] = options[key] ?? value
+    }
+    return collision
+}
+
 /**
  * Helper to create directory with retry logic for EPERM errors
  */
@@ -119,7 +142,10 @@ function register(ipcMain, mainWindow) {
                         objPath,
                         item.packagePath,
                         itemName,
-                        { scale: options.scale || 1.0 },
+                        {
+                            scale: options.scale || 1.0,
+                            ...getCollisionOptions(options),
+                        },
                     )
 
                     if (mdlResult.success && mdlResult.relativeModelPath) {
@@ -283,6 +309,7 @@ async function handleDefaultConversion(event, item, options) {
 
         mdlResult = await convertAndInstallMDL(objPath, item.packagePath, itemName, {
             scale: options.scale || 1.0,
+            ...getCollisionOptions(options),
         })
 
         if (mdlResult.success && mdlResult.relativeModelPath) {
@@ -389,7 +416,12 @@ async function handleAtlasConversion(event, item, instanceKey, finalInstanceMap,
         return { success: false, error: "No valid VMF files found" }
     }
 
-    const { mergeVMFsIntoGrid, splitOBJByGrid } = require("../utils/vmfAtlas")
+    const {
+        mergeVMFsIntoGrid,
+        splitOBJByGrid,
+        canSplitAtlas,
+        splitAtlasOBJ,
+    } = require("../utils/vmfAtlas")
     const combinedVmfPath = path.join(tempDir, `${item.id}_combined.vmf`)
 
     const atlasResult = await mergeVMFsIntoGrid(vmfFiles, combinedVmfPath, {
@@ -419,13 +451,41 @@ async function handleAtlasConversion(event, item, instanceKey, finalInstanceMap,
         message: "Splitting combined model into individual variants...",
     })
 
-    const splitResults = await splitOBJByGrid(
-        combinedObjPath,
-        atlasResult.gridLayout,
-        tempDir,
-        atlasResult.bounds.cellSize,
-        { namePrefix: itemName },
-    )
+    const splitInProcess = () =>
+        splitOBJByGrid(
+            combinedObjPath,
+            atlasResult.gridLayout,
+            tempDir,
+            undefined, // cells carry their own packed size
+            { namePrefix: itemName },
+        )
+
+    let splitResults
+    if (!(await canSplitAtlas())) {
+        console.log("Bundled converter has no atlas splitter, splitting in-process")
+        splitResults = await splitInProcess()
+    } else {
+        try {
+            // modelsDir persists between conversions, so cells an incremental
+            // merge left untouched keep their split files from the last run
+            splitResults = await splitAtlasOBJ(
+                combinedObjPath,
+                atlasResult.layoutPath,
+                tempDir,
+                {
+                    namePrefix: itemName,
+                    dirtyCells: atlasResult.incremental
+                        ? atlasResult.dirtyCells
+                        : null,
+                },
+            )
+        } catch (splitError) {
+            console.warn(
+                `Bundled splitter failed (${splitError.message}), splitting in-process`,
+            )
+            splitResults = await splitInProcess()
+        }
+    }
 
     // Convert materials once (shared)
     const { convertMaterialsToPackage } = require("../utils/mdlConverter")
@@ -473,6 +533,7 @@ async function handleAtlasConversion(event, item, instanceKey, finalInstanceMap,
                     skipMaterialConversion: true,
                     sharedMaterialsPath: sharedMaterialsPath,
                     sharedModelFolder: sharedFolderName,
+                    ...getCollisionOptions(options),
                 },
             )
 
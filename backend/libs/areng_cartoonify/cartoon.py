@@ -1,46 +1,604 @@
 import cv2
+import numpy as np
 import sys
 import os
+import argparse
+import functools
+import hashlib
+import math
+import multiprocessing
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
-def cartoonify_image(image_path):
-    img = cv2.imread(image_path)
-    if img is None:
-        raise ValueError(f"Can't load image: {image_path}")
+# Fast mode filters at most this many pixels along the longest side, and never
+# above half resolution
+FAST_MAX_SIDE = 1024
+FAST_MAX_SCALE = 0.5
+# Guided upsampling regularisation (on 0..1 intensities): only edges with more
+# contrast than ~0.03 are carried over from the full resolution image
+GUIDE_EPS = 0.001
+# Fast mode is lossy: on detailed, noisy textures it lands around 29-30 dB PSNR
+# and 0.97 SSIM against the reference pipeline (see quality_report), while
+# smooth ones come out near identical. --compare flags any image below these,
+# the point where differences start to show
+FAST_MIN_PSNR = 35.0
+FAST_MIN_SSIM = 0.98
+# Bump whenever the filter output changes so stale cache entries are never reused
+FILTER_VERSION = 4
+DEFAULT_CACHE_SIZE_MB = 512
+# Power-of-two output bounds, matching the VTF converter's texture sizes
+POW2_MIN_SIZE = 64
+POW2_MAX_SIZE = 512
+# Output path that streams raw RGBA to stdout instead of writing a file
+RAW_OUTPUT = "-"
+# Tiled mode: the halo must cover everything a pixel's result depends on. The five
+# bilateral passes reach 5 * 4 px; the recursive edge-preserving filter decays
+# exponentially and drops below rounding error within ~6 * sigma_s (60).
+TILE_HALO = 5 * 4 + 6 * 60
+# Approximate filter working set per tile pixel (uint8 copies plus the float32
+# buffers edgePreservingFilter allocates internally)
+TILE_BYTES_PER_PIXEL = 96
+MIN_TILE_SIZE = 256
+# Smallest --max-memory that fits one MIN_TILE_SIZE tile and its halo
+MIN_MAX_MEMORY_MB = math.ceil((MIN_TILE_SIZE + 2 * TILE_HALO) ** 2 * TILE_BYTES_PER_PIXEL / (1024 * 1024))
+# Fast mode's full resolution guided filter works on row strips; its float32
+# buffers take roughly this much per strip pixel
+FAST_BYTES_PER_PIXEL = 48
+MIN_STRIP_ROWS = 32
 
-    # Smooth the colors
+def smooth_filters(img, d=9, sigma_space=90, sigma_s=60):
+    """Five bilateral passes and a soft edge-preserving filter"""
     color = img.copy()
     for _ in range(5):
-        color = cv2.bilateralFilter(color, d=9, sigmaColor=90, sigmaSpace=90)
+        color = cv2.bilateralFilter(color, d=d, sigmaColor=90, sigmaSpace=sigma_space)
+    return cv2.edgePreservingFilter(color, flags=1, sigma_s=sigma_s, sigma_r=0.4)
+
+def smooth_colors(img):
+    """Reference smoothing: five bilateral passes and an edge-preserving filter"""
+    return smooth_filters(img)
+
+def filter_halo(d=9, sigma_space=90, sigma_s=60):
+    """How far (px) the result of smooth_filters reaches, as TILE_HALO"""
+    return 5 * (d // 2) + int(math.ceil(6 * sigma_s))
+
+def guided_filter(guide, src, radius, eps):
+    """Grey-guide guided filter (He et al.) built from box filters"""
+    ksize = (2 * radius + 1, 2 * radius + 1)
+    mean_i = cv2.boxFilter(guide, -1, ksize)
+    var_i = cv2.boxFilter(guide * guide, -1, ksize) - mean_i * mean_i
+
+    out = np.empty_like(src)
+    for c in range(src.shape[2]):
+        p = src[..., c]
+        mean_p = cv2.boxFilter(p, -1, ksize)
+        cov_ip = cv2.boxFilter(guide * p, -1, ksize) - mean_i * mean_p
+        a = cov_ip / (var_i + eps)
+        b = mean_p - a * mean_i
+        out[..., c] = cv2.boxFilter(a, -1, ksize) * guide + cv2.boxFilter(b, -1, ksize)
+    return out
+
+def fast_scale(height, width):
+    """Downscale factor smooth_colors_fast filters at"""
+    return min(FAST_MAX_SCALE, FAST_MAX_SIDE / max(height, width))
+
+def fast_filters(scale):
+    """smooth_filters parameters scaled to match an image downscaled by scale"""
+    return {
+        "d": max(3, int(round(9 * scale)) | 1),
+        "sigma_space": 90 * scale,
+        "sigma_s": max(1.0, 60 * scale),
+    }
+
+def guide_radius(scale):
+    return max(2, int(round(1 / scale)))
+
+def downscale(img, scale):
+    height, width = img.shape[:2]
+    small_size = (max(1, round(width * scale)), max(1, round(height * scale)))
+    return cv2.resize(img, small_size, interpolation=cv2.INTER_AREA)
 
-    # Soft edge-preserving filter
-    smooth = cv2.edgePreservingFilter(color, flags=1, sigma_s=60, sigma_r=0.4)
+def upsample_rows(small, width, height, top, bottom):
+    """
+    Rows [top, bottom) of small bilinearly resized to width x height, as float32
+    in 0..1. Sample positions follow cv2.INTER_LINEAR (pixel centres, clamped
+    edges), and any band of rows comes out the same as the full image would.
+    """
+    def taps(start, stop, src_size, dst_size):
+        pos = (np.arange(start, stop, dtype=np.float64) + 0.5) * (src_size / dst_size) - 0.5
+        pos = np.clip(pos, 0, src_size - 1)
+        low = np.floor(pos).astype(np.intp)
+        high = np.minimum(low + 1, src_size - 1)
+        return low, high, (pos - low).astype(np.float32)
 
-    # Boost saturation and brightness
+    y0, y1, wy = taps(top, bottom, small.shape[0], height)
+    x0, x1, wx = taps(0, width, small.shape[1], width)
+    src = small.astype(np.float32) / 255.0
+    rows = src[y0] * (1 - wy)[:, None, None] + src[y1] * wy[:, None, None]
+    return rows[:, x0] * (1 - wx)[None, :, None] + rows[:, x1] * wx[None, :, None]
+
+def guided_rows(img, color, scale, top, bottom):
+    """
+    Rows [top, bottom) of smooth_colors_fast, given the filtered small image.
+
+    The guided filter's box filters reach 2 * radius, so only that many
+    neighbouring rows are read on either side.
+    """
+    height, width = img.shape[:2]
+    radius = guide_radius(scale)
+    low = max(0, top - 2 * radius)
+    high = min(height, bottom + 2 * radius)
+    guide = cv2.cvtColor(np.ascontiguousarray(img[low:high]), cv2.COLOR_BGR2GRAY).astype(np.float32) / 255.0
+    smooth = guided_filter(guide, upsample_rows(color, width, height, low, high), radius, GUIDE_EPS)
+    return np.clip(smooth[top - low:bottom - low] * 255.0 + 0.5, 0, 255).astype(np.uint8)
+
+def smooth_colors_fast(img):
+    """
+    Approximate smooth_colors at a fraction of the cost. Lossy: fine detail
+    and noise are smoothed at the reduced resolution (see FAST_MIN_PSNR).
+
+    The same filters run on a downscaled copy with their spatial parameters
+    scaled to match, then the result is upsampled and snapped back to the
+    full resolution edges with a guided filter.
+    """
+    height = img.shape[0]
+    scale = fast_scale(*img.shape[:2])
+    color = smooth_filters(downscale(img, scale), **fast_filters(scale))
+    return guided_rows(img, color, scale, 0, height)
+
+def boost_colors(smooth):
+    """Boost saturation and brightness"""
     hsv = cv2.cvtColor(smooth, cv2.COLOR_BGR2HSV)
     hsv[...,1] = cv2.subtract(hsv[...,1], 10)  # decrease saturation
     hsv[...,2] = cv2.add(hsv[...,2], 40)  # brightness
-    cartoon = cv2.cvtColor(hsv, cv2.COLOR_HSV2BGR)
+    return cv2.cvtColor(hsv, cv2.COLOR_HSV2BGR)
+
+def cartoonify(img, fast=False):
+    """Return the cartoonified version of a BGR image"""
+    return boost_colors(smooth_colors_fast(img) if fast else smooth_colors(img))
+
+def megabytes(n):
+    return math.ceil(n / (1024 * 1024))
+
+def tile_size_for_budget(max_bytes, halo=TILE_HALO):
+    """
+    Largest square tile whose padded working set fits in max_bytes.
+    Raises ValueError when not even a MIN_TILE_SIZE tile fits.
+    """
+    tile = int(math.sqrt(max_bytes / TILE_BYTES_PER_PIXEL)) - 2 * halo
+    if tile < MIN_TILE_SIZE:
+        needed = (MIN_TILE_SIZE + 2 * halo) ** 2 * TILE_BYTES_PER_PIXEL
+        raise ValueError(f"Memory budget of {megabytes(max_bytes)} MB is too small for tiling "
+                         f"(needs at least {megabytes(needed)} MB)")
+    return tile
+
+def strip_rows_for_budget(max_bytes, width, reach):
+    """
+    Most rows of a full-width strip whose working set, including reach rows
+    either side, fits in max_bytes. Raises ValueError below MIN_STRIP_ROWS.
+    """
+    rows = max_bytes // (width * FAST_BYTES_PER_PIXEL) - 2 * reach
+    if rows < MIN_STRIP_ROWS:
+        needed = (MIN_STRIP_ROWS + 2 * reach) * width * FAST_BYTES_PER_PIXEL
+        raise ValueError(f"Memory budget of {megabytes(max_bytes)} MB is too small for a "
+                         f"{width} px wide image (needs at least {megabytes(needed)} MB)")
+    return rows
+
+def filter_tiled(img, filter_fn, halo, tile, out=None):
+    """
+    Apply a local filter in square tiles.
+
+    Each tile is filtered together with a halo border of real neighbouring
+    pixels and only its centre is kept, so the stitched result matches
+    filtering the whole image to within rounding.
+    """
+    height, width = img.shape[:2]
+    out = np.empty_like(img) if out is None else out
+    for y0 in range(0, height, tile):
+        y1 = min(y0 + tile, height)
+        top = max(0, y0 - halo)
+        bottom = min(height, y1 + halo)
+        for x0 in range(0, width, tile):
+            x1 = min(x0 + tile, width)
+            left = max(0, x0 - halo)
+            right = min(width, x1 + halo)
+
+            result = filter_fn(np.ascontiguousarray(img[top:bottom, left:right]))
+            out[y0:y1, x0:x1] = result[y0 - top:y1 - top, x0 - left:x1 - left]
+    return out
+
+def filter_within_budget(img, filter_fn, halo, max_bytes, out=None):
+    """Apply a local filter to the whole image if it fits in max_bytes, else in tiles"""
+    height, width = img.shape[:2]
+    if height * width * TILE_BYTES_PER_PIXEL > max_bytes:
+        return filter_tiled(img, filter_fn, halo, tile_size_for_budget(max_bytes, halo), out)
+    out = np.empty_like(img) if out is None else out
+    out[:] = filter_fn(np.ascontiguousarray(img))
+    return out
+
+def cartoonify_tiled(img, max_bytes, fast=False, out=None):
+    """
+    Cartoonify an image while keeping the filter working memory under max_bytes.
+
+    The reference filter runs in overlapping tiles (see filter_tiled). Fast
+    mode filters its downscaled copy the same way and runs the full
+    resolution guided upsampling in row strips. img and out may be disk
+    backed (see disk_array); only tiles and strips are read into memory.
+
+    Raises ValueError when the budget is too small for the image.
+    """
+    height, width = img.shape[:2]
+    out = np.empty_like(img) if out is None else out
+    if not fast:
+        return filter_within_budget(img, cartoonify, TILE_HALO, max_bytes, out)
+
+    scale = fast_scale(height, width)
+    filters = fast_filters(scale)
+    color = filter_within_budget(downscale(img, scale), functools.partial(smooth_filters, **filters),
+                         filter_halo(**filters), max_bytes)
+    rows = strip_rows_for_budget(max_bytes, width, 2 * guide_radius(scale))
+    for top in range(0, height, rows):
+        bottom = min(top + rows, height)
+        out[top:bottom] = boost_colors(guided_rows(img, color, scale, top, bottom))
+    return out
+
+def disk_array(like, copy=True):
+    """
+    Array shaped like another but backed by an anonymous temporary file instead
+    of memory, holding a copy of its pixels unless copy is False.
+    """
+    with tempfile.TemporaryFile() as f:
+        # The mapping keeps its own handle; the file goes away with the array
+        array = np.memmap(f, dtype=like.dtype, mode="w+", shape=like.shape)
+    if copy:
+        array[:] = like
+    return array
+
+def ssim(a, b):
+    """Mean structural similarity of two BGR images, computed on luma"""
+    a = cv2.cvtColor(a, cv2.COLOR_BGR2GRAY).astype(np.float64)
+    b = cv2.cvtColor(b, cv2.COLOR_BGR2GRAY).astype(np.float64)
+    c1 = (0.01 * 255) ** 2
+    c2 = (0.03 * 255) ** 2
+
+    def blur(x):
+        return cv2.GaussianBlur(x, (11, 11), 1.5)
+
+    mu_a = blur(a)
+    mu_b = blur(b)
+    var_a = blur(a * a) - mu_a * mu_a
+    var_b = blur(b * b) - mu_b * mu_b
+    cov = blur(a * b) - mu_a * mu_b
+    ssim_map = ((2 * mu_a * mu_b + c1) * (2 * cov + c2)) / \
+        ((mu_a * mu_a + mu_b * mu_b + c1) * (var_a + var_b + c2))
+    return float(ssim_map.mean())
+
+def quality_report(img, result, max_bytes=None):
+    """PSNR/SSIM of a fast-mode result against the reference pipeline"""
+    reference = cartoonify_tiled(img, max_bytes) if max_bytes else cartoonify(img, fast=False)
+    return cv2.PSNR(reference, result), ssim(reference, result)
+
+def within_tolerance(quality):
+    """Whether a quality_report meets FAST_MIN_PSNR and FAST_MIN_SSIM"""
+    psnr, similarity = quality
+    return psnr >= FAST_MIN_PSNR and similarity >= FAST_MIN_SSIM
+
+def next_power_of_two(n):
+    return 1 << max(0, int(n) - 1).bit_length()
+
+def target_dimensions(width, height, size=None, pow2=False, min_size=POW2_MIN_SIZE,
+                      max_size=POW2_MAX_SIZE):
+    """
+    Output (width, height) for the requested resize.
+
+    size is an explicit (width, height). pow2 squares the image to the next power
+    of two of its longest side, clamped to [min_size, max_size], matching what
+    the VTF converter expects.
+    """
+    if size:
+        return size
+    if pow2:
+        target = min(max(next_power_of_two(max(width, height)), min_size), max_size)
+        return target, target
+    return width, height
+
+def resize_to(img, dimensions):
+    height, width = img.shape[:2]
+    if (width, height) == tuple(dimensions):
+        return img
+    shrinking = dimensions[0] * dimensions[1] < width * height
+    interpolation = cv2.INTER_AREA if shrinking else cv2.INTER_LINEAR
+    return cv2.resize(img, tuple(dimensions), interpolation=interpolation)
+
+def load_image(image_path):
+    """Decode an image to 8-bit BGR, or BGRA when it has an alpha channel"""
+    img = cv2.imread(image_path, cv2.IMREAD_UNCHANGED)
+    if img is None:
+        raise ValueError(f"Can't load image: {image_path}")
+    if img.dtype == np.uint16:
+        img = (img >> 8).astype(np.uint8)
+    elif img.dtype != np.uint8:
+        img = np.clip(img * 255.0 + 0.5, 0, 255).astype(np.uint8)
+    if img.ndim == 2:
+        img = cv2.cvtColor(img, cv2.COLOR_GRAY2BGR)
+    return img
 
-    # Overwrite original
-    cv2.imwrite(image_path, cartoon)
-    return True
+def write_raw_rgba(img, stream=None):
+    """Write an "RGBA <width> <height>" header line followed by the raw pixel bytes"""
+    stream = stream or sys.stdout.buffer
+    has_alpha = img.ndim == 3 and img.shape[2] == 4
+    rgba = cv2.cvtColor(img, cv2.COLOR_BGRA2RGBA if has_alpha else cv2.COLOR_BGR2RGBA)
+    height, width = rgba.shape[:2]
+    stream.write(f"RGBA {width} {height}\n".encode("ascii"))
+    stream.write(np.ascontiguousarray(rgba).data)
+    stream.flush()
+
+def write_output(img, output_path):
+    """Encode to output_path, or stream raw RGBA to stdout when output_path is "-" """
+    if output_path == RAW_OUTPUT:
+        write_raw_rgba(img)
+    elif not cv2.imwrite(output_path, img):
+        raise ValueError(f"Can't write image: {output_path}")
+
+def cache_key(img, fast, dimensions, max_memory=None):
+    """Content address of an image plus every parameter that affects the output"""
+    # Tiled results can differ from whole-image ones by rounding, and the tiling depends on the budget
+    digest = hashlib.sha256()
+    digest.update(f"v{FILTER_VERSION};fast={int(fast)};size={dimensions};max_memory={max_memory};"
+                  f"{img.shape};{img.dtype};".encode())
+    digest.update(np.ascontiguousarray(img).data)
+    return digest.hexdigest()
+
+def cache_entry_path(cache_dir, key, output_path):
+    # Entries keep the output extension so a hit is a plain file copy
+    ext = ".png" if output_path == RAW_OUTPUT else os.path.splitext(output_path)[1].lower() or ".png"
+    return os.path.join(cache_dir, key[:2], key + ext)
+
+def store_in_cache(entry_path, img, output_path):
+    os.makedirs(os.path.dirname(entry_path), exist_ok=True)
+    tmp_path = f"{entry_path}.{os.getpid()}.tmp{os.path.splitext(entry_path)[1]}"
+    if output_path == RAW_OUTPUT:
+        cv2.imwrite(tmp_path, img)
+    else:
+        shutil.copyfile(output_path, tmp_path)
+    os.replace(tmp_path, entry_path)
+
+def prune_cache(cache_dir, max_bytes):
+    """Evict least recently used entries until the cache fits in max_bytes"""
+    entries = []
+    total = 0
+    for root, _dirs, files in os.walk(cache_dir):
+        for name in files:
+            path = os.path.join(root, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+
+    entries.sort()
+    for _mtime, size, path in entries:
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+            total -= size
+        except OSError:
+            pass
+
+def cartoonify_image(image_path, fast=False, compare=False, cache_dir=None, output_path=None,
+                     size=None, pow2=False, max_memory=None):
+    """
+    Cartoonify an image in a single decode/filter/resize/encode pass.
+
+    Args:
+        image_path: Image to read
+        fast: Use the approximate filter (see smooth_colors_fast)
+        compare: With fast, also measure PSNR/SSIM against the reference filter
+        cache_dir: Directory of the content-addressed result cache
+        output_path: Where to write the result (default: overwrite image_path);
+                     "-" streams raw RGBA to stdout instead. Alpha is kept
+                     wherever the output format can hold it
+        size: Explicit output (width, height)
+        pow2: Square the output to a power of two (see target_dimensions)
+        max_memory: Filter working memory budget in bytes; larger images are
+                    processed in tiles (see cartoonify_tiled) and the full size
+                    input and result are kept in temporary files. Decoding and
+                    encoding still need the whole image in memory.
+
+    Returns:
+        (quality, cache_hit): PSNR/SSIM when comparing a fast result (else None),
+        and whether the result came from the cache (None when not caching)
+    """
+    output_path = output_path or image_path
+
+    img = load_image(image_path)
+
+    height, width = img.shape[:2]
+    dimensions = target_dimensions(width, height, size, pow2)
+
+    entry_path = None
+    if cache_dir:
+        entry_path = cache_entry_path(cache_dir, cache_key(img, fast, dimensions, max_memory), output_path)
+        if os.path.exists(entry_path):
+            if output_path == RAW_OUTPUT:
+                write_raw_rgba(load_image(entry_path))
+            else:
+                shutil.copyfile(entry_path, output_path)
+            # Touch the entry so eviction treats it as recently used
+            os.utime(entry_path)
+            return None, True
+
+    # Only the colour is filtered; alpha is carried over and resized with it
+    alpha = None
+    if img.shape[2] == 4:
+        img, alpha = np.ascontiguousarray(img[..., :3]), img[..., 3]
+
+    if max_memory:
+        img = disk_array(img)
+        alpha = disk_array(alpha) if alpha is not None else None
+        cartoon = cartoonify_tiled(img, max_memory, fast, out=disk_array(img, copy=False))
+    else:
+        cartoon = cartoonify(img, fast)
+    quality = quality_report(img, cartoon, max_memory) if fast and compare else None
+    cartoon = resize_to(cartoon, dimensions)
+    if alpha is not None:
+        cartoon = np.dstack((cartoon, resize_to(alpha, dimensions)))
+
+    write_output(cartoon, output_path)
+
+    if entry_path:
+        store_in_cache(entry_path, cartoon, output_path)
+        return quality, False
+    return quality, None
+
+def process_image(image_path, output_path=None, **options):
+    """Cartoonify one image, returning (success, message, cache_hit) for the progress line"""
+    try:
+        if os.path.exists(image_path):
+            quality, cache_hit = cartoonify_image(image_path, output_path=output_path, **options)
+            message = os.path.basename(image_path)
+            if cache_hit:
+                message += " (cached)"
+            if quality is not None:
+                message += f" (PSNR {quality[0]:.2f} dB, SSIM {quality[1]:.4f})"
+                if not within_tolerance(quality):
+                    message += f" below fast mode tolerance ({FAST_MIN_PSNR} dB, {FAST_MIN_SSIM})"
+            return True, message, cache_hit
+        return False, f"File not found: {image_path}", None
+    except Exception as e:
+        return False, f"{image_path}: {str(e)}", None
+
+def init_worker():
+    # Each worker already owns a core, so keep OpenCV from spawning its own threads
+    cv2.setNumThreads(1)
+
+def print_progress(i, total, success, message, stream=None):
+    status = "SUCCESS" if success else "ERROR"
+    print(f"{status}: {i}/{total} - {message}", file=stream or sys.stdout, flush=True)
+
+def process_images(image_paths, jobs=1, output_paths=None, stream=None, **options):
+    """
+    Cartoonify every image, printing one progress line per image.
+
+    Args:
+        image_paths: Images to read
+        jobs: Number of worker processes
+        output_paths: Output path per image (default: overwrite in place)
+        stream: Where progress lines go (default: stdout)
+        **options: Passed on to cartoonify_image
+
+    Returns:
+        (hits, misses) cache counts
+    """
+    total = len(image_paths)
+    output_paths = output_paths or [None] * total
+    hits = misses = 0
+
+    if jobs <= 1 or total <= 1:
+        results = (process_image(image_path, output_path, **options)
+                   for image_path, output_path in zip(image_paths, output_paths))
+        for i, (success, message, cache_hit) in enumerate(results, 1):
+            print_progress(i, total, success, message, stream)
+            hits += cache_hit is True
+            misses += cache_hit is False
+        return hits, misses
+
+    # Progress lines are printed as images finish, numbered in completion order
+    with ProcessPoolExecutor(max_workers=min(jobs, total), initializer=init_worker) as pool:
+        futures = [pool.submit(process_image, image_path, output_path, **options)
+                   for image_path, output_path in zip(image_paths, output_paths)]
+        for i, future in enumerate(as_completed(futures), 1):
+            success, message, cache_hit = future.result()
+            print_progress(i, total, success, message, stream)
+            hits += cache_hit is True
+            misses += cache_hit is False
+    return hits, misses
+
+def parse_size(value):
+    try:
+        width, height = (int(part) for part in value.lower().split("x"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Size must look like 512x512, got: {value}")
+    if width <= 0 or height <= 0:
+        raise argparse.ArgumentTypeError("Size must be positive")
+    return width, height
+
+def parse_memory(value):
+    """--max-memory in MB"""
+    try:
+        mb = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Memory budget must be a whole number of MB, got: {value}")
+    if mb < MIN_MAX_MEMORY_MB:
+        raise argparse.ArgumentTypeError(f"Memory budget must be at least {MIN_MAX_MEMORY_MB} MB, got: {value}")
+    return mb
+
+def with_format(path, fmt):
+    return os.path.splitext(path)[0] + "." + fmt.lstrip(".").lower()
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()
+
     if len(sys.argv) < 2:
-        print("Usage: python cartoonify.py <image1> <image2> ...")
+        print("Usage: python cartoonify.py [--jobs N] [--fast [--compare]] [--cache-dir DIR] "
+              "[--output OUT ...] [--size WxH | --pow2] [--format EXT] [--max-memory MB] <image1> <image2> ...")
         sys.exit(1)
-    
-    image_paths = sys.argv[1:]
-    total = len(image_paths)
-    
-    for i, image_path in enumerate(image_paths, 1):
-        try:
-            if os.path.exists(image_path):
-                cartoonify_image(image_path)
-                print(f"SUCCESS: {i}/{total} - {os.path.basename(image_path)}")
-            else:
-                print(f"ERROR: {i}/{total} - File not found: {image_path}")
-        except Exception as e:
-            print(f"ERROR: {i}/{total} - {image_path}: {str(e)}")
-    
-    print(f"Completed processing {total} images")
\ No newline at end of file
+
+    parser = argparse.ArgumentParser(description="Cartoonify textures (in place unless --output is given)")
+    parser.add_argument("images", nargs="+", help="Image paths to process")
+    parser.add_argument("--jobs", type=int, default=1, help="Number of worker processes (default: 1)")
+    parser.add_argument("--fast", action="store_true",
+                        help="Filter at reduced resolution and upsample with edge guidance. Lossy: detailed "
+                             "textures differ visibly from the default filter (around 30 dB PSNR)")
+    parser.add_argument("--compare", action="store_true",
+                        help="With --fast, also run the reference filter and report PSNR/SSIM, flagging "
+                             f"images below {FAST_MIN_PSNR:g} dB or SSIM {FAST_MIN_SSIM:g}")
+    parser.add_argument("--cache-dir", default=None,
+                        help="Reuse results for identical input pixels from this directory")
+    parser.add_argument("--cache-size", type=int, default=DEFAULT_CACHE_SIZE_MB,
+                        help=f"Cache size limit in MB (default: {DEFAULT_CACHE_SIZE_MB})")
+    parser.add_argument("--output", "-o", action="append", default=None,
+                        help="Output path, once per image in order; '-' writes raw RGBA to stdout")
+    parser.add_argument("--size", type=parse_size, default=None, help="Resize the output to WxH")
+    parser.add_argument("--pow2", action="store_true",
+                        help=f"Square the output to a power of two ({POW2_MIN_SIZE}-{POW2_MAX_SIZE})")
+    parser.add_argument("--max-memory", type=parse_memory, default=None,
+                        help="Filter working memory budget in MB, not counting the decoded input image; large "
+                             "images are processed in overlapping tiles with the full-size input and result in "
+                             "temporary files (slower, same output within rounding). At least "
+                             f"{MIN_MAX_MEMORY_MB} MB. "
+                             "Images that can't be filtered within the budget fail.")
+    parser.add_argument("--format", default=None,
+                        help="Output format extension (png, tga, jpg...) replacing the output's own")
+    args = parser.parse_args()
+
+    output_paths = args.output
+    if output_paths is not None and len(output_paths) != len(args.images):
+        parser.error("--output must be given once per image")
+    if output_paths and RAW_OUTPUT in output_paths and len(args.images) != 1:
+        parser.error("raw RGBA output ('-') only supports a single image")
+    if args.format:
+        output_paths = [
+            path if path == RAW_OUTPUT else with_format(path, args.format)
+            for path in (output_paths or args.images)
+        ]
+
+    # Raw pixels own stdout, so progress moves to stderr
+    raw = bool(output_paths) and RAW_OUTPUT in output_paths
+    stream = sys.stderr if raw else sys.stdout
+
+    hits, misses = process_images(
+        args.images, max(1, args.jobs), output_paths, stream,
+        fast=args.fast, compare=args.compare, cache_dir=args.cache_dir,
+        size=args.size, pow2=args.pow2,
+        max_memory=args.max_memory * 1024 * 1024 if args.max_memory else None
+    )
+
+    if args.cache_dir:
+        prune_cache(args.cache_dir, args.cache_size * 1024 * 1024)
+        print(f"Completed processing {len(args.images)} images (cache: {hits} hits, {misses} misses)",
+              file=stream)
+    else:
+        print(f"Completed processing {len(args.images)} images", file=stream)
@@ -4,10 +4,49 @@ MDL Dependency Finder
 Uses srctools to extract material dependencies from Source Engine MDL files.
 
 Usage:
-    python find_mdl_deps.py <mdl_path> <game_dir> [--search-paths path1;path2;...]
+    python find_mdl_deps.py <mdl_path> [<mdl_path> ...] <game_dir> [--search-paths path1;path2;...]
+    python find_mdl_deps.py <game_dir> --mdl-list models.json [--search-paths path1;path2;...]
+    python find_mdl_deps.py <game_dir> --vmf item.vmf [--vmf other.vmf ...] [--search-paths ...]
+
+Options:
+    --cache <file>      Persistent dependency cache (JSON). Results are reused while
+                        the MDL and every dependency it resolved to are unchanged,
+                        separately per game directory and search path layout.
+    --cache-size <n>    Maximum number of cached models (least recently used are evicted)
+    --jobs <n>          Spread a batch across n worker processes (output is identical
+                        to a serial run)
+    --vmf <file>        Compute the full asset closure of a VMF (brush materials,
+                        overlays, prop models, entity material/sound keyvalues)
+                        in one pass. May be repeated; MDL paths given alongside
+                        are added to the same closure. Not combinable with
+                        --cache or --jobs.
+    --lazy              Register VPKs without reading them; each archive's directory
+                        tree is only read on the first lookup that reaches it.
+    --index <file>      With --lazy, a content index (see index-build) used to answer
+                        lookups for files an archive or loose folder does not
+                        contain without mounting or touching it. The reported
+                        coldStartMs includes archives mounted on first lookup.
+    --graph             Emit the dependency graph of the given MDLs instead of flat
+                        lists: nodes (models, VMTs, VTFs, sounds) with file sizes,
+                        edges, and which root models reach each node.
+
+Content index:
+    python find_mdl_deps.py index-build <game_dir> --index <index.json> [--search-paths ...]
+    python find_mdl_deps.py index-query <index.json> <path> [<path> ...] [--paths-file paths.json]
+
+    index-build reads the directory tree of every VPK and loose folder on the
+    gameinfo search paths (plus any --search-paths) once and stores
+    path -> (source, size, crc), where the source is the one the mounted
+    filesystem would pick. index-query answers existence/location queries from
+    that file without mounting anything. Sources that changed since are re-read
+    automatically. VPKs are checked by mtime and size on every query; loose
+    folders by their directory mtimes, and only when a query misses or is
+    answered by a folder.
 
 Output:
-    JSON object with materials array
+    JSON object with materials array. When more than one MDL is given (or
+    --mdl-list is used) the output is a batch document with one result per
+    model plus the merged, deduplicated dependency lists.
 
 Example:
     python find_mdl_deps.py "models/props/cube.mdl" "C:/Steam/steamapps/common/Portal 2/portal2"
@@ -17,8 +56,13 @@ import sys
 import os
 import json
 import argparse
+import hashlib
+import time
+import multiprocessing
+from collections import OrderedDict, deque
 
 try:
+    import srctools.filesys
     import srctools.game
     import srctools.packlist
 except ImportError:
@@ -29,73 +73,482 @@ except ImportError:
     sys.exit(1)
 
 
-def find_mdl_dependencies(mdl_path, game_dir, extra_paths=None):
+CACHE_VERSION = 2
+DEFAULT_CACHE_SIZE = 4096
+INDEX_VERSION = 3
+
+
+def normalize_mdl_path(mdl_path):
+    """Normalize an MDL path to the lowercase "models/....mdl" form srctools expects"""
+    mdl_path = mdl_path.replace("\\", "/").lower()
+    if not mdl_path.startswith("models/"):
+        mdl_path = "models/" + mdl_path
+    if not mdl_path.endswith(".mdl"):
+        mdl_path = mdl_path + ".mdl"
+    return mdl_path
+
+
+def build_filesystem(game_dir, extra_paths=None, lazy=False, index_path=None):
     """
-    Find all material dependencies for an MDL file using srctools.
+    Mount the game filesystem plus any extra search paths.
 
     Args:
-        mdl_path: Path to the MDL file (can be relative like "models/props/cube.mdl")
         game_dir: Path to the game directory (e.g., Portal 2/portal2)
-        extra_paths: Additional search paths
+        extra_paths: Additional search paths (folders or .vpk files)
+        lazy: Register VPKs without reading them (see build_lazy_filesystem)
+        index_path: Content index used by lazy mounting to skip archives
+
+    Returns:
+        srctools FileSystemChain
+    """
+    if lazy:
+        return build_lazy_filesystem(game_dir, extra_paths, index_path)
+
+    game = srctools.game.Game(game_dir)
+    fsys = game.get_filesystem()
+
+    # Add extra search paths to filesystem
+    if extra_paths:
+        from srctools.filesys import RawFileSystem, VPKFileSystem
+        for path in extra_paths:
+            if os.path.exists(path):
+                if path.endswith(".vpk"):
+                    try:
+                        fsys.add_sys(VPKFileSystem(path))
+                    except Exception:
+                        pass
+                else:
+                    fsys.add_sys(RawFileSystem(path))
+
+    return fsys
+
+
+def index_rules_out(name_index, slot, name):
+    """
+    Whether a current content index says the source in `slot` cannot supply
+    `name`: the path is not indexed at all, or an earlier source wins it.
+    """
+    if name_index is None or slot is None:
+        return False
+    entry = name_index.get(name.replace("\\", "/").lower())
+    return entry is None or entry[0] != slot
+
+
+class LazyVPKFileSystem(srctools.filesys.FileSystem):
+    """
+    A VPK that is registered in the chain but only opened on first lookup.
+
+    With a content index, lookups for files the archive does not own are
+    answered from the index and never force the archive to be read.
+    """
+
+    def __init__(self, path, name_index=None, slot=None):
+        super().__init__(path)
+        self._mounted = None
+        self._name_index = name_index
+        self._slot = slot
+        self.mount_ms = 0.0
+
+    def mount(self):
+        if self._mounted is None:
+            start = time.perf_counter()
+            self._mounted = srctools.filesys.VPKFileSystem(self.path)
+            self.mount_ms = elapsed_ms(start)
+        return self._mounted
+
+    @property
+    def is_mounted(self):
+        return self._mounted is not None
+
+    def _known_missing(self, name):
+        return index_rules_out(self._name_index, self._slot, name)
+
+    def _get_file(self, name):
+        if self._known_missing(name):
+            raise FileNotFoundError(name)
+        return self.mount()._get_file(name)
+
+    def _file_exists(self, name):
+        if self._known_missing(name):
+            return False
+        return self.mount()._file_exists(name)
+
+    def walk_folder(self, folder):
+        return self.mount().walk_folder(folder)
+
+    def open_str(self, name, encoding="utf8"):
+        return self.mount().open_str(name, encoding)
+
+    def open_bin(self, name):
+        return self.mount().open_bin(name)
+
+
+class IndexedRawFileSystem(srctools.filesys.RawFileSystem):
+    """
+    A loose search folder whose misses are answered from a current content
+    index instead of touching the disk.
+    """
+
+    def __init__(self, path, name_index=None, slot=None):
+        super().__init__(path)
+        self._name_index = name_index
+        self._slot = slot
+
+    def _get_file(self, name):
+        if index_rules_out(self._name_index, self._slot, name):
+            raise FileNotFoundError(name)
+        return super()._get_file(name)
+
+    def _file_exists(self, name):
+        if index_rules_out(self._name_index, self._slot, name):
+            return False
+        return super()._file_exists(name)
+
+
+def build_lazy_filesystem(game_dir, extra_paths=None, index_path=None):
+    """
+    Build the game filesystem without reading any VPK up front.
+
+    Archives are added as LazyVPKFileSystem entries in the same priority order
+    as the eager filesystem (see search_path_layout), followed by the extra
+    paths, so both resolve every path to the same file. Only gameinfo.txt is
+    parsed here; a VPK directory tree is read the first time a lookup actually
+    reaches that archive. If a current content index is available, archives
+    and loose folders that do not own a requested file are skipped without
+    being opened or stat'ed. Checking that the index is current takes one
+    stat per archive and per indexed directory (see source_is_current), never
+    a walk of the loose folders.
+    """
+    from srctools.filesys import FileSystemChain
+
+    name_index = None
+    slots = {}
+    if index_path:
+        index = load_index(index_path)
+        if index is not None and index_is_current(index):
+            name_index = index["files"]
+            slots = {archive["path"]: slot for slot, archive in enumerate(index["archives"])}
+
+    fsys = FileSystemChain()
+    for kind, path in content_sources(game_dir, extra_paths):
+        if kind == "vpk":
+            fsys.add_sys(LazyVPKFileSystem(path, name_index, slots.get(path)))
+        else:
+            fsys.add_sys(IndexedRawFileSystem(path, name_index, slots.get(path)))
+
+    return fsys
+
+
+def filesystem_stats(fsys):
+    """Report how many lazily registered archives were opened, and what that cost"""
+    archives = [system for system, _prefix in fsys.systems if isinstance(system, LazyVPKFileSystem)]
+    if not archives:
+        return None
+    return {
+        "archivesRegistered": len(archives),
+        "archivesMounted": sum(1 for system in archives if system.is_mounted),
+        "deferredMountMs": round(sum(system.mount_ms for system in archives), 1)
+    }
+
+
+def elapsed_ms(start):
+    return round((time.perf_counter() - start) * 1000, 1)
+
+
+def mount_timing(fsys, mount_ms):
+    """
+    Up-front mount time and cold start of one mounted filesystem.
+
+    coldStartMs is everything spent opening the filesystem, including archives
+    a lazy filesystem only mounted when a lookup first reached them.
+    """
+    timing = {"mountMs": mount_ms, "coldStartMs": mount_ms}
+    stats = filesystem_stats(fsys) if fsys is not None else None
+    if stats is not None:
+        timing.update(stats)
+        timing["coldStartMs"] = round(mount_ms + stats["deferredMountMs"], 1)
+    return timing
+
+
+def timing_report(fsys, mount_ms, start, worker_timings=None):
+    """
+    Timing block for the JSON output: up-front mount time, cold start and total.
+
+    With worker_timings (see resolve_parallel) every worker mounted its own
+    filesystem at the same time, so each field is the slowest worker's.
+    """
+    if worker_timings:
+        timing = {key: max(worker[key] for worker in worker_timings)
+                  for key in worker_timings[0]}
+    else:
+        timing = mount_timing(fsys, mount_ms)
+    timing["totalMs"] = elapsed_ms(start)
+    return timing
+
+
+def split_dependencies(file_paths):
+    """Sort packed file paths into (materials, models, other) lists"""
+    materials = set()
+    models = set()
+    other = set()
+
+    for file_path in file_paths:
+        file_lower = file_path.lower()
+        if file_lower.startswith("materials/"):
+            materials.add(file_lower)  # Keep full path with extension
+        elif file_lower.startswith("models/"):
+            models.add(file_lower)
+        else:
+            other.add(file_lower)
+
+    return sorted(materials), sorted(models), sorted(other)
+
+
+def owning_file(fsys, file_path):
+    """
+    Look a path up and return the File of the child filesystem that holds it.
+
+    A FileSystemChain lookup hands back a File whose .sys is the chain itself;
+    the child's own File is unwrapped from it here. A LazyVPKFileSystem returns
+    the File of the VPK it mounted, so lazy and eager lookups look the same.
+
+    Raises:
+        FileNotFoundError if no mounted filesystem contains the file
+    """
+    from srctools.filesys import FileSystemChain
+
+    file = fsys[file_path]
+    while isinstance(file.sys, FileSystemChain):
+        file = file._data
+    return file
+
+
+def file_fingerprint(file):
+    """
+    Identify a file (see owning_file), so cached results can be invalidated.
+
+    Loose files are identified by their full path, mtime and size. Files inside
+    a VPK are identified by the archive, its mtime and size plus the entry CRC.
+    """
+    from srctools.filesys import RawFileSystem, VPKFileSystem
+
+    system = file.sys
+    if isinstance(system, VPKFileSystem):
+        stat = os.stat(system.path)
+        crc = getattr(file._data, "crc", 0)
+        return ["vpk", os.path.normcase(str(system.path)), stat.st_mtime_ns, stat.st_size, crc]
+    if isinstance(system, RawFileSystem):
+        full_path = os.path.join(system.path, file.path)
+        stat = os.stat(full_path)
+        return ["file", os.path.normcase(full_path), stat.st_mtime_ns, stat.st_size]
+    return ["sys", type(system).__name__, str(system.path)]
+
+
+def dependency_fingerprints(fsys, file_paths):
+    """Fingerprint every resolved dependency (None for paths no source holds)"""
+    fingerprints = []
+    for file_path in file_paths:
+        try:
+            fingerprints.append(file_fingerprint(owning_file(fsys, file_path)))
+        except FileNotFoundError:
+            fingerprints.append(None)
+    return fingerprints
+
+
+def cache_scope(game_dir, sources):
+    """
+    Identify a filesystem layout for DependencyCache keys.
+
+    The same MDL path resolves to different files under another game
+    directory or search path order, so those results are cached separately.
+    """
+    layout = json.dumps([os.path.normcase(os.path.abspath(game_dir)), sources])
+    return hashlib.sha1(layout.encode("utf-8")).hexdigest()[:16]
+
+
+class DependencyCache:
+    """
+    Persistent LRU cache of resolved MDL dependencies.
+
+    Entries are keyed by the filesystem layout (see cache_scope) and the
+    normalized MDL path. They only count as a hit when the model's fingerprint
+    (see file_fingerprint) matches, checked first, and every resolved
+    dependency still has the fingerprint it had when the entry was stored.
+    """
+
+    def __init__(self, path, max_entries=DEFAULT_CACHE_SIZE, scope=""):
+        self.path = path
+        self.max_entries = max(1, int(max_entries))
+        self.scope = scope
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.dirty = False
+        # Set to a list to record (key, hit, stored entry) per lookup, so
+        # lookups made in a worker can be replayed (see replay)
+        self.lookups = None
+        if path:
+            self.load()
+
+    def load(self):
+        """Load entries from disk; a missing or unreadable cache starts empty"""
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if not isinstance(data, dict) or data.get("version") != CACHE_VERSION:
+            return
+        for key, entry in data.get("entries", []):
+            self.entries[key] = entry
+        self._evict()
+
+    def get(self, key, fingerprint, dependencies_unchanged=None):
+        """
+        Return the cached entry for key if it is still valid.
+
+        Args:
+            key: Normalized MDL path
+            fingerprint: Current fingerprint of the model file
+            dependencies_unchanged: Called with the entry once the model
+                fingerprint matches; returns whether its dependencies do too
+        """
+        entry = self.entries.get(self.scope + key)
+        if entry is None or entry.get("fingerprint") != fingerprint \
+                or (dependencies_unchanged is not None and not dependencies_unchanged(entry)):
+            self.misses += 1
+            if self.lookups is not None:
+                self.lookups.append((key, False, None))
+            return None
+        self.entries.move_to_end(self.scope + key)
+        self.hits += 1
+        self.dirty = True
+        if self.lookups is not None:
+            self.lookups.append((key, True, None))
+        return entry
+
+    def put(self, key, fingerprint, materials, models, other, dependencies=None):
+        """Store a resolved result, evicting the least recently used entries"""
+        entry = {
+            "fingerprint": fingerprint,
+            "dependencies": dependencies,
+            "materials": materials,
+            "models": models,
+            "other": other
+        }
+        self.entries[self.scope + key] = entry
+        self.entries.move_to_end(self.scope + key)
+        self._evict()
+        self.dirty = True
+        if self.lookups:
+            # Record what a miss stored, for replay
+            last_key, hit, _entry = self.lookups[-1]
+            if last_key == key and not hit:
+                self.lookups[-1] = (key, False, entry)
+
+    def replay(self, key, hit, entry):
+        """
+        Apply a lookup a worker made against a snapshot of this cache.
+
+        A worker miss counts as a hit when an earlier result in the same run
+        already stored an identical entry, as it would have in a serial run.
+        """
+        scoped = self.scope + key
+        if hit or (entry is not None and self.entries.get(scoped) == entry):
+            if scoped in self.entries:
+                self.entries.move_to_end(scoped)
+            self.hits += 1
+            self.dirty = True
+            return
+        self.misses += 1
+        if entry is not None:
+            self.entries[scoped] = entry
+            self.entries.move_to_end(scoped)
+            self._evict()
+            self.dirty = True
+
+    def _evict(self):
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def save(self):
+        """Write the cache back to disk atomically (only when it changed)"""
+        if not self.dirty:
+            return
+        cache_dir = os.path.dirname(self.path)
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "version": CACHE_VERSION,
+                "entries": list(self.entries.items())
+            }, f, separators=(",", ":"))
+        os.replace(tmp_path, self.path)
+        self.dirty = False
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": len(self.entries)
+        }
+
+
+def resolve_mdl(fsys, mdl_path, cache=None):
+    """
+    Evaluate the dependencies of a single MDL against an already mounted filesystem.
+
+    Errors are caught and reported in the result so a bad model never
+    takes down the rest of a batch.
+
+    Args:
+        fsys: Mounted srctools filesystem (see build_filesystem)
+        mdl_path: Path to the MDL file
+        cache: Optional DependencyCache; a hit skips eval_dependencies() and
+               only fingerprints the model and its recorded dependencies
 
     Returns:
-        dict with success status and materials list
+        dict with success status and materials/models/other lists
     """
     try:
-        # Normalize the MDL path
-        mdl_path = mdl_path.replace("\\", "/").lower()
-        if not mdl_path.startswith("models/"):
-            mdl_path = "models/" + mdl_path
-        if not mdl_path.endswith(".mdl"):
-            mdl_path = mdl_path + ".mdl"
-
-        # Create Game object and get filesystem
-        game = srctools.game.Game(game_dir)
-        fsys = game.get_filesystem()
+        mdl_path = normalize_mdl_path(mdl_path)
 
-        # Add extra search paths to filesystem
-        if extra_paths:
-            from srctools.filesys import RawFileSystem, VPKFileSystem
-            for path in extra_paths:
-                if os.path.exists(path):
-                    if path.endswith(".vpk"):
-                        try:
-                            fsys.add_sys(VPKFileSystem(path))
-                        except Exception:
-                            pass
-                    else:
-                        fsys.add_sys(RawFileSystem(path))
-
-        # Create PackList and find dependencies
-        packlist = srctools.packlist.PackList(fsys)
-        packlist.pack_file(mdl_path)
-        packlist.eval_dependencies()  # This is the key call!
-
-        # Extract materials from the pack list
-        materials = []
-        models = []
-        other = []
-
-        for file_path in packlist._files:
-            file_lower = file_path.lower()
-            if file_lower.startswith("materials/"):
-                # Return without extension
-                mat_path = os.path.splitext(file_lower)[0]
-                if mat_path not in materials:
-                    materials.append(file_lower)  # Keep full path with extension
-            elif file_lower.startswith("models/"):
-                if file_lower not in models:
-                    models.append(file_lower)
-            else:
-                if file_lower not in other:
-                    other.append(file_lower)
+        # A missing model is an error whether or not the cache is in use
+        file = owning_file(fsys, mdl_path)
+
+        fingerprint = None
+        entry = None
+        if cache is not None:
+            fingerprint = file_fingerprint(file)
+
+            def dependencies_unchanged(entry):
+                paths = entry["materials"] + entry["models"] + entry["other"]
+                return dependency_fingerprints(fsys, paths) == entry["dependencies"]
+
+            entry = cache.get(mdl_path, fingerprint, dependencies_unchanged)
+
+        if entry is not None:
+            materials = entry["materials"]
+            models = entry["models"]
+            other = entry["other"]
+        else:
+            # Create PackList and find dependencies
+            packlist = srctools.packlist.PackList(fsys)
+            packlist.pack_file(mdl_path)
+            packlist.eval_dependencies()  # This is the key call!
+
+            materials, models, other = split_dependencies(packlist._files)
+            if cache is not None:
+                dependencies = dependency_fingerprints(fsys, materials + models + other)
+                cache.put(mdl_path, fingerprint, materials, models, other, dependencies)
 
         return {
             "success": True,
             "mdlPath": mdl_path,
-            "materials": sorted(materials),
-            "models": sorted(models),
-            "other": sorted(other),
+            "materials": materials,
+            "models": models,
+            "other": other,
             "totalDependencies": len(materials) + len(models) + len(other)
         }
 
@@ -113,27 +566,1076 @@ def find_mdl_dependencies(mdl_path, game_dir, extra_paths=None):
         }
 
 
+def merge_results(results):
+    """
+    Build the batch document from per-model results.
+
+    Args:
+        results: List of per-model result dicts, in input order
+
+    Returns:
+        dict with per-model results and merged, deduplicated dependency lists
+    """
+    materials = set()
+    models = set()
+    other = set()
+    failed = 0
+
+    for result in results:
+        if not result.get("success"):
+            failed += 1
+            continue
+        materials.update(result["materials"])
+        models.update(result["models"])
+        other.update(result["other"])
+
+    return {
+        "success": True,
+        "results": results,
+        "materials": sorted(materials),
+        "models": sorted(models),
+        "other": sorted(other),
+        "totalModels": len(results),
+        "failedModels": failed,
+        "totalDependencies": len(materials) + len(models) + len(other)
+    }
+
+
+# Entity keyvalues that reference assets, used on top of the FGD-driven packing
+MATERIAL_KEYS = ("material", "texture", "overlay", "skin_material", "ropematerial")
+SOUND_KEYS = ("message", "sound", "soundfile", "soundname", "startsound", "stopsound", "movesound")
+SOUND_EXTENSIONS = (".wav", ".mp3", ".ogg")
+
+
+def normalize_sound(value):
+    """
+    Turn a sound reference into a file path under sound/.
+
+    Returns None when the value is a soundscript entry rather than a raw file.
+    """
+    # Strip sound character prefixes (*, #, @, ) and friends) from raw paths
+    sound = value.replace("\\", "/").lstrip("*#@<>^)}$!?&~`+%").lower()
+    if not sound.endswith(SOUND_EXTENSIONS):
+        return None
+    if not sound.startswith("sound/"):
+        sound = "sound/" + sound
+    return sound
+
+
+def pack_sound(packlist, value):
+    """Pack a sound keyvalue: a raw file under sound/ or a soundscript entry"""
+    from srctools.packlist import FileType
+
+    sound = normalize_sound(value)
+    if sound is not None:
+        packlist.pack_file(sound, FileType.GENERIC, optional=True)
+    else:
+        packlist.pack_file(value, FileType.GAME_SOUND, optional=True)
+
+
+def pack_vmf(packlist, vmf):
+    """
+    Add every asset a parsed VMF references to a PackList.
+
+    Returns:
+        number of direct references found
+    """
+    from srctools.packlist import FileType
+
+    references = 0
+
+    # Brush faces, both world geometry and brush entities
+    solids = list(vmf.brushes)
+    for ent in vmf.entities:
+        solids.extend(ent.solids)
+    for solid in solids:
+        for side in solid.sides:
+            if side.mat:
+                packlist.pack_file(f"materials/{side.mat.lower()}.vmt", FileType.MATERIAL, optional=True)
+                references += 1
+
+    # Let srctools pack every keyvalue its entity database knows the type of
+    try:
+        from srctools.fgd import FGD
+        packlist.pack_fgd(vmf, FGD.engine_dbase())
+    except Exception as e:
+        print(f"Warning: FGD-based entity packing unavailable: {e}", file=sys.stderr)
+
+    for ent in vmf.entities:
+        classname = ent["classname"].lower()
+
+        model = ent["model"]
+        if model and not model.startswith("*") and model.lower().endswith(".mdl"):
+            packlist.pack_file(model.replace("\\", "/").lower(), FileType.MODEL, optional=True)
+            references += 1
+
+        for key in MATERIAL_KEYS:
+            value = ent[key]
+            if value and not (key == "overlay" and classname != "env_screenoverlay"):
+                material = value.replace("\\", "/").lower()
+                if not material.startswith("materials/"):
+                    material = "materials/" + material
+                if not material.endswith(".vmt"):
+                    material += ".vmt"
+                packlist.pack_file(material, FileType.MATERIAL, optional=True)
+                references += 1
+
+        for key in SOUND_KEYS:
+            value = ent[key]
+            # "message" is only a sound on ambient_generic
+            if value and (key != "message" or classname == "ambient_generic"):
+                pack_sound(packlist, value)
+                references += 1
+
+    return references
+
+
+def find_vmf_dependencies(vmf_paths, game_dir, extra_paths=None, mdl_paths=(), lazy=False,
+                          index_path=None):
+    """
+    Compute the full transitive asset closure of one or more VMFs.
+
+    Every VMF is parsed and packed into a single PackList, so the filesystem is
+    mounted once and eval_dependencies() runs once for the whole set (shared
+    materials and models are only evaluated a single time).
+
+    Args:
+        vmf_paths: Paths to VMF files
+        game_dir: Path to the game directory (e.g., Portal 2/portal2)
+        extra_paths: Additional search paths
+        mdl_paths: Extra MDL paths to include in the same closure
+        lazy: Mount VPKs on demand (see build_lazy_filesystem)
+        index_path: Content index used by lazy mounting
+
+    Returns:
+        dict with per-VMF status and the merged materials/models/other lists
+    """
+    from srctools.vmf import VMF
+
+    start = time.perf_counter()
+    try:
+        fsys = build_filesystem(game_dir, extra_paths, lazy, index_path)
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+    mount_ms = elapsed_ms(start)
+
+    packlist = srctools.packlist.PackList(fsys)
+    vmf_results = []
+
+    for vmf_path in vmf_paths:
+        try:
+            vmf = VMF.parse(vmf_path)
+            references = pack_vmf(packlist, vmf)
+            vmf_results.append({"success": True, "vmfPath": vmf_path, "references": references})
+        except Exception as e:
+            vmf_results.append({"success": False, "vmfPath": vmf_path, "error": str(e)})
+
+    for mdl_path in mdl_paths:
+        packlist.pack_file(normalize_mdl_path(mdl_path), optional=True)
+
+    try:
+        packlist.eval_dependencies()
+    except Exception as e:
+        return {"success": False, "error": str(e), "vmfs": vmf_results}
+
+    # Only report files the mounted filesystem can actually supply
+    present = []
+    missing = []
+    for file_path in packlist._files:
+        try:
+            fsys[file_path]
+            present.append(file_path)
+        except FileNotFoundError:
+            missing.append(file_path.lower())
+
+    materials, models, other = split_dependencies(present)
+
+    return {
+        "success": True,
+        "vmfs": vmf_results,
+        "materials": materials,
+        "models": models,
+        "other": other,
+        "missing": sorted(set(missing)),
+        "totalDependencies": len(materials) + len(models) + len(other),
+        "timing": timing_report(fsys, mount_ms, start)
+    }
+
+
+# Files compiled alongside an MDL that PackList also packs
+MDL_SIDECAR_EXTENSIONS = (".vvd", ".phy", ".ani", ".dx90.vtx", ".dx80.vtx", ".sw.vtx", ".vtx")
+# Model animation events whose options name a sound
+SOUND_EVENT_NAMES = ("AE_CL_PLAYSOUND", "CL_EVENT_SOUND", "AE_SV_PLAYSOUND", "SCRIPT_EVENT_SOUND")
+
+
+def node_type(file_path):
+    """Classify a dependency graph node by its path"""
+    if file_path.endswith(".mdl"):
+        return "model"
+    if file_path.endswith(".vmt"):
+        return "vmt"
+    if file_path.endswith(".vtf"):
+        return "vtf"
+    if file_path.startswith("sound/") or file_path.endswith(SOUND_EXTENSIONS):
+        return "sound"
+    return "other"
+
+
+def material_path(value, ext):
+    """Turn a material or texture reference into a file path under materials/"""
+    path = value.replace("\\", "/").lower()
+    if not path.startswith("materials/"):
+        path = "materials/" + path
+    if not path.endswith(ext):
+        path += ext
+    return path
+
+
+def file_size(file):
+    """Size in bytes of a file (see owning_file)"""
+    from srctools.filesys import RawFileSystem, VPKFileSystem
+
+    if isinstance(file.sys, RawFileSystem):
+        return os.path.getsize(os.path.join(file.sys.path, file.path))
+    if isinstance(file.sys, VPKFileSystem):
+        return len(file._data.start_data) + file._data.arch_len
+    with file.open_bin() as f:
+        f.seek(0, os.SEEK_END)
+        return f.tell()
+
+
+def direct_dependencies(fsys, file_path, file):
+    """
+    List the files one node directly pulls in.
+
+    These are the same per-type rules PackList.eval_dependencies() applies
+    (MDL textures, included models, sidecar files and sound events; VMT
+    texture and material parameters, Patch parents), but evaluated for a
+    single file so the edges are kept.
+    """
+    children = []
+    kind = node_type(file_path)
+
+    if kind == "model":
+        from srctools.mdl import Model
+
+        mdl = Model(fsys, file)
+        for texture in mdl.iter_textures():
+            children.append(material_path(texture, ".vmt"))
+        for included in mdl.included_models:
+            children.append(included.filename.replace("\\", "/").lower())
+        for sequence in mdl.sequences:
+            for event in sequence.events:
+                if getattr(event.type, "name", "") in SOUND_EVENT_NAMES and event.options:
+                    # Soundscript entries are kept by name
+                    children.append(normalize_sound(event.options) or event.options)
+        base = file_path[:-4]
+        for ext in MDL_SIDECAR_EXTENSIONS:
+            children.append(base + ext)
+
+    elif kind == "vmt":
+        from srctools.vmt import Material, VarType
+
+        with file.open_str() as f:
+            mat = Material.parse(f, file_path)
+        # A Patch material depends on the VMTs it includes
+        parents = []
+        mat = mat.apply_patches(fsys, parent_func=parents.append)
+        children.extend(material_path(parent, ".vmt") for parent in parents)
+        for name, value in mat.items():
+            if not value:
+                continue
+            value = value.casefold()
+            param_type = VarType.from_name(name)
+            if param_type is VarType.TEXTURE:
+                # Cubemaps and render targets are engine-generated
+                if value == "env_cubemap" or value.startswith("_rt_"):
+                    continue
+                children.append(material_path(value, ".vtf"))
+            elif param_type is VarType.MATERIAL:
+                children.append(material_path(value, ".vmt"))
+
+    # Keep edge order stable and unique
+    return list(dict.fromkeys(children))
+
+
+def build_dependency_graph(mdl_paths, game_dir, extra_paths=None, lazy=False, index_path=None):
+    """
+    Build the dependency graph of a set of models.
+
+    Every node is expanded at most once per run, so models sharing VMT
+    chains (or whole included models) reuse the already evaluated subtree.
+
+    Args:
+        mdl_paths: Root MDL paths
+        game_dir: Path to the game directory (e.g., Portal 2/portal2)
+        extra_paths: Additional search paths
+        lazy: Mount VPKs on demand (see build_lazy_filesystem)
+        index_path: Content index used by lazy mounting
+
+    Returns:
+        dict with nodes (type, size, exists, roots), edges and per-root totals
+    """
+    start = time.perf_counter()
+    try:
+        fsys = build_filesystem(game_dir, extra_paths, lazy, index_path)
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+    mount_ms = elapsed_ms(start)
+
+    roots = list(dict.fromkeys(normalize_mdl_path(path) for path in mdl_paths))
+    nodes = {}   # path -> {"type", "size", "exists", "error"?}
+    edges = {}   # path -> [child paths]
+
+    # Expand each reachable node exactly once
+    stack = list(reversed(roots))
+    while stack:
+        file_path = stack.pop()
+        if file_path in nodes:
+            continue
+        node = {"type": node_type(file_path), "size": 0, "exists": False}
+        nodes[file_path] = node
+        edges[file_path] = []
+        try:
+            file = owning_file(fsys, file_path)
+        except FileNotFoundError:
+            continue
+        node["exists"] = True
+        try:
+            node["size"] = file_size(file)
+            edges[file_path] = direct_dependencies(fsys, file_path, file)
+        except Exception as e:
+            node["error"] = str(e)
+        for child in reversed(edges[file_path]):
+            if child not in nodes:
+                stack.append(child)
+
+    # Sidecar files that are simply absent (e.g. .ani, .sw.vtx) are not interesting
+    for file_path, children in edges.items():
+        edges[file_path] = [
+            child for child in children
+            if nodes[child]["exists"] or not child.endswith(MDL_SIDECAR_EXTENSIONS)
+        ]
+    nodes = {
+        file_path: node for file_path, node in nodes.items()
+        if node["exists"] or not file_path.endswith(MDL_SIDECAR_EXTENSIONS)
+    }
+
+    # Which roots reach each node, and the unique footprint of every root
+    reached_by = {file_path: [] for file_path in nodes}
+    root_totals = []
+    for root in roots:
+        seen = {root}
+        stack = [root]
+        while stack:
+            for child in edges.get(stack.pop(), []):
+                if child not in seen:
+                    seen.add(child)
+                    stack.append(child)
+        for file_path in seen:
+            reached_by[file_path].append(root)
+        root_totals.append({
+            "id": root,
+            "files": len(seen),
+            "totalSize": sum(nodes[file_path]["size"] for file_path in seen)
+        })
+
+    node_list = []
+    for file_path in sorted(nodes):
+        node = dict(nodes[file_path], id=file_path, roots=reached_by[file_path])
+        node_list.append(node)
+
+    heaviest = sorted(
+        (node for node in node_list if node["exists"]),
+        key=lambda node: (-node["size"], node["id"])
+    )[:20]
+
+    return {
+        "success": True,
+        "nodes": node_list,
+        "edges": [[parent, child] for parent in sorted(edges) if parent in nodes
+                  for child in edges[parent]],
+        "roots": root_totals,
+        "heaviest": [{"id": node["id"], "size": node["size"], "roots": len(node["roots"])}
+                     for node in heaviest],
+        "totalSize": sum(node["size"] for node in node_list),
+        "timing": timing_report(fsys, mount_ms, start)
+    }
+
+
+# Per-process state of a --jobs worker, set up once by _init_worker
+_worker_state = {}
+
+
+def _init_worker(game_dir, extra_paths, lazy, index_path, cache_entries, scope=""):
+    """
+    Mount the filesystem once per worker process.
+
+    A failure is kept and reported for every item instead of raised: an
+    initializer that raises makes the Pool respawn workers forever.
+    """
+    start = time.perf_counter()
+    try:
+        _worker_state["fsys"] = build_filesystem(game_dir, extra_paths, lazy, index_path)
+        _worker_state["error"] = None
+    except Exception as e:
+        _worker_state["fsys"] = None
+        _worker_state["error"] = f"Failed to mount the game filesystem: {e}"
+    _worker_state["mount_ms"] = elapsed_ms(start)
+    cache = None
+    if cache_entries is not None:
+        cache = DependencyCache(None, scope=scope)
+        cache.entries = cache_entries
+    _worker_state["cache"] = cache
+
+
+def _worker_resolve(mdl_path):
+    """
+    Resolve one MDL inside a worker.
+
+    Returns:
+        (result, cache lookups, (pid, mount timing so far))
+    """
+    fsys = _worker_state["fsys"]
+    if _worker_state["error"] is not None:
+        result = {"success": False, "error": _worker_state["error"], "mdlPath": normalize_mdl_path(mdl_path)}
+        lookups = []
+    else:
+        cache = _worker_state["cache"]
+        if cache is not None:
+            cache.lookups = []
+        result = resolve_mdl(fsys, mdl_path, cache)
+        lookups = cache.lookups if cache is not None else []
+    return result, lookups, (os.getpid(), mount_timing(fsys, _worker_state["mount_ms"]))
+
+
+def resolve_parallel(mdl_paths, game_dir, extra_paths, jobs, cache=None, lazy=False,
+                     index_path=None, worker_timings=None):
+    """
+    Resolve MDLs across a pool of worker processes.
+
+    Each worker mounts the filesystem once. Work is streamed through a bounded
+    window of outstanding tasks and collected in input order. Workers look up a
+    snapshot of the cache; their lookups are replayed against the real cache
+    here (see DependencyCache.replay) so hit/miss counts and LRU order match a
+    serial run.
+
+    Args:
+        worker_timings: Optional dict filled with each worker's latest mount
+                        timing (see mount_timing), keyed by process id
+
+    Yields:
+        per-model result dicts, in input order
+    """
+    snapshot = cache.entries if cache is not None else None
+    scope = cache.scope if cache is not None else ""
+    window = jobs * 4
+
+    initargs = (game_dir, extra_paths, lazy, index_path, snapshot, scope)
+    with multiprocessing.Pool(jobs, _init_worker, initargs) as pool:
+        pending = deque()
+
+        def collect():
+            result, lookups, (pid, timing) = pending.popleft().get()
+            if worker_timings is not None:
+                worker_timings[pid] = timing
+            if cache is not None:
+                for key, hit, entry in lookups:
+                    cache.replay(key, hit, entry)
+            return result
+
+        for mdl_path in mdl_paths:
+            pending.append(pool.apply_async(_worker_resolve, (mdl_path,)))
+            if len(pending) >= window:
+                yield collect()
+        while pending:
+            yield collect()
+
+
+def find_mdl_dependencies(mdl_path, game_dir, extra_paths=None, cache_path=None,
+                          cache_size=DEFAULT_CACHE_SIZE, jobs=1, lazy=False, index_path=None):
+    """
+    Find all material dependencies for one or more MDL files using srctools.
+
+    The filesystem is mounted once and shared by every model in the batch.
+
+    Args:
+        mdl_path: Path to the MDL file (can be relative like "models/props/cube.mdl"),
+                  or a list of such paths to resolve as a batch
+        game_dir: Path to the game directory (e.g., Portal 2/portal2)
+        extra_paths: Additional search paths
+        cache_path: Optional path of a persistent dependency cache file
+        cache_size: Maximum number of models kept in the cache
+        jobs: Number of worker processes for a batch (1 resolves serially)
+        lazy: Mount VPKs on demand (see build_lazy_filesystem)
+        index_path: Content index used by lazy mounting
+
+    Returns:
+        dict with success status and materials list for a single path, or
+        a batch document (see merge_results) for a list of paths
+    """
+    batch = not isinstance(mdl_path, str)
+    mdl_paths = list(mdl_path) if batch else [mdl_path]
+
+    parallel = batch and jobs > 1 and len(mdl_paths) > 1
+
+    start = time.perf_counter()
+    try:
+        if parallel:
+            # Catch a bad game_dir or gameinfo.txt here rather than in every worker
+            search_path_layout(game_dir)
+            fsys = None
+        else:
+            fsys = build_filesystem(game_dir, extra_paths, lazy, index_path)
+    except Exception as e:
+        error = {"success": False, "error": str(e)}
+        if not batch:
+            error["mdlPath"] = normalize_mdl_path(mdl_path)
+        return error
+    # Workers mount their own filesystem and report its timing with each result
+    mount_ms = None if parallel else elapsed_ms(start)
+    worker_timings = {}
+
+    cache = None
+    if cache_path:
+        try:
+            scope = cache_scope(game_dir, content_sources(game_dir, extra_paths))
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+        cache = DependencyCache(cache_path, cache_size, scope)
+
+    if parallel:
+        try:
+            results = list(resolve_parallel(
+                mdl_paths, game_dir, extra_paths, min(jobs, len(mdl_paths)), cache,
+                lazy, index_path, worker_timings
+            ))
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+    else:
+        results = [resolve_mdl(fsys, path, cache) for path in mdl_paths]
+
+    result = results[0] if not batch else merge_results(results)
+
+    if cache is not None:
+        try:
+            cache.save()
+        except OSError as e:
+            print(f"Warning: failed to save dependency cache: {e}", file=sys.stderr)
+        result["cache"] = cache.stats()
+
+    result["timing"] = timing_report(fsys, mount_ms, start, list(worker_timings.values()))
+
+    return result
+
+
+def unique_paths(paths):
+    """Absolute paths with duplicates dropped, keeping priority order"""
+    seen = set()
+    unique = []
+    for path in paths:
+        key = os.path.normcase(os.path.abspath(path))
+        if key not in seen:
+            seen.add(key)
+            unique.append(os.path.abspath(path))
+    return unique
+
+
+class UnopenedVPK(srctools.filesys.FileSystem):
+    """Stands in for VPKFileSystem while search_path_layout() reads the layout"""
+
+
+def search_path_layout(game_dir):
+    """
+    List the sources the game filesystem is built from, in priority order.
+
+    This is srctools Game.get_filesystem() itself, run with VPKFileSystem
+    swapped for a placeholder so no archive is opened: strata head mounts,
+    every search path VPK (pak01_dir.vpk, pak02_dir.vpk, ... of each folder
+    and explicit .vpk paths with or without the suffix), the loose search
+    folders, then the remaining strata mounts.
+
+    Returns:
+        list of ("vpk" | "folder", path) tuples
+    """
+    import srctools.game as game_module
+    from srctools.filesys import VPKFileSystem
+
+    game = srctools.game.Game(game_dir)
+    original = game_module.VPKFileSystem
+    game_module.VPKFileSystem = UnopenedVPK
+    try:
+        fsys = game.get_filesystem()
+    finally:
+        game_module.VPKFileSystem = original
+
+    sources = []
+    for system, _prefix in fsys.systems:
+        kind = "vpk" if isinstance(system, (UnopenedVPK, VPKFileSystem)) else "folder"
+        sources.append((kind, str(system.path)))
+    return unique_sources(sources)
+
+
+def extra_sources(extra_paths):
+    """The existing --search-paths entries as ("vpk" | "folder", path) tuples"""
+    sources = []
+    for path in extra_paths or []:
+        if os.path.exists(path):
+            sources.append(("vpk" if path.endswith(".vpk") else "folder", path))
+    return sources
+
+
+def unique_sources(sources):
+    """Sources with absolute paths and duplicates dropped, keeping priority order"""
+    paths = unique_paths(path for _kind, path in sources)
+    kinds = {os.path.normcase(os.path.abspath(path)): kind for kind, path in reversed(sources)}
+    return [(kinds[os.path.normcase(path)], path) for path in paths]
+
+
+def content_sources(game_dir, extra_paths=None):
+    """
+    List every source the mounted filesystem would search, in priority order.
+
+    Search path sources come first (see search_path_layout), --search-paths last.
+    """
+    return unique_sources(search_path_layout(game_dir) + extra_sources(extra_paths))
+
+
+def archive_stamp(path):
+    """Return the (mtime, size) pair used to detect a changed archive"""
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def source_is_current(source):
+    """
+    Check an indexed source against its recorded stamp without reading it.
+
+    A VPK is compared by (mtime, size). A loose folder is compared by the mtime
+    of every directory recorded when it was read: adding, removing or renaming
+    a file or directory changes its parent's mtime, so this is one stat per
+    directory and no walk. Edits to a file's contents are not seen.
+    """
+    try:
+        if source["type"] == "vpk":
+            return list(archive_stamp(source["path"])) == [source["mtime"], source["size"]]
+        return all(os.stat(os.path.join(source["path"], folder)).st_mtime_ns == mtime
+                   for folder, mtime in source["dirs"].items())
+    except OSError:
+        return False
+
+
+def read_folder_tree(folder):
+    """
+    Read a loose folder into {path: [size, None]} (loose files have no CRC),
+    plus the {directory: mtime} stamp source_is_current() checks.
+    """
+    entries = {}
+    dirs = {}
+    for root, _dirs, files in os.walk(folder):
+        rel_root = os.path.relpath(root, folder)
+        dirs["" if rel_root == "." else rel_root.replace(os.sep, "/")] = os.stat(root).st_mtime_ns
+        for name in files:
+            full_path = os.path.join(root, name)
+            rel_path = os.path.relpath(full_path, folder).replace(os.sep, "/").lower()
+            entries[rel_path] = [os.path.getsize(full_path), None]
+    return entries, dirs
+
+
+def read_source(kind, path):
+    """Read a VPK or loose folder into its index record and {path: [size, crc]} tree"""
+    source = {"path": path, "type": kind}
+    if kind == "vpk":
+        # Stamp first, so a write during the read shows up as a change next time
+        source["mtime"], source["size"] = archive_stamp(path)
+        return source, read_vpk_tree(path)
+    tree, source["dirs"] = read_folder_tree(path)
+    return source, tree
+
+
+def read_vpk_tree(vpk_path):
+    """Read a VPK directory tree into {path: [size, crc]}"""
+    import srctools.vpk
+
+    vpk = srctools.vpk.VPK(vpk_path)
+    entries = {}
+    for info in vpk:
+        size = len(info.start_data) + info.arch_len
+        entries[info.filename.lower()] = [size, info.crc]
+    return entries
+
+
+def load_index(index_path):
+    """Load a content index file, or None if it is missing or from another version"""
+    try:
+        with open(index_path, "r", encoding="utf-8") as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(index, dict) or index.get("version") != INDEX_VERSION:
+        return None
+    return index
+
+
+def index_is_current(index, folders=True):
+    """
+    Check that every source in the index still has the recorded stamp.
+
+    With folders=False only the archives are checked (see query_content_index).
+    """
+    return all(source_is_current(source) for source in index["archives"]
+               if folders or source["type"] == "vpk")
+
+
+def build_content_index(game_dir, index_path, extra_paths=None):
+    """
+    Build (or refresh) the path -> (source, size, crc) content index.
+
+    Every source the mounted filesystem would search is indexed: VPKs and
+    loose search folders, in the same priority order. Sources whose stamp
+    matches the previous index are reused without being read, so a refresh
+    only re-reads from the first changed source onward.
+
+    Args:
+        game_dir: Path to the game directory (e.g., Portal 2/portal2)
+        index_path: Where to write the index JSON
+        extra_paths: Additional search paths (VPKs or folders)
+
+    Returns:
+        dict with success status and index statistics
+    """
+    start = time.perf_counter()
+    try:
+        sources = content_sources(game_dir, extra_paths)
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
+    # The index only keeps the winning entry for each path, so a source's tree
+    # can be recovered from the old index only while every source before it is
+    # unchanged and in the same order. Everything after the first change is re-read.
+    old_index = load_index(index_path)
+    reusable = 0
+    old_trees = []
+    if old_index is not None:
+        for archive_index, (kind, source_path) in enumerate(sources):
+            if archive_index >= len(old_index["archives"]):
+                break
+            old_archive = old_index["archives"][archive_index]
+            if (old_archive["path"], old_archive["type"]) != (source_path, kind) \
+                    or not source_is_current(old_archive):
+                break
+            reusable += 1
+        old_trees = [{} for _ in range(reusable)]
+        for file_path, (archive_index, size, crc) in old_index["files"].items():
+            if archive_index < reusable:
+                old_trees[archive_index][file_path] = [size, crc]
+
+    archives = []
+    files = {}
+    reread = 0
+    errors = []
+
+    for archive_index, (kind, source_path) in enumerate(sources):
+        try:
+            if archive_index < reusable:
+                source, tree = old_index["archives"][archive_index], old_trees[archive_index]
+            else:
+                source, tree = read_source(kind, source_path)
+                reread += 1
+        except Exception as e:
+            errors.append({"archive": source_path, "error": str(e)})
+            # Later sources can no longer be recovered from the old index either
+            reusable = min(reusable, archive_index)
+            continue
+
+        archive_slot = len(archives)
+        archives.append(source)
+        for file_path, (file_size, crc) in tree.items():
+            # Earlier archives take priority, just like the mounted filesystem
+            if file_path not in files:
+                files[file_path] = [archive_slot, file_size, crc]
+
+    index = {
+        "version": INDEX_VERSION,
+        "gameDir": os.path.abspath(game_dir),
+        "extraPaths": list(extra_paths or []),
+        "archives": archives,
+        "files": files
+    }
+
+    index_dir = os.path.dirname(index_path)
+    if index_dir:
+        os.makedirs(index_dir, exist_ok=True)
+    tmp_path = index_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(index, f, separators=(",", ":"))
+    os.replace(tmp_path, index_path)
+
+    result = {
+        "success": True,
+        "index": index_path,
+        "archives": len(archives),
+        "archivesRead": reread,
+        "files": len(files),
+        "elapsedMs": round((time.perf_counter() - start) * 1000, 1)
+    }
+    if errors:
+        result["errors"] = errors
+    return result
+
+
+def answer_index_queries(index, paths):
+    """
+    Look paths up in a loaded content index.
+
+    Returns:
+        (results, found, folder_dependent): the result per path, how many exist,
+        and whether any answer could change if a loose folder did (a miss, or a
+        hit from a folder or any source after the first folder)
+    """
+    archives = index["archives"]
+    files = index["files"]
+    first_folder = next((slot for slot, source in enumerate(archives) if source["type"] != "vpk"),
+                        len(archives))
+    results = {}
+    found = 0
+    folder_dependent = False
+
+    for path in paths:
+        key = path.replace("\\", "/").lower()
+        entry = files.get(key)
+        if entry is None:
+            results[path] = {"exists": False}
+            folder_dependent = True
+            continue
+        archive_index, size, crc = entry
+        results[path] = {
+            "exists": True,
+            "archive": archives[archive_index]["path"],
+            "type": archives[archive_index]["type"],
+            "size": size,
+            "crc": crc
+        }
+        folder_dependent = folder_dependent or archive_index >= first_folder
+        found += 1
+
+    return results, found, folder_dependent
+
+
+def query_content_index(index_path, paths):
+    """
+    Answer "does this exist and where" for many paths from a content index.
+
+    No VPK is mounted. If an indexed archive changed since the index was built,
+    the index is rebuilt first from the game directory recorded inside it.
+    Loose folders are only checked (one stat per directory, see
+    source_is_current) when an answer depends on them, i.e. a query missed or
+    was answered by a folder, and the index is rebuilt if one changed.
+
+    Args:
+        index_path: Path of an index written by build_content_index
+        paths: Game-relative file paths (e.g. "materials/metal/black_wall_metal_002a.vmt")
+
+    Returns:
+        dict with success status and a result per path
+    """
+    start = time.perf_counter()
+    index = load_index(index_path)
+    if index is None:
+        return {
+            "success": False,
+            "error": f"Content index not found or unreadable: {index_path}. Run index-build first."
+        }
+
+    rebuilt = False
+    results = None
+    if index_is_current(index, folders=False):
+        results, found, folder_dependent = answer_index_queries(index, paths)
+        if folder_dependent and not index_is_current(index):
+            results = None
+
+    if results is None:
+        build = build_content_index(index["gameDir"], index_path, index.get("extraPaths"))
+        if not build.get("success"):
+            return build
+        index = load_index(index_path)
+        if index is None:
+            return {"success": False, "error": f"Content index could not be rebuilt: {index_path}"}
+        results, found, _folder_dependent = answer_index_queries(index, paths)
+        rebuilt = True
+
+    return {
+        "success": True,
+        "rebuilt": rebuilt,
+        "queried": len(paths),
+        "found": found,
+        "results": results,
+        "elapsedMs": round((time.perf_counter() - start) * 1000, 1)
+    }
+
+
+def load_path_list(list_path, key="models"):
+    """Read paths from a JSON file (a list, or an object holding a list under key)"""
+    with open(list_path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if isinstance(data, dict):
+        data = data.get(key, [])
+    if not isinstance(data, list):
+        raise ValueError("Path list must be a JSON array of paths")
+    return [str(path) for path in data]
+
+
+def split_search_paths(search_paths):
+    """Parse the semicolon-separated --search-paths value"""
+    if not search_paths:
+        return None
+    return [p.strip() for p in search_paths.split(";") if p.strip()] or None
+
+
+def index_main(argv):
+    """Entry point for the index-build / index-query subcommands"""
+    parser = argparse.ArgumentParser(
+        prog="find_mdl_deps.py",
+        description="Build or query the game content index"
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = subparsers.add_parser("index-build", help="Index the game's VPK and loose contents")
+    build_parser.add_argument("game_dir", help="Path to the game directory (e.g., Portal 2/portal2)")
+    build_parser.add_argument("--index", required=True, help="Index file to write")
+    build_parser.add_argument(
+        "--search-paths",
+        help="Additional search paths (semicolon-separated)",
+        default=""
+    )
+
+    query_parser = subparsers.add_parser("index-query", help="Look paths up in a content index")
+    query_parser.add_argument("index", help="Index file written by index-build")
+    query_parser.add_argument("paths", nargs="*", help="Game-relative file paths")
+    query_parser.add_argument(
+        "--paths-file",
+        help="JSON file containing a list of paths to look up",
+        default=None
+    )
+
+    args = parser.parse_args(argv)
+
+    if args.command == "index-build":
+        result = build_content_index(args.game_dir, args.index, split_search_paths(args.search_paths))
+    else:
+        paths = list(args.paths)
+        if args.paths_file:
+            try:
+                paths.extend(load_path_list(args.paths_file, "paths"))
+            except Exception as e:
+                print(json.dumps({"success": False, "error": f"Failed to read path list: {e}"}))
+                sys.exit(1)
+        result = query_content_index(args.index, paths)
+
+    print(json.dumps(result, indent=2))
+
+    if not result.get("success"):
+        sys.exit(1)
+
+
 def main():
+    if len(sys.argv) > 1 and sys.argv[1] in ("index-build", "index-query"):
+        index_main(sys.argv[1:])
+        return
+
     parser = argparse.ArgumentParser(
         description="Find material dependencies for Source Engine MDL files"
     )
-    parser.add_argument("mdl_path", help="Path to the MDL file")
+    parser.add_argument("mdl_paths", nargs="*", help="Path(s) to the MDL file(s)")
     parser.add_argument("game_dir", help="Path to the game directory (e.g., Portal 2/portal2)")
     parser.add_argument(
         "--search-paths",
         help="Additional search paths (semicolon-separated)",
         default=""
     )
+    parser.add_argument(
+        "--mdl-list",
+        help="JSON file containing a list of MDL paths to resolve as one batch",
+        default=None
+    )
+    parser.add_argument(
+        "--cache",
+        help="Persistent dependency cache file (JSON)",
+        default=None
+    )
+    parser.add_argument(
+        "--cache-size",
+        help=f"Maximum number of cached models (default: {DEFAULT_CACHE_SIZE})",
+        type=int,
+        default=DEFAULT_CACHE_SIZE
+    )
+    parser.add_argument(
+        "--jobs",
+        help="Number of worker processes for batch resolution (default: 1)",
+        type=int,
+        default=1
+    )
+    parser.add_argument(
+        "--vmf",
+        help="VMF file to compute the full asset closure of (may be repeated)",
+        action="append",
+        default=[]
+    )
+    parser.add_argument(
+        "--graph",
+        help="Output the dependency graph (nodes, edges, sizes) of the given MDLs",
+        action="store_true"
+    )
+    parser.add_argument(
+        "--lazy",
+        help="Only read a VPK's directory tree when a lookup first reaches it",
+        action="store_true"
+    )
+    parser.add_argument(
+        "--index",
+        help="Content index (from index-build) that lets --lazy skip archives entirely",
+        default=None
+    )
 
     args = parser.parse_args()
 
     # Parse extra paths
-    extra_paths = None
-    if args.search_paths:
-        extra_paths = [p.strip() for p in args.search_paths.split(";") if p.strip()]
+    extra_paths = split_search_paths(args.search_paths)
+
+    mdl_paths = list(args.mdl_paths)
+    if args.mdl_list:
+        try:
+            mdl_paths.extend(load_path_list(args.mdl_list))
+        except Exception as e:
+            print(json.dumps({"success": False, "error": f"Failed to read MDL list: {e}"}))
+            sys.exit(1)
+
+    # A VMF closure or graph is one PackList walk: there is nothing to cache or spread out
+    if (args.vmf or args.graph) and (args.cache or args.jobs != 1):
+        parser.error("--cache and --jobs only apply to MDL dependency lists, not --vmf or --graph")
 
-    # Find dependencies
-    result = find_mdl_dependencies(args.mdl_path, args.game_dir, extra_paths)
+    if args.vmf:
+        result = find_vmf_dependencies(
+            args.vmf, args.game_dir, extra_paths, mdl_paths,
+            lazy=args.lazy, index_path=args.index
+        )
+    elif not mdl_paths:
+        parser.error("at least one MDL path (or --mdl-list / --vmf) is required")
+    elif args.graph:
+        result = build_dependency_graph(
+            mdl_paths, args.game_dir, extra_paths, lazy=args.lazy, index_path=args.index
+        )
+    else:
+        # Find dependencies - a single positional path keeps the original output shape
+        if len(mdl_paths) == 1 and not args.mdl_list:
+            targets = mdl_paths[0]
+        else:
+            targets = mdl_paths
+        result = find_mdl_dependencies(
+            targets, args.game_dir, extra_paths,
+            cache_path=args.cache, cache_size=args.cache_size, jobs=max(1, args.jobs),
+            lazy=args.lazy, index_path=args.index
+        )
 
     # Output as JSON
     print(json.dumps(result, indent=2))
@@ -144,4 +1646,6 @@ def main():
 
 
 if __name__ == "__main__":
+    # Required for worker processes in the frozen executable
+    multiprocessing.freeze_support()
     main()
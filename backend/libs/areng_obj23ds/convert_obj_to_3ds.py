@@ -1,10 +1,16 @@
 #!/usr/bin/env python3
 """
-OBJ to 3DS Converter - No External Dependencies
+OBJ to 3DS Converter - Standard Library Only (NumPy Optional)
 Converts OBJ files to 3DS format for Portal 2 Puzzle Maker collision models
 
 Usage:
     python convert_obj_to_3ds.py input.obj output.3ds [scale] [roll] [pitch] [yaw]
+                                 [--weld TOLERANCE] [--decimate FACES] [--max-error DISTANCE]
+                                 [--collision mesh|hull|box] [--pieces N]
+    python convert_obj_to_3ds.py --manifest jobs.json [--jobs N] [options]
+    python convert_obj_to_3ds.py atlas.obj output_dir [scale] [roll] [pitch] [yaw]
+                                 --split-layout atlas_layout.json [--split-format obj|3ds]
+                                 [--name-prefix NAME] [--split-cells CELLS] [options]
 
 Arguments:
     input.obj  - Path to input OBJ file
@@ -14,14 +20,94 @@ Arguments:
     pitch      - Optional pitch rotation in degrees around Y-axis (default: 0)
     yaw        - Optional yaw rotation in degrees around Z-axis (default: 0)
 
+Options:
+    --weld TOLERANCE       - Merge vertices within TOLERANCE and drop degenerate/duplicate faces
+    --decimate FACES       - Simplify the mesh to about this many triangles (quadric edge collapse)
+    --max-error DISTANCE   - Simplify while the surface stays within DISTANCE of the original
+    --collision MODE       - mesh (default), hull (convex hull) or box (oriented bounding box)
+    --pieces N             - With hull/box, approximate convex decomposition into N object blocks
+    --manifest FILE        - Convert a JSON list of {input, output, scale, roll, pitch, yaw} jobs
+                             (optionally weld/decimate/maxError/collision/pieces) in one run,
+                             printing a JSON line per job and a final summary line
+    --jobs N               - Worker processes for --manifest (default: 1)
+    --split-layout LAYOUT  - Treat input.obj as a merge.py grid atlas and split it by LAYOUT
+                             (its _layout.json) into per-cell files in the output directory,
+                             streaming the atlas once; prints a JSON result line
+    --split-format FORMAT  - obj (default; with a copy of the .mtl) or 3ds (scale, rotation
+                             and the options above apply per cell)
+    --name-prefix NAME     - Name split cells NAME_<index> instead of by layout name
+    --split-cells CELLS    - Only rewrite these comma-separated layout indices (merge.py's
+                             dirtyCells); other cells keep their files from the last split
+
 Requirements:
     None - uses only Python standard library
+    NumPy is used when available to parse and transform large OBJs in bulk
 """
 
 import sys
 import os
+import re
 import struct
 import math
+import io
+import json
+import time
+import heapq
+import itertools
+import operator
+import argparse
+import shutil
+import tempfile
+import contextlib
+import multiprocessing
+from array import array
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Bulk OBJ record patterns for the NumPy parser
+VERTEX_RECORD = re.compile(r'^[ \t]*v[ \t]+([^\n]*)', re.MULTILINE)
+FACE_RECORD = re.compile(r'^[ \t]*f[ \t]+([^\n]*)', re.MULTILINE)
+FACE_REFERENCE_SUFFIX = re.compile(r'/\S*')
+
+
+def rotation_matrix(roll=0.0, pitch=0.0, yaw=0.0):
+    """
+    Build the 3x3 rotation matrix for Euler angles (in degrees)
+    Roll is applied first (X-axis), then pitch (Y-axis), then yaw (Z-axis),
+    so the result is Rz(yaw) * Ry(pitch) * Rx(roll)
+    """
+    roll_rad = math.radians(roll)
+    pitch_rad = math.radians(pitch)
+    yaw_rad = math.radians(yaw)
+
+    cos_roll, sin_roll = math.cos(roll_rad), math.sin(roll_rad)
+    cos_pitch, sin_pitch = math.cos(pitch_rad), math.sin(pitch_rad)
+    cos_yaw, sin_yaw = math.cos(yaw_rad), math.sin(yaw_rad)
+
+    return [
+        [cos_yaw * cos_pitch,
+         cos_yaw * sin_pitch * sin_roll - sin_yaw * cos_roll,
+         cos_yaw * sin_pitch * cos_roll + sin_yaw * sin_roll],
+        [sin_yaw * cos_pitch,
+         sin_yaw * sin_pitch * sin_roll + cos_yaw * cos_roll,
+         sin_yaw * sin_pitch * cos_roll - cos_yaw * sin_roll],
+        [-sin_pitch,
+         cos_pitch * sin_roll,
+         cos_pitch * cos_roll],
+    ]
+
+
+def apply_rotation(matrix, x, y, z):
+    """Multiply a vertex by a rotation matrix from rotation_matrix()"""
+    return (
+        matrix[0][0] * x + matrix[0][1] * y + matrix[0][2] * z,
+        matrix[1][0] * x + matrix[1][1] * y + matrix[1][2] * z,
+        matrix[2][0] * x + matrix[2][1] * y + matrix[2][2] * z,
+    )
 
 
 def rotate_vertex(x, y, z, roll=0.0, pitch=0.0, yaw=0.0):
@@ -31,30 +117,7 @@ def rotate_vertex(x, y, z, roll=0.0, pitch=0.0, yaw=0.0):
     Pitch: rotation around Y-axis  
     Yaw: rotation around Z-axis
     """
-    # Convert degrees to radians
-    roll_rad = math.radians(roll)
-    pitch_rad = math.radians(pitch)
-    yaw_rad = math.radians(yaw)
-    
-    # Roll rotation (around X-axis)
-    cos_roll = math.cos(roll_rad)
-    sin_roll = math.sin(roll_rad)
-    y_rolled = y * cos_roll - z * sin_roll
-    z_rolled = y * sin_roll + z * cos_roll
-    
-    # Pitch rotation (around Y-axis)
-    cos_pitch = math.cos(pitch_rad)
-    sin_pitch = math.sin(pitch_rad)
-    x_pitched = x * cos_pitch + z_rolled * sin_pitch
-    z_pitched = -x * sin_pitch + z_rolled * cos_pitch
-    
-    # Yaw rotation (around Z-axis)
-    cos_yaw = math.cos(yaw_rad)
-    sin_yaw = math.sin(yaw_rad)
-    x_final = x_pitched * cos_yaw - y_rolled * sin_yaw
-    y_final = x_pitched * sin_yaw + y_rolled * cos_yaw
-    
-    return x_final, y_final, z_pitched
+    return apply_rotation(rotation_matrix(roll, pitch, yaw), x, y, z)
 
 
 def parse_obj_file(obj_path, scale=1.0, roll=0.0, pitch=0.0, yaw=0.0):
@@ -68,10 +131,92 @@ def parse_obj_file(obj_path, scale=1.0, roll=0.0, pitch=0.0, yaw=0.0):
     - pitch: pitch rotation in degrees around Y-axis (default: 0)
     - yaw: yaw rotation in degrees around Z-axis (default: 0)
     """
+    print(f"Parsing OBJ file: {obj_path}")
+
+    if np is not None:
+        vertices, faces = parse_obj_file_numpy(obj_path, scale, roll, pitch, yaw)
+    else:
+        vertices, faces = parse_obj_file_stdlib(obj_path, scale, roll, pitch, yaw)
+
+    print(f"  Loaded {len(vertices)} vertices")
+    print(f"  Loaded {len(faces)} faces")
+
+    if len(vertices) == 0:
+        raise ValueError("No vertices found in OBJ file")
+    if len(faces) == 0:
+        raise ValueError("No faces found in OBJ file")
+
+    return vertices, faces
+
+
+def parse_obj_file_numpy(obj_path, scale=1.0, roll=0.0, pitch=0.0, yaw=0.0):
+    """
+    Vectorized parse_obj_file: bulk-loads the v/f records into arrays, then
+    scales and rotates every vertex with one matrix multiply and fan-triangulates
+    all faces at once. Returns (vertices, faces) as (N, 3) float64 and (M, 3)
+    int64 arrays, in the same order as the stdlib parser.
+    """
+    with open(obj_path, 'r') as f:
+        text = f.read()
+
+    vertices = parse_vertex_records(VERTEX_RECORD.findall(text))
+    matrix = np.array(rotation_matrix(roll, pitch, yaw), dtype=np.float64)
+    vertices = (vertices * scale) @ matrix.T
+
+    faces = triangulate_face_records(FACE_RECORD.findall(text))
+    return vertices, faces
+
+
+def tokens_per_line(text, line_count):
+    """Count whitespace-separated tokens on each line of text, without splitting it"""
+    chars = np.frombuffer(text.encode(), dtype=np.uint8)
+    newline = chars == ord('\n')
+    blank = newline | (chars == ord(' ')) | (chars == ord('\t')) | (chars == ord('\r'))
+    token_start = ~blank & np.concatenate(([True], blank[:-1]))
+    line_ids = np.cumsum(newline)
+    return np.bincount(line_ids[token_start], minlength=line_count)
+
+
+def parse_vertex_records(records):
+    """Convert "x y z" vertex records to an (N, 3) array"""
+    text = "\n".join(records)
+    if np.all(tokens_per_line(text, len(records)) == 3):
+        return np.fromstring(text, dtype=np.float64, sep=' ').reshape(-1, 3)
+
+    # Some records carry w or vertex colours (or are short); go line by line.
+    # Records with fewer than 3 coordinates are skipped, as in the stdlib parser
+    rows = [record.split()[:3] for record in records]
+    rows = [row for row in rows if len(row) == 3]
+    return np.array(rows, dtype=np.float64).reshape(-1, 3)
+
+
+def triangulate_face_records(records):
+    """Fan-triangulate OBJ face records ("v[/vt][/vn] ..." strings) in bulk"""
+    text = "\n".join(records)
+    if '/' in text:
+        # Keep only the vertex index of "v/vt", "v/vt/vn" and "v//vn"
+        text = FACE_REFERENCE_SUFFIX.sub('', text)
+    indices = np.fromstring(text, dtype=np.int64, sep=' ') - 1  # Convert to 0-based
+
+    counts = tokens_per_line(text, len(records))
+    if counts.sum() != indices.size:
+        raise ValueError("Malformed face record in OBJ file")
+
+    # Face with n corners -> n - 2 triangles (first, i, i + 1)
+    starts = np.cumsum(counts) - counts
+    triangle_counts = np.maximum(counts - 2, 0)
+    firsts = np.repeat(starts, triangle_counts)
+    local = np.arange(int(triangle_counts.sum())) - np.repeat(np.cumsum(triangle_counts) - triangle_counts, triangle_counts)
+    seconds = firsts + 1 + local
+
+    return np.stack([indices[firsts], indices[seconds], indices[seconds + 1]], axis=1)
+
+
+def parse_obj_file_stdlib(obj_path, scale=1.0, roll=0.0, pitch=0.0, yaw=0.0):
+    """Pure-Python parse_obj_file, used when NumPy is not installed"""
     vertices = []
     faces = []
-
-    print(f"Parsing OBJ file: {obj_path}")
+    matrix = rotation_matrix(roll, pitch, yaw)
 
     with open(obj_path, 'r') as f:
         for line in f:
@@ -85,7 +230,7 @@ def parse_obj_file(obj_path, scale=1.0, roll=0.0, pitch=0.0, yaw=0.0):
                     # Apply scale factor to vertices
                     x_scaled, y_scaled, z_scaled = x * scale, y * scale, z * scale
                     # Apply rotation
-                    x_rotated, y_rotated, z_rotated = rotate_vertex(x_scaled, y_scaled, z_scaled, roll, pitch, yaw)
+                    x_rotated, y_rotated, z_rotated = apply_rotation(matrix, x_scaled, y_scaled, z_scaled)
                     vertices.append([x_rotated, y_rotated, z_rotated])
 
             elif line.startswith('f '):
@@ -111,15 +256,1231 @@ def parse_obj_file(obj_path, scale=1.0, roll=0.0, pitch=0.0, yaw=0.0):
                             vertex_indices[i + 1]
                         ])
 
-    print(f"  Loaded {len(vertices)} vertices")
-    print(f"  Loaded {len(faces)} faces")
+    return vertices, faces
 
-    if not vertices:
-        raise ValueError("No vertices found in OBJ file")
-    if not faces:
-        raise ValueError("No faces found in OBJ file")
 
-    return vertices, faces
+# Neighbouring grid cells checked when welding with a tolerance
+NEIGHBOUR_CELLS = [(dx, dy, dz) for dx in (0, -1, 1) for dy in (0, -1, 1) for dz in (0, -1, 1)]
+
+
+def weld_vertices(vertices, faces, tolerance=0.0):
+    """
+    Merge vertices closer than tolerance and drop the faces that become useless.
+
+    Faces are remapped to the kept vertices, then dropped if they are
+    degenerate (two corners merged, or thinner than tolerance) or repeat an
+    earlier face with the same winding. Vertices no longer used by any face
+    are removed.
+
+    Returns (vertices, faces, stats) where stats holds the before/after counts
+    and how many faces were dropped as degenerate or duplicate.
+    """
+    if np is not None and isinstance(faces, np.ndarray):
+        return weld_vertices_numpy(vertices, faces, tolerance)
+    return weld_vertices_stdlib(vertices, faces, tolerance)
+
+
+def weld_vertices_stdlib(vertices, faces, tolerance=0.0):
+    """
+    weld_vertices for plain lists. Vertices are hashed into a grid of
+    tolerance-sized cells, so each one is only compared against the kept
+    vertices in its own and the 26 surrounding cells (exact duplicates
+    short-circuit through a dict).
+    """
+    points = vertices
+    face_list = faces
+
+    exact = {}
+    grid = {}
+    kept = []
+    remap = []
+    for point in points:
+        key = (point[0], point[1], point[2])
+        match = exact.get(key)
+        if match is None and tolerance > 0:
+            cx = math.floor(point[0] / tolerance)
+            cy = math.floor(point[1] / tolerance)
+            cz = math.floor(point[2] / tolerance)
+            for dx, dy, dz in NEIGHBOUR_CELLS:
+                for candidate in grid.get((cx + dx, cy + dy, cz + dz), ()):
+                    if math.dist(point, kept[candidate]) <= tolerance:
+                        match = candidate
+                        break
+                if match is not None:
+                    break
+            if match is None:
+                grid.setdefault((cx, cy, cz), []).append(len(kept))
+        if match is None:
+            match = len(kept)
+            kept.append(key)
+        exact.setdefault(key, match)
+        remap.append(match)
+
+    degenerate = 0
+    duplicate = 0
+    seen = set()
+    welded_faces = []
+    for face in face_list:
+        a, b, c = remap[face[0]], remap[face[1]], remap[face[2]]
+        if a == b or b == c or a == c:
+            degenerate += 1
+            continue
+        nx, ny, nz = face_normal(kept[a], kept[b], kept[c])
+        longest = max(math.dist(kept[a], kept[b]), math.dist(kept[b], kept[c]), math.dist(kept[c], kept[a]))
+        # Height over the longest edge = 2 * area / longest = |normal| / longest
+        if math.sqrt(nx * nx + ny * ny + nz * nz) <= tolerance * longest:
+            degenerate += 1
+            continue
+        # Same triangle and winding regardless of which corner comes first
+        key = min((a, b, c), (b, c, a), (c, a, b))
+        if key in seen:
+            duplicate += 1
+            continue
+        seen.add(key)
+        welded_faces.append([a, b, c])
+
+    # Compact away vertices that only belonged to dropped faces
+    used = {}
+    new_vertices = []
+    new_faces = []
+    for face in welded_faces:
+        remapped = []
+        for corner in face:
+            if corner not in used:
+                used[corner] = len(new_vertices)
+                new_vertices.append(list(kept[corner]))
+            remapped.append(used[corner])
+        new_faces.append(remapped)
+
+    stats = {
+        "verticesBefore": len(points),
+        "verticesAfter": len(new_vertices),
+        "facesBefore": len(face_list),
+        "facesAfter": len(new_faces),
+        "degenerateFaces": degenerate,
+        "duplicateFaces": duplicate,
+    }
+    return new_vertices, new_faces, stats
+
+
+# Grids weld_vertices_numpy snaps to in turn: every mix of quarter and three
+# quarter cell offsets per axis, so a cluster less than half a cell across
+# fits one cell of at least one grid. Each grid can move a vertex one cell
+# diagonal, and the cells are sized to keep the total within the tolerance
+WELD_GRID_OFFSETS = list(itertools.product((0.25, 0.75), repeat=3))
+WELD_CELLS_PER_TOLERANCE = len(WELD_GRID_OFFSETS) * math.sqrt(3)
+
+
+def first_of_groups(keys):
+    """
+    Group equal rows of keys. Returns the index of each group's first row, in
+    input order, and the group number of every row.
+    """
+    _unique, first, inverse = np.unique(keys, axis=0, return_index=True, return_inverse=True)
+    order = np.argsort(first)
+    rank = np.empty_like(order)
+    rank[order] = np.arange(len(order))
+    return first[order], rank[inverse.ravel()]
+
+
+def weld_vertices_numpy(vertices, faces, tolerance=0.0):
+    """
+    weld_vertices for NumPy arrays. Vertices are snapped to a grid of cells
+    much smaller than tolerance and grouped with np.unique, then the groups
+    again on each shifted grid in WELD_GRID_OFFSETS. Each group keeps its
+    first vertex and never reaches past tolerance from it. Clusters under
+    tolerance / 28 across (float noise) always merge, but unlike the list
+    path, vertices further apart than that may stay separate.
+    """
+    points = np.asarray(vertices, dtype=np.float64)[:, :3]
+    faces = np.asarray(faces, dtype=np.int64)[:, :3]
+
+    if tolerance > 0:
+        cell = tolerance / WELD_CELLS_PER_TOLERANCE
+        kept, remap = points, np.arange(len(points))
+        for offset in WELD_GRID_OFFSETS:
+            first, regroup = first_of_groups(np.floor(kept / cell + offset))
+            kept, remap = kept[first], regroup[remap]
+    else:
+        first, remap = first_of_groups(points)
+        kept = points[first]
+
+    welded = remap[faces]
+    a, b, c = welded.T
+    merged = (a == b) | (b == c) | (a == c)
+    pa, pb, pc = kept[a], kept[b], kept[c]
+    normal = np.cross(pb - pa, pc - pa)
+    longest = np.maximum.reduce([np.linalg.norm(pa - pb, axis=1), np.linalg.norm(pb - pc, axis=1),
+                                 np.linalg.norm(pc - pa, axis=1)])
+    # Height over the longest edge = 2 * area / longest = |normal| / longest
+    thin = np.linalg.norm(normal, axis=1) <= tolerance * longest
+    welded = welded[~(merged | thin)]
+
+    # Same triangle and winding regardless of which corner comes first
+    start = welded.argmin(axis=1)[:, None]
+    rotated = np.take_along_axis(welded, (start + np.arange(3)) % 3, axis=1)
+    first, _groups = first_of_groups(rotated)
+    first.sort()
+    kept_faces = welded[first]
+
+    # Compact away vertices that only belonged to dropped faces, numbered by first use
+    used, _groups = first_of_groups(kept_faces.reshape(-1, 1))
+    used = kept_faces.ravel()[used]
+    renumber = np.empty(len(kept), dtype=np.int64)
+    renumber[used] = np.arange(len(used))
+
+    stats = {
+        "verticesBefore": len(points),
+        "verticesAfter": len(used),
+        "facesBefore": len(faces),
+        "facesAfter": len(kept_faces),
+        "degenerateFaces": int(np.count_nonzero(merged | thin)),
+        "duplicateFaces": len(welded) - len(kept_faces),
+    }
+    return kept[used], renumber[kept_faces], stats
+
+
+def percent_smaller(before, after):
+    return 100.0 * (before - after) / before if before else 0.0
+
+
+# Decimation: boundary edges get a perpendicular plane with this weight so open
+# borders keep their outline while interior detail collapses
+BOUNDARY_WEIGHT = 100.0
+SINGULAR_EPSILON = 1e-12
+DEVIATION_BATCH = 65536  # (point, triangle) pairs measured per NumPy batch
+
+
+def plane_quadric(a, b, c, d, weight=1.0):
+    """Quadric of the plane ax + by + cz + d = 0 as its 10 unique matrix terms"""
+    return (
+        weight * a * a, weight * a * b, weight * a * c, weight * a * d,
+        weight * b * b, weight * b * c, weight * b * d,
+        weight * c * c, weight * c * d,
+        weight * d * d,
+    )
+
+
+def add_quadrics(q, r):
+    return tuple(map(operator.add, q, r))
+
+
+def quadric_error(q, x, y, z):
+    """Sum of squared distances from (x, y, z) to the planes accumulated in q"""
+    return (q[0] * x * x + 2 * q[1] * x * y + 2 * q[2] * x * z + 2 * q[3] * x
+            + q[4] * y * y + 2 * q[5] * y * z + 2 * q[6] * y
+            + q[7] * z * z + 2 * q[8] * z + q[9])
+
+
+def optimal_position(q, p1, p2):
+    """Point minimizing q; falls back to the best of the endpoints and midpoint"""
+    a11, a12, a13, b1, a22, a23, b2, a33, b3, _ = q
+    # Cofactors of the symmetric 3x3 system A p = -b
+    c11 = a22 * a33 - a23 * a23
+    c12 = a23 * a13 - a12 * a33
+    c13 = a12 * a23 - a22 * a13
+    det = a11 * c11 + a12 * c12 + a13 * c13
+    if abs(det) > SINGULAR_EPSILON:
+        c22 = a11 * a33 - a13 * a13
+        c23 = a12 * a13 - a11 * a23
+        c33 = a11 * a22 - a12 * a12
+        x = -(c11 * b1 + c12 * b2 + c13 * b3) / det
+        y = -(c12 * b1 + c22 * b2 + c23 * b3) / det
+        z = -(c13 * b1 + c23 * b2 + c33 * b3) / det
+        # At the minimum the error reduces to b . p + q[9]
+        return (x, y, z), b1 * x + b2 * y + b3 * z + q[9]
+
+    midpoint = tuple((u + v) / 2 for u, v in zip(p1, p2))
+    return min(((p, quadric_error(q, *p)) for p in (p1, p2, midpoint)), key=lambda item: item[1])
+
+
+def face_normal(p0, p1, p2):
+    """Unnormalized normal of a triangle"""
+    ux, uy, uz = p1[0] - p0[0], p1[1] - p0[1], p1[2] - p0[2]
+    vx, vy, vz = p2[0] - p0[0], p2[1] - p0[1], p2[2] - p0[2]
+    return (uy * vz - uz * vy, uz * vx - ux * vz, ux * vy - uy * vx)
+
+
+def point_triangle_distance(p, a, b, c):
+    """Distance from p to the closest point of triangle abc (Ericson, Real-Time Collision Detection 5.1.5)"""
+    abx, aby, abz = b[0] - a[0], b[1] - a[1], b[2] - a[2]
+    acx, acy, acz = c[0] - a[0], c[1] - a[1], c[2] - a[2]
+    apx, apy, apz = p[0] - a[0], p[1] - a[1], p[2] - a[2]
+    d1 = abx * apx + aby * apy + abz * apz
+    d2 = acx * apx + acy * apy + acz * apz
+    if d1 <= 0 and d2 <= 0:
+        closest = a
+    else:
+        bpx, bpy, bpz = p[0] - b[0], p[1] - b[1], p[2] - b[2]
+        d3 = abx * bpx + aby * bpy + abz * bpz
+        d4 = acx * bpx + acy * bpy + acz * bpz
+        cpx, cpy, cpz = p[0] - c[0], p[1] - c[1], p[2] - c[2]
+        d5 = abx * cpx + aby * cpy + abz * cpz
+        d6 = acx * cpx + acy * cpy + acz * cpz
+        vc = d1 * d4 - d3 * d2
+        vb = d5 * d2 - d1 * d6
+        va = d3 * d6 - d5 * d4
+        if d3 >= 0 and d4 <= d3:
+            closest = b
+        elif d6 >= 0 and d5 <= d6:
+            closest = c
+        elif vc <= 0 and d1 >= 0 and d3 <= 0 and d1 != d3:
+            t = d1 / (d1 - d3)
+            closest = (a[0] + t * abx, a[1] + t * aby, a[2] + t * abz)
+        elif vb <= 0 and d2 >= 0 and d6 <= 0 and d2 != d6:
+            t = d2 / (d2 - d6)
+            closest = (a[0] + t * acx, a[1] + t * acy, a[2] + t * acz)
+        elif va <= 0 and d4 - d3 >= 0 and d5 - d6 >= 0 and (d4 - d3) + (d5 - d6) != 0:
+            t = (d4 - d3) / ((d4 - d3) + (d5 - d6))
+            closest = (b[0] + t * (c[0] - b[0]), b[1] + t * (c[1] - b[1]), b[2] + t * (c[2] - b[2]))
+        elif va + vb + vc == 0:
+            # Degenerate triangle that no edge region caught (zero-length edges
+            # are skipped above): use its nearest corner
+            return min(math.dist(p, corner) for corner in (a, b, c))
+        else:
+            denom = 1.0 / (va + vb + vc)
+            v, w = vb * denom, vc * denom
+            closest = (a[0] + abx * v + acx * w, a[1] + aby * v + acy * w, a[2] + abz * v + acz * w)
+    return math.dist(p, closest)
+
+
+def collapse_setup_stdlib(positions, face_list):
+    """
+    Starting state for decimate_mesh: each vertex's quadric (as a tuple of its
+    10 terms) and a heap entry for every edge of a non-degenerate face.
+    """
+    quadrics = [(0.0,) * 10 for _ in positions]
+    edge_use = {}
+    for a, b, c in face_list:
+        nx, ny, nz = face_normal(positions[a], positions[b], positions[c])
+        length = math.sqrt(nx * nx + ny * ny + nz * nz)
+        if length == 0:
+            continue
+        nx, ny, nz = nx / length, ny / length, nz / length
+        d = -(nx * positions[a][0] + ny * positions[a][1] + nz * positions[a][2])
+        q = plane_quadric(nx, ny, nz, d)
+        for vertex in (a, b, c):
+            quadrics[vertex] = add_quadrics(quadrics[vertex], q)
+        for u, v in ((a, b), (b, c), (c, a)):
+            key = (u, v) if u < v else (v, u)
+            edge_use[key] = (edge_use.get(key, (0, None))[0] + 1, (nx, ny, nz))
+
+    # Open borders: constrain movement away from the edge within the face's plane
+    for (u, v), (count, normal) in edge_use.items():
+        if count != 1:
+            continue
+        pu, pv = positions[u], positions[v]
+        ex, ey, ez = pv[0] - pu[0], pv[1] - pu[1], pv[2] - pu[2]
+        px = ey * normal[2] - ez * normal[1]
+        py = ez * normal[0] - ex * normal[2]
+        pz = ex * normal[1] - ey * normal[0]
+        length = math.sqrt(px * px + py * py + pz * pz)
+        if length == 0:
+            continue
+        px, py, pz = px / length, py / length, pz / length
+        q = plane_quadric(px, py, pz, -(px * pu[0] + py * pu[1] + pz * pu[2]), BOUNDARY_WEIGHT)
+        quadrics[u] = add_quadrics(quadrics[u], q)
+        quadrics[v] = add_quadrics(quadrics[v], q)
+
+    heap = []
+    for u, v in edge_use:
+        target, cost = optimal_position(add_quadrics(quadrics[u], quadrics[v]), positions[u], positions[v])
+        heap.append((max(cost, 0.0), u, v, 0, 0, target))
+    return quadrics, heap
+
+
+def collapse_setup_numpy(vertices, face_list):
+    """
+    collapse_setup_stdlib with the per-face and per-edge work done as array
+    operations. Terms are summed in the same order, so both give the same
+    quadrics and the same collapses.
+    """
+    points = np.asarray(vertices, dtype=np.float64)[:, :3]
+    faces = np.array(face_list, dtype=np.int64).reshape(-1, 3)
+    quadrics = np.zeros((len(points), 10))
+
+    p0, p1, p2 = points[faces[:, 0]], points[faces[:, 1]], points[faces[:, 2]]
+    nx, ny, nz = np.cross(p1 - p0, p2 - p0).T
+    length = np.sqrt(nx * nx + ny * ny + nz * nz)
+    flat = length != 0
+    faces, p0 = faces[flat], p0[flat]
+    nx, ny, nz = nx[flat] / length[flat], ny[flat] / length[flat], nz[flat] / length[flat]
+    d = -(nx * p0[:, 0] + ny * p0[:, 1] + nz * p0[:, 2])
+    terms = np.column_stack(plane_quadric(nx, ny, nz, d))
+    # Corner by corner, face by face
+    np.add.at(quadrics, faces.ravel(), np.repeat(terms, 3, axis=0))
+
+    # Edges in the order the faces list them; edge i belongs to face i // 3
+    edges = np.sort(faces[:, [0, 1, 1, 2, 2, 0]].reshape(-1, 2), axis=1)
+    _keys, first, counts = np.unique(edges[:, 0] * len(points) + edges[:, 1],
+                                     return_index=True, return_counts=True)
+
+    # Open borders: constrain movement away from the edge within the face's plane
+    border = np.sort(first[counts == 1])
+    u, v = edges[border].T
+    nx, ny, nz = nx[border // 3], ny[border // 3], nz[border // 3]
+    ex, ey, ez = (points[v] - points[u]).T
+    px = ey * nz - ez * ny
+    py = ez * nx - ex * nz
+    pz = ex * ny - ey * nx
+    length = np.sqrt(px * px + py * py + pz * pz)
+    kept = length != 0
+    u, v = u[kept], v[kept]
+    px, py, pz = px[kept] / length[kept], py[kept] / length[kept], pz[kept] / length[kept]
+    pu = points[u]
+    terms = np.column_stack(plane_quadric(px, py, pz, -(px * pu[:, 0] + py * pu[:, 1] + pz * pu[:, 2]),
+                                          BOUNDARY_WEIGHT))
+    # u then v, edge by edge
+    np.add.at(quadrics, np.column_stack((u, v)).ravel(), np.repeat(terms, 2, axis=0))
+
+    edges = edges[first]
+    # optimal_position for every edge at once
+    u, v = edges.T
+    q = (quadrics[u] + quadrics[v]).T
+    a11, a12, a13, b1, a22, a23, b2, a33, b3, constant = q
+    c11 = a22 * a33 - a23 * a23
+    c12 = a23 * a13 - a12 * a33
+    c13 = a12 * a23 - a22 * a13
+    det = a11 * c11 + a12 * c12 + a13 * c13
+    solvable = np.abs(det) > SINGULAR_EPSILON
+    det = np.where(solvable, det, 1.0)
+    c22 = a11 * a33 - a13 * a13
+    c23 = a12 * a13 - a11 * a23
+    c33 = a11 * a22 - a12 * a12
+    x = -(c11 * b1 + c12 * b2 + c13 * b3) / det
+    y = -(c12 * b1 + c22 * b2 + c23 * b3) / det
+    z = -(c13 * b1 + c23 * b2 + c33 * b3) / det
+    targets = np.column_stack((x, y, z))
+    costs = b1 * x + b2 * y + b3 * z + constant
+
+    candidates = np.stack((points[u], points[v], (points[u] + points[v]) / 2))
+    errors = np.stack([quadric_error(q, *candidate.T) for candidate in candidates])
+    best = errors.argmin(axis=0)
+    singular = np.flatnonzero(~solvable)
+    targets[singular] = candidates[best[singular], singular]
+    costs[singular] = errors[best[singular], singular]
+
+    heap = list(zip(np.maximum(costs, 0.0).tolist(), u.tolist(), v.tolist(), itertools.repeat(0),
+                    itertools.repeat(0), map(tuple, targets.tolist())))
+    return [tuple(row) for row in quadrics.tolist()], heap
+
+
+def nearest_distances(coordinates, point_ids, corner_ids, groups):
+    """
+    Smallest point_triangle_distance in each group of (point, triangle) pairs.
+
+    Points and triangle corners are indices into coordinates (a list of tuples,
+    or an (n, 3) array to measure every pair at once); groups holds the index
+    of each group's first pair.
+    """
+    if np is not None and isinstance(coordinates, np.ndarray):
+        corners = coordinates[np.array(corner_ids, dtype=np.int64)]
+        distances = point_triangle_distances(coordinates[np.array(point_ids, dtype=np.int64)],
+                                             corners[:, 0], corners[:, 1], corners[:, 2])
+        return np.minimum.reduceat(distances, groups).tolist()
+    bounds = groups + [len(point_ids)]
+    return [min(point_triangle_distance(coordinates[point_ids[i]], *(coordinates[corner] for corner in corner_ids[i]))
+                for i in range(start, end))
+            for start, end in zip(bounds, bounds[1:])]
+
+
+def point_triangle_distances(p, a, b, c):
+    """point_triangle_distance for each row of (n, 3) arrays"""
+    def dots(u, v):
+        return np.einsum('ij,ij->i', u, v)
+
+    ab, ac = b - a, c - a
+    d1, d2 = dots(ab, p - a), dots(ac, p - a)
+    d3, d4 = dots(ab, p - b), dots(ac, p - b)
+    d5, d6 = dots(ab, p - c), dots(ac, p - c)
+    vc = d1 * d4 - d3 * d2
+    vb = d5 * d2 - d1 * d6
+    va = d3 * d6 - d5 * d4
+
+    regions = [
+        (d1 <= 0) & (d2 <= 0),
+        (d3 >= 0) & (d4 <= d3),
+        (d6 >= 0) & (d5 <= d6),
+        (vc <= 0) & (d1 >= 0) & (d3 <= 0) & (d1 != d3),
+        (vb <= 0) & (d2 >= 0) & (d6 <= 0) & (d2 != d6),
+        (va <= 0) & (d4 - d3 >= 0) & (d5 - d6 >= 0) & ((d4 - d3) + (d5 - d6) != 0),
+    ]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t_ab = d1 / (d1 - d3)
+        t_ac = d2 / (d2 - d6)
+        t_bc = (d4 - d3) / ((d4 - d3) + (d5 - d6))
+        denom = 1.0 / (va + vb + vc)
+        closest = np.select(
+            [region[:, None] for region in regions],
+            [a, b, c, a + t_ab[:, None] * ab, a + t_ac[:, None] * ac, b + t_bc[:, None] * (c - b)],
+            a + ab * (vb * denom)[:, None] + ac * (vc * denom)[:, None])
+    distances = np.linalg.norm(p - closest, axis=1)
+
+    # Degenerate triangles that no edge region caught: use the nearest corner
+    degenerate = ~np.logical_or.reduce(regions) & (va + vb + vc == 0)
+    if degenerate.any():
+        corners = [np.linalg.norm(p[degenerate] - corner[degenerate], axis=1) for corner in (a, b, c)]
+        distances[degenerate] = np.minimum.reduce(corners)
+    return distances
+
+
+def decimate_mesh(vertices, faces, target_faces=None, max_error=None):
+    """
+    Simplify a triangle mesh with quadric edge collapse (Garland & Heckbert).
+
+    Every vertex carries the quadric of its incident face planes (plus weighted
+    perpendicular planes along open borders). Candidate edge collapses sit in a
+    heap keyed by their quadric error; stale entries are skipped lazily using
+    per-vertex version counters, so each collapse only touches the edges around
+    the merged vertex. Collapses that would flip a neighbouring face, or that
+    fail the link condition (Dey et al.) and so would leave a non-manifold edge
+    or a folded-over pair of faces, are rejected.
+
+    Deviation is measured against the original surface both ways: a vertex's
+    distance to the original faces around the vertices it replaced, and each
+    replaced original vertex's distance to the faces now around its stand-in.
+    Both are upper bounds on the distance to the nearest surface.
+
+    Stops once the mesh is down to target_faces. With max_error (a distance in
+    output units, not negative), collapses that would take the deviation past
+    it are skipped. With neither set the mesh is returned unchanged.
+
+    For NumPy arrays the quadrics, the starting heap and the final deviation
+    are computed as array operations; the collapses match the list path.
+
+    Returns (vertices, faces, stats) where stats holds the before/after counts and
+    "maxDeviation": the largest deviation of the result, as a distance.
+    """
+    if max_error is not None and not max_error >= 0:
+        raise ValueError("max_error must not be negative")
+    use_numpy = np is not None and isinstance(faces, np.ndarray)
+    if use_numpy:
+        original = [tuple(vertex) for vertex in np.asarray(vertices, dtype=np.float64)[:, :3].tolist()]
+        face_list = faces[:, :3].tolist()
+    else:
+        original = [tuple(float(c) for c in vertex[:3]) for vertex in vertices]
+        face_list = [[int(a), int(b), int(c)] for a, b, c in (face[:3] for face in faces)]
+    stats = {
+        "verticesBefore": len(original),
+        "facesBefore": len(face_list),
+    }
+
+    positions = list(original)
+    vertex_faces = [set() for _ in positions]
+    for index, (a, b, c) in enumerate(face_list):
+        for vertex in (a, b, c):
+            vertex_faces[vertex].add(index)
+    # Original faces and vertices each vertex stands for, to measure deviation
+    original_corners = [tuple(face) for face in face_list]
+    original_faces = [tuple(original[corner] for corner in face) for face in face_list]
+    support = [set(indices) for indices in vertex_faces]
+    absorbed = [[vertex] for vertex in range(len(positions))]
+
+    if use_numpy:
+        quadrics, heap = collapse_setup_numpy(vertices, face_list)
+    else:
+        quadrics, heap = collapse_setup_stdlib(positions, face_list)
+    heapq.heapify(heap)
+    version = [0] * len(positions)
+
+    def edge_entry(u, v):
+        target, cost = optimal_position(tuple(map(operator.add, quadrics[u], quadrics[v])),
+                                        positions[u], positions[v])
+        return (max(cost, 0.0), u, v, version[u], version[v], target)
+
+    def flips(vertex, other, target):
+        # Would moving vertex to target flip any face that survives the collapse?
+        for index in vertex_faces[vertex]:
+            face = face_list[index]
+            if other in face:
+                continue
+            corners = [positions[i] for i in face]
+            before = face_normal(*corners)
+            if before == (0.0, 0.0, 0.0):
+                continue
+            corners[face.index(vertex)] = target
+            after = face_normal(*corners)
+            if before[0] * after[0] + before[1] * after[1] + before[2] * after[2] <= 0:
+                return True
+        return False
+
+    def link_ok(u, v):
+        # The vertices next to both u and v must be just the far corners of the
+        # faces on edge uv, and no edge may lie in both their links
+        faces_u = [face_list[index] for index in vertex_faces[u]]
+        faces_v = [face_list[index] for index in vertex_faces[v]]
+        opposite = {corner for face in faces_u if v in face for corner in face} - {u, v}
+        if set().union(*faces_u) & set().union(*faces_v) - {u, v} != opposite:
+            return False
+        # A link edge in both would join two of those far corners (faces on uv
+        # give link edges holding u or v, which the other link cannot have)
+        shared = set()
+        for face in faces_u:
+            if v not in face:
+                edge = frozenset(corner for corner in face if corner != u)
+                if edge <= opposite:
+                    shared.add(edge)
+        return not shared or not any(frozenset(corner for corner in face if corner != v) in shared
+                                     for face in faces_v if u not in face)
+
+    # For each original vertex, a face within max_error of it among its
+    # stand-in's faces; faces map back to the originals that rely on them
+    owner = list(range(len(positions)))
+    anchor = [next(iter(indices), None) for indices in vertex_faces]
+    watchers = {}
+    for vertex, index in enumerate(anchor):
+        watchers.setdefault(index, set()).add(vertex)
+
+    # Lower bounds on the distance to each original face that are cheap to
+    # check first: the distance to its plane, and to its bounding sphere
+    original_bounds = []
+    if max_error is not None:
+        for a, b, c in original_faces:
+            nx, ny, nz = face_normal(a, b, c)
+            length = math.sqrt(nx * nx + ny * ny + nz * nz)
+            # Degenerate faces have no plane; a zero normal never rules them out
+            if length:
+                nx, ny, nz = nx / length, ny / length, nz / length
+            center = ((a[0] + b[0] + c[0]) / 3, (a[1] + b[1] + c[1]) / 3, (a[2] + b[2] + c[2]) / 3)
+            radius = max(math.dist(center, a), math.dist(center, b), math.dist(center, c))
+            original_bounds.append((nx, ny, nz, -(nx * a[0] + ny * a[1] + nz * a[2]), *center, radius))
+
+    def collapse_anchors(u, v, target):
+        """
+        New anchor faces if merging v into u at target keeps every deviation
+        within max_error, else None. Only u moves and only faces around u and
+        v change, so only originals owned by u or v, or anchored to one of
+        those faces, are measured again.
+        """
+        x, y, z = target
+        for index in support[u] | support[v]:
+            nx, ny, nz, d, cx, cy, cz, radius = original_bounds[index]
+            if (abs(nx * x + ny * y + nz * z + d) > max_error
+                    or math.dist(target, (cx, cy, cz)) - radius > max_error):
+                continue
+            if point_triangle_distance(target, *original_faces[index]) <= max_error:
+                break
+        else:
+            return None
+        changed = vertex_faces[u] | vertex_faces[v]
+        moved = {index: tuple(target if corner in (u, v) else positions[corner] for corner in face_list[index])
+                 for index in changed
+                 if not (u in face_list[index] and v in face_list[index])}
+        recheck = set(absorbed[u]) | set(absorbed[v])
+        for index in changed:
+            recheck |= watchers.get(index, set())
+
+        anchors = {}
+        for vertex in recheck:
+            stand_in = u if owner[vertex] in (u, v) else owner[vertex]
+            candidates = vertex_faces[stand_in] | (vertex_faces[v] if stand_in == u else set())
+            # The old anchor usually still fits after the move, so try it first
+            ordered = [anchor[vertex]] if anchor[vertex] in moved else []
+            for index in ordered + list(candidates):
+                if index in moved:
+                    corners = moved[index]
+                elif index in changed:
+                    continue  # Dies with the collapse
+                else:
+                    corners = tuple(positions[corner] for corner in face_list[index])
+                if point_triangle_distance(original[vertex], *corners) <= max_error:
+                    anchors[vertex] = index
+                    break
+            else:
+                return None
+        return anchors
+
+    live_faces = len(face_list)
+    target_faces = target_faces if target_faces is not None else (0 if max_error is not None else live_faces)
+
+    while heap and live_faces > target_faces:
+        _cost, u, v, version_u, version_v, target = heapq.heappop(heap)
+        if version[u] != version_u or version[v] != version_v:
+            continue
+        if flips(u, v, target) or flips(v, u, target) or not link_ok(u, v):
+            continue
+        if max_error is not None:
+            anchors = collapse_anchors(u, v, target)
+            if anchors is None:
+                continue
+            for vertex, index in anchors.items():
+                watchers[anchor[vertex]].discard(vertex)
+                watchers.setdefault(index, set()).add(vertex)
+                anchor[vertex] = index
+        for vertex in absorbed[v]:
+            owner[vertex] = u
+
+        # Merge v into u
+        positions[u] = target
+        quadrics[u] = add_quadrics(quadrics[u], quadrics[v])
+        support[u] |= support[v]
+        absorbed[u].extend(absorbed[v])
+        for index in vertex_faces[v]:
+            face = face_list[index]
+            if u in face:
+                for corner in face:
+                    if corner != v:
+                        vertex_faces[corner].discard(index)
+                live_faces -= 1
+            else:
+                face[face.index(v)] = u
+                vertex_faces[u].add(index)
+        vertex_faces[v] = set()
+        support[v] = set()
+        absorbed[v] = []
+        version[u] += 1
+        version[v] = -1
+
+        neighbours = {corner for index in vertex_faces[u] for corner in face_list[index]}
+        neighbours.discard(u)
+        for neighbour in neighbours:
+            heapq.heappush(heap, edge_entry(u, neighbour))
+
+    # Compact: keep the faces still attached to their corners, renumber vertices
+    new_index = {}
+    new_vertices = []
+    new_faces = []
+    for index, face in enumerate(face_list):
+        if index not in vertex_faces[face[0]]:
+            continue
+        remapped = []
+        for corner in face:
+            if corner not in new_index:
+                new_index[corner] = len(new_vertices)
+                new_vertices.append(positions[corner])
+            remapped.append(new_index[corner])
+        new_faces.append(remapped)
+
+    # Each kept vertex against the original faces it replaced, and each original
+    # vertex it absorbed against the faces now around it. Points and corners
+    # index the original vertices followed by the final positions
+    coordinates = original + positions
+    if use_numpy:
+        coordinates = np.array(coordinates, dtype=np.float64)
+    moved = len(original)
+    max_deviation = 0.0
+    point_ids, corner_ids, groups = [], [], []
+    for vertex in new_index:
+        groups.append(len(point_ids))
+        point_ids.extend(itertools.repeat(moved + vertex, len(support[vertex])))
+        corner_ids.extend(original_corners[index] for index in support[vertex])
+        fan = [[moved + corner for corner in face_list[index]] for index in vertex_faces[vertex]]
+        for other in absorbed[vertex]:
+            groups.append(len(point_ids))
+            point_ids.extend(itertools.repeat(other, len(fan)))
+            corner_ids.extend(fan)
+        if len(point_ids) >= DEVIATION_BATCH:
+            max_deviation = max(max_deviation, *nearest_distances(coordinates, point_ids, corner_ids, groups))
+            point_ids, corner_ids, groups = [], [], []
+    if point_ids:
+        max_deviation = max(max_deviation, *nearest_distances(coordinates, point_ids, corner_ids, groups))
+
+    stats.update({
+        "verticesAfter": len(new_vertices),
+        "facesAfter": len(new_faces),
+        "maxDeviation": max_deviation,
+    })
+
+    if use_numpy:
+        return (np.array(new_vertices, dtype=np.float64).reshape(-1, 3),
+                np.array(new_faces, dtype=np.int64).reshape(-1, 3), stats)
+    return [list(vertex) for vertex in new_vertices], new_faces, stats
+
+
+# Convex collision shapes
+COLLISION_MODES = ("mesh", "hull", "box")
+HULL_PREFILTER_MIN = 1000  # Points before the NumPy interior-point filter pays off
+HULL_EPSILON = 1e-9  # Relative to the coordinate scale
+BOX_FRAME_FACES = 16  # Largest hull faces tried as a box orientation
+BOX_FRAME_SAMPLE = 4096  # Points whose hull proposes box orientations
+BOX_FACES = [
+    [0, 2, 1], [0, 3, 2], [4, 5, 6], [4, 6, 7],
+    [0, 1, 5], [0, 5, 4], [1, 2, 6], [1, 6, 5],
+    [2, 3, 7], [2, 7, 6], [3, 0, 4], [3, 4, 7],
+]
+
+
+def sub(u, v):
+    return (u[0] - v[0], u[1] - v[1], u[2] - v[2])
+
+
+def dot(u, v):
+    return u[0] * v[0] + u[1] * v[1] + u[2] * v[2]
+
+
+def cross(u, v):
+    return (u[1] * v[2] - u[2] * v[1], u[2] * v[0] - u[0] * v[2], u[0] * v[1] - u[1] * v[0])
+
+
+class HullFace:
+    """A hull triangle with its outward plane and the points it can see"""
+
+    __slots__ = ("corners", "normal", "offset", "outside")
+
+    def __init__(self, points, a, b, c):
+        self.corners = (a, b, c)
+        normal = cross(sub(points[b], points[a]), sub(points[c], points[a]))
+        length = math.sqrt(dot(normal, normal)) or 1.0
+        self.normal = (normal[0] / length, normal[1] / length, normal[2] / length)
+        self.offset = dot(self.normal, points[a])
+        self.outside = []
+
+    def distance(self, point):
+        return dot(self.normal, point) - self.offset
+
+    def edges(self):
+        a, b, c = self.corners
+        return ((a, b), (b, c), (c, a))
+
+
+def hull_prefilter(points):
+    """
+    Drop points that are strictly inside the hull of the extreme points along 26
+    directions (Akl-Toussaint). Vectorized, so even very large inputs only leave
+    a small candidate set for Quickhull.
+    """
+    cloud = np.asarray(points, dtype=np.float64)
+    directions = np.array([(x, y, z) for x in (-1, 0, 1) for y in (-1, 0, 1) for z in (-1, 0, 1)
+                           if (x, y, z) != (0, 0, 0)], dtype=np.float64)
+    extremes = np.unique(np.argmax(cloud @ directions.T, axis=0))
+    try:
+        hull_vertices, hull_faces = quickhull([tuple(p) for p in cloud[extremes]])
+    except ValueError:
+        return points  # Flat or tiny input; nothing to gain
+
+    hull_vertices = np.array(hull_vertices)
+    corners = hull_vertices[np.array(hull_faces)]
+    normals = np.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0])
+    normals /= np.maximum(np.linalg.norm(normals, axis=1), 1e-300)[:, None]
+    offsets = np.einsum('ij,ij->i', normals, corners[:, 0])
+    margin = HULL_EPSILON * max(float(np.abs(cloud).max()), 1.0)
+
+    inside = np.ones(len(cloud), dtype=bool)
+    for normal, offset in zip(normals, offsets):
+        inside &= cloud @ normal - offset < -margin
+    return [tuple(p) for p in cloud[~inside]]
+
+
+def convex_hull(points):
+    """
+    Convex hull of a point cloud as (vertices, faces) with outward winding.
+
+    With NumPy, points inside the hull of a few extreme points are discarded in
+    bulk first (hull_prefilter); Quickhull then runs on what is left. Raises
+    ValueError if the points are all coplanar.
+    """
+    points = list(dict.fromkeys((float(p[0]), float(p[1]), float(p[2])) for p in points))
+    if np is not None and len(points) >= HULL_PREFILTER_MIN:
+        points = hull_prefilter(points)
+    return quickhull(points)
+
+
+def quickhull(points):
+    """Quickhull over unique points with conflict lists; see convex_hull"""
+    if len(points) < 4:
+        raise ValueError("Convex hull needs at least 4 points")
+    scale = max(max(abs(c) for c in p) for p in points) or 1.0
+    eps = HULL_EPSILON * scale
+
+    # Initial tetrahedron: widest axis extremes, farthest from that line, farthest from that plane
+    axis = max(range(3), key=lambda k: max(p[k] for p in points) - min(p[k] for p in points))
+    i0 = min(range(len(points)), key=lambda i: points[i][axis])
+    i1 = max(range(len(points)), key=lambda i: points[i][axis])
+    line = sub(points[i1], points[i0])
+    i2 = max(range(len(points)), key=lambda i: dot(*(cross(line, sub(points[i], points[i0])),) * 2))
+    plane = cross(line, sub(points[i2], points[i0]))
+    plane_length = math.sqrt(dot(plane, plane))
+    if plane_length <= eps * eps:
+        raise ValueError("Points are collinear")
+    i3 = max(range(len(points)), key=lambda i: abs(dot(plane, sub(points[i], points[i0]))))
+    if abs(dot(plane, sub(points[i3], points[i0]))) / plane_length <= eps:
+        raise ValueError("Points are coplanar")
+
+    faces = {}
+    edge_owner = {}
+    next_id = [0]
+
+    def add_face(a, b, c):
+        face = HullFace(points, a, b, c)
+        faces[next_id[0]] = face
+        for edge in face.edges():
+            edge_owner[edge] = next_id[0]
+        next_id[0] += 1
+        return face
+
+    centroid = tuple(sum(points[i][k] for i in (i0, i1, i2, i3)) / 4 for k in range(3))
+    new_faces = []
+    for a, b, c in ((i0, i1, i2), (i0, i3, i1), (i1, i3, i2), (i2, i3, i0)):
+        face = HullFace(points, a, b, c)
+        if face.distance(centroid) > 0:
+            a, b = b, a
+        new_faces.append(add_face(a, b, c))
+
+    def assign(candidates, targets):
+        for index in candidates:
+            point = points[index]
+            for face in targets:
+                if face.distance(point) > eps:
+                    face.outside.append(index)
+                    break
+
+    simplex = {i0, i1, i2, i3}
+    assign((i for i in range(len(points)) if i not in simplex), new_faces)
+    pending = [face_id for face_id, face in faces.items() if face.outside]
+
+    while pending:
+        face_id = pending.pop()
+        face = faces.get(face_id)
+        if face is None or not face.outside:
+            continue
+        eye = max(face.outside, key=lambda i: face.distance(points[i]))
+        eye_point = points[eye]
+
+        # Flood the faces that can see the eye point; their border is the horizon
+        visible = {face_id}
+        stack = [face_id]
+        horizon = []
+        while stack:
+            current = faces[stack.pop()]
+            for u, v in current.edges():
+                neighbour = edge_owner[(v, u)]
+                if neighbour in visible:
+                    continue
+                if faces[neighbour].distance(eye_point) > eps:
+                    visible.add(neighbour)
+                    stack.append(neighbour)
+                else:
+                    horizon.append((u, v))
+
+        orphans = []
+        for visible_id in visible:
+            removed = faces.pop(visible_id)
+            orphans.extend(i for i in removed.outside if i != eye)
+            for edge in removed.edges():
+                if edge_owner.get(edge) == visible_id:
+                    del edge_owner[edge]
+
+        new_faces = [add_face(u, v, eye) for u, v in horizon]
+        assign(orphans, new_faces)
+        pending.extend(edge_owner[(u, v)] for u, v in horizon if faces[edge_owner[(u, v)]].outside)
+
+    # Compact to the hull's own vertex list
+    remap = {}
+    hull_vertices = []
+    hull_faces = []
+    for face in faces.values():
+        for corner in face.corners:
+            if corner not in remap:
+                remap[corner] = len(hull_vertices)
+                hull_vertices.append(points[corner])
+        hull_faces.append([remap[corner] for corner in face.corners])
+    return [list(vertex) for vertex in hull_vertices], hull_faces
+
+
+def symmetric_eigenvectors(matrix, sweeps=50):
+    """Eigenvectors (as rows) of a symmetric 3x3 matrix by cyclic Jacobi rotations"""
+    a = [list(row) for row in matrix]
+    vectors = [[1.0, 0.0, 0.0], [0.0, 1.0, 0.0], [0.0, 0.0, 1.0]]
+    for _ in range(sweeps):
+        off = a[0][1] ** 2 + a[0][2] ** 2 + a[1][2] ** 2
+        if off < 1e-30:
+            break
+        for p, q in ((0, 1), (0, 2), (1, 2)):
+            if abs(a[p][q]) < 1e-300:
+                continue
+            theta = (a[q][q] - a[p][p]) / (2 * a[p][q])
+            t = math.copysign(1.0, theta) / (abs(theta) + math.sqrt(theta * theta + 1))
+            c = 1 / math.sqrt(t * t + 1)
+            s = t * c
+            for k in range(3):
+                akp, akq = a[k][p], a[k][q]
+                a[k][p], a[k][q] = c * akp - s * akq, s * akp + c * akq
+            for k in range(3):
+                apk, aqk = a[p][k], a[q][k]
+                a[p][k], a[q][k] = c * apk - s * aqk, s * apk + c * aqk
+            for row in vectors:
+                rp, rq = row[p], row[q]
+                row[p], row[q] = c * rp - s * rq, s * rp + c * rq
+    return [[vectors[k][axis] for k in range(3)] for axis in range(3)]
+
+
+def normalized(vector):
+    length = math.sqrt(dot(vector, vector))
+    return (vector[0] / length, vector[1] / length, vector[2] / length) if length else None
+
+
+def box_frames(points, faces):
+    """
+    Candidate axis frames for oriented_box: the world axes, the principal axes,
+    and for the largest hull faces, the face normal paired with its longest edge
+    """
+    frames = [[(1.0, 0.0, 0.0), (0.0, 1.0, 0.0), (0.0, 0.0, 1.0)]]
+
+    count = len(points)
+    mean = [sum(p[k] for p in points) / count for k in range(3)]
+    covariance = [[sum((p[i] - mean[i]) * (p[j] - mean[j]) for p in points) / count for j in range(3)]
+                  for i in range(3)]
+    principal = [tuple(axis) for axis in symmetric_eigenvectors(covariance)]
+    frames.append(principal)
+
+    def area(face):
+        a, b, c = (points[i] for i in face)
+        return dot(*(cross(sub(b, a), sub(c, a)),) * 2)
+
+    for face in sorted(faces, key=area, reverse=True)[:BOX_FRAME_FACES]:
+        a, b, c = (points[i] for i in face)
+        normal = normalized(cross(sub(b, a), sub(c, a)))
+        edge = max((sub(b, a), sub(c, b), sub(a, c)), key=lambda e: dot(e, e))
+        if normal is None:
+            continue
+        tangent = normalized(sub(edge, tuple(dot(edge, normal) * n for n in normal)))
+        if tangent is not None:
+            frames.append([normal, tangent, cross(normal, tangent)])
+    return frames
+
+
+def oriented_box(points):
+    """
+    Oriented bounding box of points as a 12-triangle (vertices, faces) mesh.
+    Tries the frames from box_frames over the points' convex hull and keeps the
+    one with the smallest volume. Large inputs pick frames from the hull of an
+    evenly strided sample, but the extents always cover every point.
+    """
+    points = [list(p[:3]) for p in points]
+    sample = points[::max(1, len(points) // BOX_FRAME_SAMPLE)]
+    try:
+        hull_points, hull_faces = convex_hull(sample)
+    except ValueError:
+        hull_points, hull_faces = sample, []
+    # The sample's hull only covers every point when nothing was skipped
+    extent_points = hull_points if len(sample) == len(points) else points
+    cloud = np.array(extent_points, dtype=np.float64) if np is not None else None
+
+    best = None
+    for axes in box_frames(hull_points, hull_faces):
+        if cloud is not None:
+            projected = cloud @ np.array(axes, dtype=np.float64).T
+            low, high = projected.min(axis=0).tolist(), projected.max(axis=0).tolist()
+        else:
+            low = [min(dot(axis, p) for p in extent_points) for axis in axes]
+            high = [max(dot(axis, p) for p in extent_points) for axis in axes]
+        volume = (high[0] - low[0]) * (high[1] - low[1]) * (high[2] - low[2])
+        if best is None or volume < best[0]:
+            best = (volume, axes, low, high)
+    _volume, axes, low, high = best
+    if dot(cross(axes[0], axes[1]), axes[2]) < 0:
+        axes = [axes[0], axes[1], [-c for c in axes[2]]]  # Right-handed, so BOX_FACES face outward
+        low[2], high[2] = -high[2], -low[2]
+
+    vertices = []
+    for u, v, w in ((0, 0, 0), (1, 0, 0), (1, 1, 0), (0, 1, 0), (0, 0, 1), (1, 0, 1), (1, 1, 1), (0, 1, 1)):
+        extent = (high[0] if u else low[0], high[1] if v else low[1], high[2] if w else low[2])
+        vertices.append([sum(extent[k] * axes[k][c] for k in range(3)) for c in range(3)])
+    return vertices, [list(face) for face in BOX_FACES]
+
+
+def hull_volume(vertices, faces):
+    """Volume enclosed by a closed, outward-wound triangle mesh"""
+    return abs(sum(dot(vertices[a], cross(vertices[b], vertices[c])) for a, b, c in faces)) / 6
+
+
+def convex_pieces(vertices, faces, pieces):
+    """
+    Approximate convex decomposition: split the faces into `pieces` groups by
+    repeatedly cutting the group with the largest hull volume in half at the
+    median face centroid along its longest axis. Returns one vertex list per group.
+    """
+    points = vertices.tolist() if np is not None and isinstance(vertices, np.ndarray) else vertices
+    face_list = faces.tolist() if np is not None and isinstance(faces, np.ndarray) else faces
+    centroids = [[(points[a][k] + points[b][k] + points[c][k]) / 3 for k in range(3)] for a, b, c in face_list]
+
+    def group_points(group):
+        return [points[corner] for index in group for corner in face_list[index]]
+
+    def volume(group):
+        try:
+            return hull_volume(*convex_hull(group_points(group)))
+        except ValueError:
+            return 0.0
+
+    groups = [(volume(range(len(face_list))), list(range(len(face_list))))]
+    while len(groups) < pieces:
+        splittable = [g for g in groups if len(g[1]) > 1]
+        if not splittable:
+            break
+        largest = max(splittable, key=lambda g: g[0])
+        groups.remove(largest)
+        group = largest[1]
+        axis = max(range(3), key=lambda k: max(centroids[i][k] for i in group) - min(centroids[i][k] for i in group))
+        group.sort(key=lambda i: centroids[i][axis])
+        middle = len(group) // 2
+        groups.extend((volume(half), half) for half in (group[:middle], group[middle:]))
+
+    return [group_points(group) for _volume, group in groups]
+
+
+def collision_shapes(vertices, faces, mode, pieces=1):
+    """
+    Convex stand-ins for a mesh: one convex hull ("hull") or oriented box ("box")
+    per piece. Pieces whose points are flat get a box instead of a hull.
+    Returns a list of (vertices, faces) meshes.
+    """
+    groups = convex_pieces(vertices, faces, pieces) if pieces > 1 else [
+        vertices.tolist() if np is not None and isinstance(vertices, np.ndarray) else vertices
+    ]
+    shapes = []
+    for points in groups:
+        if mode == "hull":
+            try:
+                shapes.append(convex_hull(points))
+                continue
+            except ValueError:
+                pass
+        shapes.append(oriented_box(points))
+    return shapes
+
+
+# 3DS chunk IDs
+CHUNK_MAIN = 0x4D4D
+CHUNK_EDITOR = 0x3D3D
+CHUNK_OBJECT = 0x4000
+CHUNK_TRIMESH = 0x4100
+CHUNK_VERTICES = 0x4110
+CHUNK_FACES = 0x4120
+
+CHUNK_HEADER_SIZE = 6  # <H id + <I length (length includes the header)
+MAX_3DS_COUNT = 0xFFFF  # Vertex/face counts and indices are stored as <H
+OBJECT_NAME = b'collision\x00'
+
+
+def chunk_header(chunk_id, length):
+    """Pack a chunk's ID and total length"""
+    return struct.pack('<HI', chunk_id, length)
+
+
+def pack_vertices(vertices):
+    """Pack vertex coordinates as consecutive little-endian float32 triples"""
+    if np is not None and isinstance(vertices, np.ndarray):
+        return np.ascontiguousarray(vertices[:, :3], dtype='<f4').tobytes()
+    return struct.pack(f'<{3 * len(vertices)}f', *(float(c) for vertex in vertices for c in vertex[:3]))
+
+
+def pack_faces(faces):
+    """Pack faces as little-endian uint16 (v1, v2, v3, flags) records with flags 0"""
+    if np is not None and isinstance(faces, np.ndarray):
+        if len(faces) and (faces.min() < 0 or faces.max() > MAX_3DS_COUNT):
+            raise ValueError(f"Face index out of 3DS range (0-{MAX_3DS_COUNT})")
+        records = np.zeros((len(faces), 4), dtype='<u2')
+        records[:, :3] = faces[:, :3]
+        return records.tobytes()
+    return struct.pack(f'<{4 * len(faces)}H', *(
+        value for face in faces for value in (int(face[0]), int(face[1]), int(face[2]), 0)
+    ))
+
+
+MORTON_BITS = 5  # Cells per axis = 2 ** MORTON_BITS when bucketing faces spatially
+
+
+def morton_key(cx, cy, cz):
+    """Interleave the bits of three MORTON_BITS-bit cell coordinates"""
+    key = 0
+    for bit in range(MORTON_BITS):
+        key |= ((cx >> bit) & 1) << (3 * bit)
+        key |= ((cy >> bit) & 1) << (3 * bit + 1)
+        key |= ((cz >> bit) & 1) << (3 * bit + 2)
+    return key
+
+
+def partition_mesh(vertices, faces, limit=MAX_3DS_COUNT):
+    """
+    Split a mesh into parts that each fit a 3DS object block.
+
+    Faces are bucketed by the Morton code of their centroid's cell on a coarse
+    grid over the mesh bounds (a linear-time counting sort), so neighbouring
+    faces land in the same part. Parts are then cut from that order so every
+    part has at most `limit` faces and `limit` vertices, and each part's faces
+    are remapped to its own vertex list.
+
+    Returns a list of (vertices, faces) pairs; a mesh that already fits is
+    returned as the single pair unchanged.
+    """
+    if len(vertices) <= limit and len(faces) <= limit:
+        return [(vertices, faces)]
+    if np is not None and isinstance(faces, np.ndarray):
+        return partition_mesh_numpy(vertices, faces, limit)
+    return partition_mesh_stdlib(vertices, faces, limit)
+
+
+def partition_mesh_numpy(vertices, faces, limit):
+    """partition_mesh for NumPy arrays"""
+    vertices = np.asarray(vertices, dtype=np.float64)
+    centroids = vertices[faces].mean(axis=1)
+    low = centroids.min(axis=0)
+    span = np.maximum(centroids.max(axis=0) - low, 1e-9)
+    cells = np.minimum(((centroids - low) / span * (1 << MORTON_BITS)).astype(np.uint16), (1 << MORTON_BITS) - 1)
+    keys = morton_key(cells[:, 0], cells[:, 1], cells[:, 2])
+
+    # 15-bit keys: NumPy's stable sort is a radix sort for 16-bit integers
+    order = np.argsort(keys.astype(np.uint16), kind='stable')
+    ordered = faces[order]
+
+    parts = []
+    pending = [(start, min(start + limit, len(ordered))) for start in range(0, len(ordered), limit)]
+    pending.reverse()
+    while pending:
+        start, end = pending.pop()
+        used, local_faces = np.unique(ordered[start:end], return_inverse=True)
+        if len(used) > limit:
+            # Too many distinct vertices; halve the run and try each half
+            middle = (start + end) // 2
+            pending.extend([(middle, end), (start, middle)])
+            continue
+        parts.append((vertices[used], local_faces.reshape(-1, 3)))
+    return parts
+
+
+def partition_mesh_stdlib(vertices, faces, limit):
+    """partition_mesh for plain lists"""
+    centroids = [
+        [(vertices[a][axis] + vertices[b][axis] + vertices[c][axis]) / 3 for axis in range(3)]
+        for a, b, c in faces
+    ]
+    low = [min(centroid[axis] for centroid in centroids) for axis in range(3)]
+    span = [max(max(centroid[axis] for centroid in centroids) - low[axis], 1e-9) for axis in range(3)]
+    cells_per_axis = 1 << MORTON_BITS
+
+    buckets = [[] for _ in range(cells_per_axis ** 3)]
+    for face, centroid in zip(faces, centroids):
+        cell = [min(int((centroid[axis] - low[axis]) / span[axis] * cells_per_axis), cells_per_axis - 1)
+                for axis in range(3)]
+        buckets[morton_key(*cell)].append(face)
+
+    parts = []
+    part_vertices, part_faces, local = [], [], {}
+    for bucket in buckets:
+        for face in bucket:
+            new_vertices = len({index for index in face if index not in local})
+            if len(part_faces) == limit or len(local) + new_vertices > limit:
+                parts.append((part_vertices, part_faces))
+                part_vertices, part_faces, local = [], [], {}
+
+            remapped = []
+            for index in face:
+                if index not in local:
+                    local[index] = len(part_vertices)
+                    part_vertices.append(vertices[index])
+                remapped.append(local[index])
+            part_faces.append(remapped)
+    if part_faces:
+        parts.append((part_vertices, part_faces))
+    return parts
+
+
+def object_name(index, count):
+    """Name for an object block; split meshes get numbered parts (3DS names are <= 10 bytes)"""
+    if count == 1:
+        return OBJECT_NAME
+    return f'coll_{index:03d}'.encode('ascii') + b'\x00'
 
 
 def write_3ds_file(vertices, faces, output_path):
@@ -129,76 +1490,107 @@ def write_3ds_file(vertices, faces, output_path):
     3DS File Format Structure:
     - Main Chunk (0x4D4D)
       - 3D Editor Chunk (0x3D3D)
-        - Object Block (0x4000)
+        - Object Block (0x4000), one per part (see partition_mesh)
           - Triangular Mesh (0x4100)
             - Vertices List (0x4110)
             - Faces List (0x4120)
+
+    Every chunk length is computed from the counts up front, so the headers are
+    written first and the vertex and face data are packed in bulk and streamed
+    straight to the file.
+    """
+    write_3ds_objects([(vertices, faces)], output_path)
+
+
+def write_3ds_objects(meshes, output_path):
+    """
+    Write several (vertices, faces) meshes to one 3DS file, each as its own
+    object block (or blocks, if a mesh has to be split; see write_3ds_file)
     """
 
     print(f"Writing 3DS file: {output_path}")
-    print(f"  Vertices: {len(vertices)}")
-    print(f"  Faces: {len(faces)}")
+    print(f"  Vertices: {sum(len(vertices) for vertices, _faces in meshes)}")
+    print(f"  Faces: {sum(len(faces) for _vertices, faces in meshes)}")
+
+    parts = []
+    for vertices, faces in meshes:
+        mesh_parts = partition_mesh(vertices, faces)
+        if len(mesh_parts) > 1:
+            print(f"  Mesh exceeds {MAX_3DS_COUNT} vertices/faces, split into {len(mesh_parts)} objects")
+        parts.extend(mesh_parts)
+    if len(parts) > 1000:
+        raise ValueError("Mesh is too large to split into named 3DS objects")
+
+    objects = []
+    for index, (part_vertices, part_faces) in enumerate(parts):
+        name = object_name(index, len(parts))
+        vertex_chunk_length = CHUNK_HEADER_SIZE + 2 + 12 * len(part_vertices)
+        face_chunk_length = CHUNK_HEADER_SIZE + 2 + 8 * len(part_faces)
+        trimesh_chunk_length = CHUNK_HEADER_SIZE + vertex_chunk_length + face_chunk_length
+        object_chunk_length = CHUNK_HEADER_SIZE + len(name) + trimesh_chunk_length
+        objects.append((name, part_vertices, part_faces, vertex_chunk_length, face_chunk_length,
+                        trimesh_chunk_length, object_chunk_length))
+
+    editor_chunk_length = CHUNK_HEADER_SIZE + sum(obj[-1] for obj in objects)
+    main_chunk_length = CHUNK_HEADER_SIZE + editor_chunk_length
 
     with open(output_path, 'wb') as f:
-        # Build vertex data chunk (0x4110)
-        vertex_data = struct.pack('<H', len(vertices))  # Number of vertices
-        for vertex in vertices:
-            vertex_data += struct.pack('<fff', float(vertex[0]), float(vertex[1]), float(vertex[2]))
-
-        # Build face data chunk (0x4120)
-        face_data = struct.pack('<H', len(faces))  # Number of faces
-        for face in faces:
-            # Each face: 3 vertex indices + flags (set to 0)
-            face_data += struct.pack('<HHH', int(face[0]), int(face[1]), int(face[2]))
-            face_data += struct.pack('<H', 0)  # Face flags
-
-        # Build triangular mesh chunk (0x4100)
-        trimesh_data = b''
-        # Vertex list chunk
-        vertex_chunk_length = 6 + len(vertex_data)
-        trimesh_data += struct.pack('<H', 0x4110)  # Vertex list chunk ID
-        trimesh_data += struct.pack('<I', vertex_chunk_length)
-        trimesh_data += vertex_data
-
-        # Face list chunk
-        face_chunk_length = 6 + len(face_data)
-        trimesh_data += struct.pack('<H', 0x4120)  # Face list chunk ID
-        trimesh_data += struct.pack('<I', face_chunk_length)
-        trimesh_data += face_data
-
-        # Build object block chunk (0x4000)
-        object_name = b'collision\x00'  # Object name (null-terminated)
-        object_data = object_name
-
-        # Triangular mesh chunk
-        trimesh_chunk_length = 6 + len(trimesh_data)
-        object_data += struct.pack('<H', 0x4100)  # Triangular mesh chunk ID
-        object_data += struct.pack('<I', trimesh_chunk_length)
-        object_data += trimesh_data
-
-        # Build 3D editor chunk (0x3D3D)
-        editor_data = b''
-        object_chunk_length = 6 + len(object_data)
-        editor_data += struct.pack('<H', 0x4000)  # Object block chunk ID
-        editor_data += struct.pack('<I', object_chunk_length)
-        editor_data += object_data
-
-        # Build main chunk (0x4D4D)
-        editor_chunk_length = 6 + len(editor_data)
-        main_data = struct.pack('<H', 0x3D3D)  # 3D Editor chunk ID
-        main_data += struct.pack('<I', editor_chunk_length)
-        main_data += editor_data
-
-        # Write main chunk
-        main_chunk_length = 6 + len(main_data)
-        f.write(struct.pack('<H', 0x4D4D))  # Main chunk ID
-        f.write(struct.pack('<I', main_chunk_length))
-        f.write(main_data)
+        f.write(chunk_header(CHUNK_MAIN, main_chunk_length))
+        f.write(chunk_header(CHUNK_EDITOR, editor_chunk_length))
+
+        for (name, part_vertices, part_faces, vertex_chunk_length, face_chunk_length,
+             trimesh_chunk_length, object_chunk_length) in objects:
+            f.write(chunk_header(CHUNK_OBJECT, object_chunk_length))
+            f.write(name)
+            f.write(chunk_header(CHUNK_TRIMESH, trimesh_chunk_length))
+
+            f.write(chunk_header(CHUNK_VERTICES, vertex_chunk_length))
+            f.write(struct.pack('<H', len(part_vertices)))
+            f.write(pack_vertices(part_vertices))
+
+            f.write(chunk_header(CHUNK_FACES, face_chunk_length))
+            f.write(struct.pack('<H', len(part_faces)))
+            f.write(pack_faces(part_faces))
 
     print(f"  3DS file written successfully")
 
 
-def convert_obj_to_3ds(input_path, output_path, scale=1.0, roll=0.0, pitch=0.0, yaw=0.0):
+def collision_meshes(vertices, faces, target_faces=None, max_error=None, weld=None,
+                     collision="mesh", pieces=1):
+    """
+    Run the optional weld, decimate and convex-shape stages on a parsed mesh and
+    return the (vertices, faces) meshes to write, one per 3DS object block.
+    Options are as for convert_obj_to_3ds().
+    """
+    # Weld shared corners and drop slivers
+    if weld is not None:
+        vertices, faces, stats = weld_vertices(vertices, faces, weld)
+        print(f"  Welded: {stats['verticesBefore']} -> {stats['verticesAfter']} vertices "
+              f"(-{percent_smaller(stats['verticesBefore'], stats['verticesAfter']):.1f}%), "
+              f"{stats['facesBefore']} -> {stats['facesAfter']} faces "
+              f"(-{percent_smaller(stats['facesBefore'], stats['facesAfter']):.1f}%; "
+              f"{stats['degenerateFaces']} degenerate, {stats['duplicateFaces']} duplicate)")
+
+    # Simplify the collision mesh
+    if target_faces is not None or max_error is not None:
+        vertices, faces, stats = decimate_mesh(vertices, faces, target_faces, max_error)
+        print(f"  Decimated: {stats['facesBefore']} -> {stats['facesAfter']} faces, "
+              f"{stats['verticesBefore']} -> {stats['verticesAfter']} vertices, "
+              f"max deviation {stats['maxDeviation']:.6g}")
+
+    # Replace the trimesh with convex stand-ins
+    meshes = [(vertices, faces)]
+    if collision != "mesh":
+        meshes = collision_shapes(vertices, faces, collision, pieces)
+        print(f"  Collision {collision}: {len(meshes)} piece(s), "
+              f"{sum(len(shape_faces) for _shape, shape_faces in meshes)} faces "
+              f"(from {len(faces)})")
+
+    return meshes
+
+
+def convert_obj_to_3ds(input_path, output_path, scale=1.0, roll=0.0, pitch=0.0, yaw=0.0,
+                       target_faces=None, max_error=None, weld=None, collision="mesh", pieces=1):
     """
     Convert an OBJ file to 3DS format
 
@@ -209,6 +1601,16 @@ def convert_obj_to_3ds(input_path, output_path, scale=1.0, roll=0.0, pitch=0.0,
         roll: Roll rotation in degrees around X-axis (default: 0)
         pitch: Pitch rotation in degrees around Y-axis (default: 0)
         yaw: Yaw rotation in degrees around Z-axis (default: 0)
+        target_faces: Decimate the mesh down to this many triangles (default: off)
+        max_error: Decimate as far as the surface stays within this distance
+                   of the original, in output units (default: off)
+        weld: Merge vertices within this distance and drop degenerate/duplicate
+              faces before decimating, in output units; 0 welds exact
+              duplicates only (default: off)
+        collision: "mesh" writes the triangles themselves; "hull" writes convex
+                   hulls and "box" oriented bounding boxes (default: "mesh")
+        pieces: With "hull" or "box", approximately decompose the mesh into this
+                many convex pieces, each its own object block (default: 1)
     """
     print(f"Converting {input_path} to {output_path}...")
     if scale != 1.0:
@@ -223,9 +1625,11 @@ def convert_obj_to_3ds(input_path, output_path, scale=1.0, roll=0.0, pitch=0.0,
         print(f"ERROR: Failed to parse OBJ file: {e}")
         sys.exit(1)
 
+    meshes = collision_meshes(vertices, faces, target_faces, max_error, weld, collision, pieces)
+
     # Write 3DS file
     try:
-        write_3ds_file(vertices, faces, output_path)
+        write_3ds_objects(meshes, output_path)
     except Exception as e:
         print(f"ERROR: Failed to write 3DS file: {e}")
         import traceback
@@ -242,66 +1646,581 @@ def convert_obj_to_3ds(input_path, output_path, scale=1.0, roll=0.0, pitch=0.0,
         sys.exit(1)
 
 
+# Optional manifest job keys -> convert_obj_to_3ds keyword arguments
+MANIFEST_OPTIONS = {
+    "weld": "weld",
+    "decimate": "target_faces",
+    "maxError": "max_error",
+    "collision": "collision",
+    "pieces": "pieces",
+}
+
+
+def run_job(index, job, defaults):
+    """
+    Run one manifest job and return its result record. The converter's own
+    progress output is captured so stdout only carries JSON lines.
+    """
+    start = time.perf_counter()
+    result = {"index": index, "input": job.get("input"), "output": job.get("output")}
+    log = io.StringIO()
+    try:
+        input_path, output_path = job["input"], job["output"]
+        if not os.path.exists(input_path):
+            raise FileNotFoundError(f"Input file not found: {input_path}")
+        scale = float(job.get("scale", 1.0))
+        if scale <= 0:
+            raise ValueError("Scale factor must be positive")
+
+        options = dict(defaults)
+        for key, name in MANIFEST_OPTIONS.items():
+            if key in job:
+                options[name] = job[key]
+
+        output_dir = os.path.dirname(output_path)
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+
+        with contextlib.redirect_stdout(log):
+            convert_obj_to_3ds(input_path, output_path, scale, float(job.get("roll", 0)),
+                               float(job.get("pitch", 0)), float(job.get("yaw", 0)), **options)
+        result.update(success=True, bytes=os.path.getsize(output_path))
+    except SystemExit:
+        # convert_obj_to_3ds prints an ERROR line before exiting
+        errors = [line for line in log.getvalue().splitlines() if line.startswith("ERROR")]
+        result.update(success=False, error=errors[-1] if errors else "Conversion failed")
+    except Exception as e:
+        result.update(success=False, error=f"{type(e).__name__}: {e}")
+    result["elapsedMs"] = round((time.perf_counter() - start) * 1000, 2)
+    return result
+
+
+def run_manifest(jobs, workers=1, defaults=None, stream=None):
+    """
+    Convert every job in a manifest in this process (or a pool of `workers`),
+    printing one JSON result line per job as it finishes, then a summary line.
+
+    Each job is {"input", "output", "scale", "roll", "pitch", "yaw"} plus any of
+    the MANIFEST_OPTIONS keys; `defaults` supplies convert_obj_to_3ds keyword
+    arguments for jobs that leave them out.
+
+    Returns the summary record.
+    """
+    stream = stream or sys.stdout
+    defaults = defaults or {}
+    start = time.perf_counter()
+    results = []
+
+    def report(result):
+        results.append(result)
+        print(json.dumps(result), file=stream, flush=True)
+
+    if workers <= 1 or len(jobs) <= 1:
+        for index, job in enumerate(jobs):
+            report(run_job(index, job, defaults))
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+            futures = [pool.submit(run_job, index, job, defaults) for index, job in enumerate(jobs)]
+            for future in as_completed(futures):
+                report(future.result())
+
+    job_times = [result["elapsedMs"] for result in results]
+    summary = {
+        "summary": True,
+        "total": len(results),
+        "succeeded": sum(1 for result in results if result["success"]),
+        "failed": sum(1 for result in results if not result["success"]),
+        "elapsedMs": round((time.perf_counter() - start) * 1000, 2),
+        "jobMsTotal": round(sum(job_times), 2),
+        "jobMsMax": max(job_times, default=0.0),
+    }
+    print(json.dumps(summary), file=stream, flush=True)
+    return summary
+
+
+class AtlasAttribute:
+    """
+    One OBJ attribute stream (v, vt or vn) of an atlas being split. Values are
+    kept in a flat array; each record also remembers the last cell it was
+    written to and its index there, so a cell only repeats a record the first
+    time one of its faces uses it.
+    """
+
+    def __init__(self, width):
+        self.width = width
+        self.values = array('d')
+        self.owner = array('i')
+        self.local = array('i')
+
+    def __len__(self):
+        return len(self.owner)
+
+    def add(self, parts):
+        """Append a record from its text fields (missing components become 0)"""
+        values = [float(part) for part in parts[:self.width]]
+        self.values.extend(values + [0.0] * (self.width - len(values)))
+        self.owner.append(-1)
+        self.local.append(0)
+
+    def resolve(self, token):
+        """0-based index of an OBJ reference (1-based, or negative = relative)"""
+        index = int(token) - 1
+        return index if index >= 0 else len(self.owner) + index + 1
+
+
+class AtlasLayout:
+    """The cells of a merge.py `_layout.json`, looked up by Source X/Y"""
+
+    def __init__(self, layout):
+        self.items = layout['layout']
+        # Packed layouts give each cell its own size; older grid layouts share cellSize
+        self.rects = [(item['cellX'], item['cellY'],
+                       item.get('cellWidth', layout.get('cellSize')), item.get('cellHeight', layout.get('cellSize')))
+                      for item in self.items]
+        self.centers = [(x + w / 2, y + h / 2) for x, y, w, h in self.rects]
+        # Buckets as big as the largest cell, so a cell touches at most 2x2 of them
+        self.bucket = max(max(w, h) for _x, _y, w, h in self.rects)
+        self.buckets = {}
+        for index, (x, y, w, h) in enumerate(self.rects):
+            for bx in range(math.floor(x / self.bucket), math.floor((x + w) / self.bucket) + 1):
+                for by in range(math.floor(y / self.bucket), math.floor((y + h) / self.bucket) + 1):
+                    self.buckets.setdefault((bx, by), []).append(index)
+
+    def cell_at(self, x, y):
+        """Layout index of the cell containing (x, y), else of the nearest cell centre"""
+        for index in self.buckets.get((math.floor(x / self.bucket), math.floor(y / self.bucket)), ()):
+            cell_x, cell_y, w, h = self.rects[index]
+            if cell_x <= x < cell_x + w and cell_y <= y < cell_y + h:
+                return index
+        return min(range(len(self.centers)),
+                   key=lambda i: (self.centers[i][0] - x) ** 2 + (self.centers[i][1] - y) ** 2)
+
+    def obj_offset(self, index):
+        """A cell's merge offset in OBJ axes (Source x, y, z -> OBJ x, z, -y)"""
+        item = self.items[index]
+        return item['offsetX'], item.get('offsetZ', 0), -item['offsetY']
+
+
+class ObjCellWriter:
+    """Streams each cell's faces straight into its own OBJ file"""
+
+    def __init__(self, output_dir, names, mtllib):
+        self.output_dir = output_dir
+        self.names = names
+        self.mtllib = mtllib
+        self.files = {}
+        self.materials = {}
+        self.counts = {}
+
+    def open(self, cell):
+        path = os.path.join(self.output_dir, f"{self.names[cell]}.obj")
+        f = open(path, 'w')
+        if self.mtllib:
+            f.write(f"mtllib {self.names[cell]}.mtl\n")
+        self.files[cell] = f
+        self.materials[cell] = None
+        self.counts[cell] = [0, 0, 0, 0]  # v, vt, vn, faces
+        return f
+
+    def add_face(self, cell, corners, attributes, offset, material):
+        f = self.files.get(cell) or self.open(cell)
+        counts = self.counts[cell]
+        positions, texcoords, normals = attributes
+        lines = []
+        references = []
+        for v, vt, vn in corners:
+            if positions.owner[v] != cell:
+                counts[0] += 1
+                positions.owner[v] = cell
+                positions.local[v] = counts[0]
+                x, y, z = positions.values[v * 3:v * 3 + 3]
+                lines.append(f"v {x - offset[0]!r} {y - offset[1]!r} {z - offset[2]!r}\n")
+            reference = str(positions.local[v])
+
+            if vt is not None:
+                if texcoords.owner[vt] != cell:
+                    counts[1] += 1
+                    texcoords.owner[vt] = cell
+                    texcoords.local[vt] = counts[1]
+                    u, w = texcoords.values[vt * 2:vt * 2 + 2]
+                    lines.append(f"vt {u!r} {w!r}\n")
+                reference += f"/{texcoords.local[vt]}"
+
+            if vn is not None:
+                if normals.owner[vn] != cell:
+                    counts[2] += 1
+                    normals.owner[vn] = cell
+                    normals.local[vn] = counts[2]
+                    x, y, z = normals.values[vn * 3:vn * 3 + 3]
+                    lines.append(f"vn {x!r} {y!r} {z!r}\n")
+                reference += f"/{normals.local[vn]}" if vt is not None else f"//{normals.local[vn]}"
+            references.append(reference)
+
+        if material != self.materials[cell]:
+            lines.append(f"usemtl {material}\n")
+            self.materials[cell] = material
+        lines.append(f"f {' '.join(references)}\n")
+        f.writelines(lines)
+        counts[3] += 1
+
+    def finish(self, obj_dir):
+        """Close every cell file and copy the atlas material library next to it"""
+        results = {}
+        for cell, f in self.files.items():
+            f.close()
+            result = {'path': f.name, 'vertices': self.counts[cell][0], 'faces': self.counts[cell][3]}
+            source_mtl = os.path.join(obj_dir, self.mtllib) if self.mtllib else None
+            if source_mtl and os.path.exists(source_mtl):
+                mtl_path = os.path.join(self.output_dir, f"{self.names[cell]}.mtl")
+                shutil.copyfile(source_mtl, mtl_path)
+                result['mtlPath'] = mtl_path
+            results[cell] = result
+        return results
+
+
+class MeshCellSpill:
+    """
+    Spills each cell's vertices and triangles to temporary files while the atlas
+    streams past, then builds the cells' 3DS files one at a time, so only a
+    single cell's mesh is ever held in memory.
+    """
+
+    def __init__(self, output_dir, names, spill_dir):
+        self.output_dir = output_dir
+        self.names = names
+        self.spill_dir = spill_dir
+        self.files = {}
+        self.counts = {}
+
+    def open(self, cell):
+        vertex_file = open(os.path.join(self.spill_dir, f"{cell}.v"), 'w+b')
+        face_file = open(os.path.join(self.spill_dir, f"{cell}.f"), 'w+b')
+        self.files[cell] = (vertex_file, face_file)
+        self.counts[cell] = [0, 0]  # vertices, triangles
+        return self.files[cell]
+
+    def add_face(self, cell, corners, attributes, offset, material):
+        vertex_file, face_file = self.files.get(cell) or self.open(cell)
+        counts = self.counts[cell]
+        positions = attributes[0]
+        local = []
+        for v, _vt, _vn in corners:
+            if positions.owner[v] != cell:
+                positions.owner[v] = cell
+                positions.local[v] = counts[0]
+                counts[0] += 1
+                x, y, z = positions.values[v * 3:v * 3 + 3]
+                vertex_file.write(struct.pack('<3d', x - offset[0], y - offset[1], z - offset[2]))
+            local.append(positions.local[v])
+
+        # Fan triangulation, as in the OBJ parsers
+        for i in range(1, len(local) - 1):
+            face_file.write(struct.pack('<3i', local[0], local[i], local[i + 1]))
+            counts[1] += 1
+
+    def load(self, cell, scale, matrix):
+        """Read a cell back as scaled, rotated (vertices, faces)"""
+        vertex_file, face_file = self.files[cell]
+        vertex_file.seek(0)
+        face_file.seek(0)
+        coords = array('d')
+        coords.frombytes(vertex_file.read())
+        indices = array('i')
+        indices.frombytes(face_file.read())
+        if sys.byteorder == 'big':
+            coords.byteswap()
+            indices.byteswap()
+
+        if np is not None:
+            vertices = (np.frombuffer(coords, dtype=np.float64).reshape(-1, 3) * scale) @ np.array(matrix).T
+            faces = np.frombuffer(indices, dtype=np.int32).reshape(-1, 3).astype(np.int64)
+            return vertices, faces
+
+        vertices = [list(apply_rotation(matrix, coords[i] * scale, coords[i + 1] * scale, coords[i + 2] * scale))
+                    for i in range(0, len(coords), 3)]
+        faces = [list(indices[i:i + 3]) for i in range(0, len(indices), 3)]
+        return vertices, faces
+
+    def finish(self, scale=1.0, roll=0.0, pitch=0.0, yaw=0.0, **options):
+        """Write every cell's 3DS file; options are collision_meshes() keywords"""
+        matrix = rotation_matrix(roll, pitch, yaw)
+        results = {}
+        for cell in sorted(self.files):
+            path = os.path.join(self.output_dir, f"{self.names[cell]}.3ds")
+            vertices, faces = self.load(cell, scale, matrix)
+            print(f"Cell {cell} ({self.names[cell]}): {len(vertices)} vertices, {len(faces)} faces")
+            write_3ds_objects(collision_meshes(vertices, faces, **options), path)
+            for spill in self.files[cell]:
+                spill.close()
+            results[cell] = {'path': path, 'vertices': self.counts[cell][0], 'faces': self.counts[cell][1]}
+        return results
+
+
+def split_atlas(obj_path, layout_path, output_dir, output_format="obj", name_prefix=None,
+                scale=1.0, roll=0.0, pitch=0.0, yaw=0.0, dirty_cells=None, **options):
+    """
+    Split the OBJ of a merge.py grid atlas back into one model per layout cell
+    in a single streaming pass.
+
+    Each face goes to the cell holding its centroid (Source X/Y; OBJ x, -z),
+    and that cell's merge offset is taken back off its vertices. "obj" writes
+    <name>.obj (+ a copy of the atlas .mtl) per cell as faces arrive; "3ds"
+    spills each cell to disk and writes <name>.3ds files one cell at a time,
+    applying scale/rotation and the collision_meshes() options.
+
+    Cells are named <name_prefix>_<index> when a prefix is given, otherwise by
+    their layout name. With dirty_cells (layout indices, e.g. merge.py's
+    dirtyCells) only those cells, and any whose file is missing, are written;
+    the rest keep their files from the last split and are listed as reused.
+    Returns a result dict listing the cells.
+    """
+    if output_format not in ("obj", "3ds"):
+        raise ValueError(f"Unknown split format: {output_format}")
+
+    start = time.perf_counter()
+    with open(layout_path, 'r', encoding='utf-8') as f:
+        layout = AtlasLayout(json.load(f))
+    names = [f"{name_prefix}_{index}" if name_prefix else item['name']
+             for index, item in enumerate(layout.items)]
+    offsets = [layout.obj_offset(index) for index in range(len(layout.items))]
+    os.makedirs(output_dir, exist_ok=True)
+    paths = [os.path.join(output_dir, f"{name}.{output_format}") for name in names]
+    if dirty_cells is None:
+        written = set(range(len(names)))
+    else:
+        written = {index for index, path in enumerate(paths) if index in dirty_cells or not os.path.exists(path)}
+    print(f"Splitting {obj_path} into {len(names)} cells ({output_format}), "
+          f"{len(names) - len(written)} unchanged...")
+
+    positions = AtlasAttribute(3)
+    texcoords = AtlasAttribute(2)
+    normals = AtlasAttribute(3)
+    attributes = (positions, texcoords, normals)
+    keep_attributes = output_format == "obj"  # 3DS collision only needs positions
+    material = None
+    mtllib = None
+    spill_dir = None
+    writer = None
+    face_count = 0
+
+    try:
+        if output_format == "3ds":
+            spill_dir = tempfile.mkdtemp(prefix="atlas_split_", dir=output_dir)
+            writer = MeshCellSpill(output_dir, names, spill_dir)
+
+        with open(obj_path, 'r') as f:
+            for line in f:
+                parts = line.split()
+                if not parts:
+                    continue
+                kind = parts[0]
+
+                if kind == 'v':
+                    positions.add(parts[1:4])
+                elif kind == 'f':
+                    if writer is None:
+                        writer = ObjCellWriter(output_dir, names, mtllib)
+                    corners = []
+                    sum_x = sum_z = 0.0
+                    values = positions.values
+                    for token in parts[1:]:
+                        fields = token.split('/')
+                        v = positions.resolve(fields[0])
+                        vt = vn = None
+                        if keep_attributes and len(fields) > 1:
+                            if fields[1]:
+                                vt = texcoords.resolve(fields[1])
+                            if len(fields) > 2 and fields[2]:
+                                vn = normals.resolve(fields[2])
+                        corners.append((v, vt, vn))
+                        sum_x += values[v * 3]
+                        sum_z += values[v * 3 + 2]
+                    if len(corners) < 3:
+                        continue
+                    cell = layout.cell_at(sum_x / len(corners), -sum_z / len(corners))
+                    face_count += 1
+                    if cell in written:
+                        writer.add_face(cell, corners, attributes, offsets[cell], material)
+                elif kind == 'vt':
+                    if keep_attributes:
+                        texcoords.add(parts[1:3])
+                elif kind == 'vn':
+                    if keep_attributes:
+                        normals.add(parts[1:4])
+                elif kind == 'usemtl':
+                    material = line.strip()[7:].strip()
+                elif kind == 'mtllib':
+                    mtllib = line.strip()[7:].strip()
+
+        print(f"  Streamed {len(positions)} vertices, {face_count} faces")
+        if writer is None:
+            cells = {}
+        elif output_format == "3ds":
+            cells = writer.finish(scale, roll, pitch, yaw, **options)
+        else:
+            cells = writer.finish(os.path.dirname(obj_path))
+    finally:
+        if writer is not None and output_format == "3ds":
+            for files in writer.files.values():
+                for spill in files:
+                    spill.close()
+        if spill_dir:
+            shutil.rmtree(spill_dir, ignore_errors=True)
+
+    results = []
+    for index, name in enumerate(names):
+        if index not in written:
+            cell = {'path': paths[index], 'reused': True}
+            mtl_path = os.path.join(output_dir, f"{name}.mtl")
+            if output_format == "obj" and os.path.exists(mtl_path):
+                cell['mtlPath'] = mtl_path
+        elif index in cells:
+            cell = cells[index]
+        else:
+            print(f"  WARNING: No faces for {layout.items[index]['name']}, skipping")
+            continue
+        results.append(dict(cell, name=name, originalName=layout.items[index]['name'], index=index))
+
+    return {
+        'success': True,
+        'format': output_format,
+        'cells': results,
+        'vertices': len(positions),
+        'faces': face_count,
+        'elapsedMs': round((time.perf_counter() - start) * 1000, 2),
+    }
+
+
+def cell_list(text):
+    """argparse type for comma-separated layout indices (may be empty)"""
+    try:
+        return {int(part) for part in text.split(",") if part.strip()}
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"not a list of cell indices: {text}")
+
+
+def non_negative_float(text):
+    """argparse type for distances that must not be negative"""
+    try:
+        value = float(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"not a number: {text}")
+    if not value >= 0:
+        raise argparse.ArgumentTypeError(f"must not be negative: {text}")
+    return value
+
+
 def main():
     """Parse command line arguments and run conversion"""
-    if len(sys.argv) < 3:
-        print("ERROR: Missing arguments")
-        print("Usage: python convert_obj_to_3ds.py input.obj output.3ds [scale] [roll] [pitch] [yaw]")
-        sys.exit(1)
+    parser = argparse.ArgumentParser(description="Convert an OBJ file to a 3DS collision model")
+    parser.add_argument("input_path", nargs="?", help="Path to input OBJ file")
+    parser.add_argument("output_path", nargs="?", help="Path to output 3DS file")
+    parser.add_argument("scale", nargs="?", default="1.0", help="Scale factor (default: 1.0)")
+    parser.add_argument("roll", nargs="?", default="0", help="Roll in degrees around X-axis (default: 0)")
+    parser.add_argument("pitch", nargs="?", default="0", help="Pitch in degrees around Y-axis (default: 0)")
+    parser.add_argument("yaw", nargs="?", default="0", help="Yaw in degrees around Z-axis (default: 0)")
+    parser.add_argument("--manifest", default=None,
+                        help="JSON list of {input, output, scale, roll, pitch, yaw} jobs to convert in one run")
+    parser.add_argument("--jobs", type=int, default=1,
+                        help="Worker processes for --manifest (default: 1)")
+    parser.add_argument("--split-layout", default=None, metavar="LAYOUT",
+                        help="Split the input atlas OBJ by this merge.py _layout.json into the output directory")
+    parser.add_argument("--split-format", choices=("obj", "3ds"), default="obj",
+                        help="With --split-layout, write per-cell OBJ or 3DS files (default: obj)")
+    parser.add_argument("--name-prefix", default=None,
+                        help="With --split-layout, name cells <prefix>_<index> instead of by layout name")
+    parser.add_argument("--split-cells", type=cell_list, default=None, metavar="CELLS",
+                        help="With --split-layout, only rewrite these comma-separated layout indices; "
+                             "other cells keep their files from the last split")
+    parser.add_argument("--collision", choices=COLLISION_MODES, default="mesh",
+                        help="Write the mesh, its convex hull, or its oriented bounding box (default: mesh)")
+    parser.add_argument("--pieces", type=int, default=1,
+                        help="With --collision hull/box, split into this many convex pieces (default: 1)")
+    parser.add_argument("--weld", type=float, default=None, metavar="TOLERANCE",
+                        help="Merge vertices within TOLERANCE (output units) and drop degenerate/duplicate faces")
+    parser.add_argument("--decimate", type=int, default=None, metavar="FACES",
+                        help="Simplify the mesh to this many triangles")
+    parser.add_argument("--max-error", type=non_negative_float, default=None, metavar="DISTANCE",
+                        help="Simplify while the surface stays within this distance of the original (output units)")
+    args = parser.parse_args()
 
-    input_path = sys.argv[1]
-    output_path = sys.argv[2]
-    
-    # Parse optional parameters
-    scale = 1.0
-    roll = 0
-    pitch = 0
-    yaw = 0
-    
-    if len(sys.argv) >= 4:
-        try:
-            scale = float(sys.argv[3])
-            if scale <= 0:
-                print("ERROR: Scale factor must be positive")
-                sys.exit(1)
-        except ValueError:
-            print("ERROR: Scale factor must be a number")
-            sys.exit(1)
-    
-    if len(sys.argv) >= 5:
-        try:
-            roll = float(sys.argv[4])
-        except ValueError:
-            print("ERROR: Roll rotation must be a number")
-            sys.exit(1)
-    
-    if len(sys.argv) >= 6:
+    if args.manifest:
         try:
-            pitch = float(sys.argv[5])
-        except ValueError:
-            print("ERROR: Pitch rotation must be a number")
+            with open(args.manifest, "r", encoding="utf-8") as f:
+                jobs = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"ERROR: Failed to read manifest: {e}")
             sys.exit(1)
-    
-    if len(sys.argv) >= 7:
+        defaults = {"target_faces": args.decimate, "max_error": args.max_error, "weld": args.weld,
+                    "collision": args.collision, "pieces": args.pieces}
+        summary = run_manifest(jobs, max(1, args.jobs), defaults)
+        sys.exit(1 if summary["failed"] else 0)
+
+    if not args.input_path or not args.output_path:
+        print("ERROR: Missing arguments")
+        parser.print_usage()
+        sys.exit(1)
+
+    input_path = args.input_path
+    output_path = args.output_path
+
+    try:
+        scale = float(args.scale)
+    except ValueError:
+        print("ERROR: Scale factor must be a number")
+        sys.exit(1)
+    if scale <= 0:
+        print("ERROR: Scale factor must be positive")
+        sys.exit(1)
+
+    rotation = []
+    for name, value in (("Roll", args.roll), ("Pitch", args.pitch), ("Yaw", args.yaw)):
         try:
-            yaw = float(sys.argv[6])
+            rotation.append(float(value))
         except ValueError:
-            print("ERROR: Yaw rotation must be a number")
+            print(f"ERROR: {name} rotation must be a number")
             sys.exit(1)
+    roll, pitch, yaw = rotation
+
+    if args.pieces < 1:
+        print("ERROR: --pieces must be at least 1")
+        sys.exit(1)
+    if args.weld is not None and args.weld < 0:
+        print("ERROR: --weld tolerance must not be negative")
+        sys.exit(1)
+    if args.decimate is not None and args.decimate < 1:
+        print("ERROR: --decimate must be at least 1")
+        sys.exit(1)
 
     # Validate input file exists
     if not os.path.exists(input_path):
         print(f"ERROR: Input file not found: {input_path}")
         sys.exit(1)
 
+    if args.split_layout:
+        try:
+            result = split_atlas(input_path, args.split_layout, output_path, args.split_format,
+                                 args.name_prefix, scale, roll, pitch, yaw, args.split_cells,
+                                 target_faces=args.decimate, max_error=args.max_error, weld=args.weld,
+                                 collision=args.collision, pieces=args.pieces)
+        except Exception as e:
+            print(f"ERROR: Failed to split atlas: {e}")
+            sys.exit(1)
+        print(json.dumps(result))
+        return
+
     # Ensure output directory exists
     output_dir = os.path.dirname(output_path)
     if output_dir and not os.path.exists(output_dir):
         os.makedirs(output_dir, exist_ok=True)
 
     # Run conversion
-    convert_obj_to_3ds(input_path, output_path, scale, roll, pitch, yaw)
+    convert_obj_to_3ds(input_path, output_path, scale, roll, pitch, yaw,
+                       target_faces=args.decimate, max_error=args.max_error, weld=args.weld,
+                       collision=args.collision, pieces=args.pieces)
 
 
 if __name__ == "__main__":
+    # Needed for --jobs in the PyInstaller-built executable
+    multiprocessing.freeze_support()
     main()
@@ -1,12 +1,18 @@
 #!/usr/bin/env python3
 """
-VMF Grid Merger - Merge multiple VMF files into a grid layout
+VMF Grid Merger - Merge multiple VMF files into a packed atlas layout
 Uses srctools for proper VMF parsing and manipulation
 """
+import os
 import sys
 import json
 import math
+import time
+import shutil
+import hashlib
+import multiprocessing
 from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
 from srctools import Vec, VMF
 
 
@@ -17,44 +23,91 @@ def calculate_grid_dimensions(count):
     return cols, rows
 
 
-def get_vmf_bounds(vmf):
-    """Get bounding box of a VMF file"""
-    min_x = min_y = min_z = float('inf')
-    max_x = max_y = max_z = float('-inf')
-    
-    # Check all brushes (they're on worldspawn and brush entities)
-    for brush in vmf.brushes:
-        # Get all vertices from brush sides
-        for side in brush.sides:
-            # side.planes is a tuple of 3 points
-            for point in side.planes:
-                min_x = min(min_x, point.x)
-                max_x = max(max_x, point.x)
-                min_y = min(min_y, point.y)
-                max_y = max(max_y, point.y)
-                min_z = min(min_z, point.z)
-                max_z = max(max_z, point.z)
-    
-    # Check all entities with origin
-    for ent in vmf.entities:
-        origin_str = ent.get('origin', None)
-        if origin_str:
-            try:
-                origin = Vec.from_str(origin_str)
-                min_x = min(min_x, origin.x)
-                max_x = max(max_x, origin.x)
-                min_y = min(min_y, origin.y)
-                max_y = max(max_y, origin.y)
-                min_z = min(min_z, origin.z)
-                max_z = max(max_z, origin.z)
-            except:
-                pass
-    
-    # Default bounds if nothing found
-    if not math.isfinite(min_x):
-        return 0, 128, 0, 128, 0, 128
-    
-    return min_x, max_x, min_y, max_y, min_z, max_z
+def grid_area(sizes, spacing):
+    """Area the uniform grid layout would take: square cells sized to the largest item in any axis"""
+    cols, rows = calculate_grid_dimensions(len(sizes))
+    cell_size = max(max(size) for size in sizes) + spacing
+    return cols * rows * cell_size * cell_size
+
+
+def skyline_pack(footprints, width, top=0):
+    """
+    Place rectangles bottom-left on a skyline `width` wide, tallest first
+
+    Args:
+        footprints: {key: (width, height)}, none wider than `width`
+        width: Width of the strip being packed
+        top: Y the strip starts at
+
+    Returns {key: (x, y)}
+    """
+    # Segments (x, y, width) covering [0, width), left to right
+    skyline = [(0, top, width)]
+    placed = {}
+
+    for key in sorted(footprints, key=lambda k: (-footprints[k][1], -footprints[k][0], k)):
+        w, h = footprints[key]
+        best = None
+        for start, (x, _y, _w) in enumerate(skyline):
+            if x + w - width > PACK_TOLERANCE:
+                break
+            # Resting height is the highest segment under the rectangle
+            y = top
+            for seg_x, seg_y, _seg_w in skyline[start:]:
+                if seg_x >= x + w:
+                    break
+                y = max(y, seg_y)
+            if best is None or (y + h, x) < (best[1] + h, best[0]):
+                best = (x, y)
+
+        x, y = best
+        placed[key] = best
+        # Raise the skyline under the new rectangle, trimming what it covers
+        raised = [seg for seg in skyline if seg[0] + seg[2] <= x]
+        raised.append((x, y + h, w))
+        for seg_x, seg_y, seg_w in skyline:
+            if seg_x + seg_w > x + w:
+                start = max(seg_x, x + w)
+                raised.append((start, seg_y, seg_x + seg_w - start))
+        # Merge neighbours at the same height
+        skyline = [raised[0]]
+        for seg in raised[1:]:
+            if seg[1] == skyline[-1][1]:
+                skyline[-1] = (skyline[-1][0], seg[1], skyline[-1][2] + seg[2])
+            else:
+                skyline.append(seg)
+
+    return placed
+
+
+def packed_extent(rects):
+    """Width and height of the box enclosing {key: (x, y, width, height)} placed from the origin"""
+    if not rects:
+        return 0, 0
+    return (max(x + w for x, _y, w, _h in rects.values()),
+            max(y + h for _x, y, _w, h in rects.values()))
+
+
+def pack_layout(footprints):
+    """
+    Pack footprints into the smallest box found over a few strip widths,
+    from a single column up to one row. Returns {key: (x, y, width, height)}
+    """
+    widest = max(w for w, _h in footprints.values())
+    total_area = sum(w * h for w, h in footprints.values())
+    widths = {widest, sum(w for w, _h in footprints.values())}
+    widths.update(max(widest, math.sqrt(total_area) * factor) for factor in PACK_WIDTH_FACTORS)
+
+    best = None
+    for width in sorted(widths):
+        positions = skyline_pack(footprints, width)
+        rects = {key: positions[key] + footprints[key] for key in footprints}
+        used_w, used_h = packed_extent(rects)
+        # Smallest area, then the squarer box
+        score = (used_w * used_h, max(used_w, used_h))
+        if best is None or score < best[0]:
+            best = (score, rects)
+    return best[1]
 
 
 def offset_vmf(vmf, offset):
@@ -77,66 +130,417 @@ def offset_vmf(vmf, offset):
                 pass
 
 
-def merge_vmfs_grid(vmf_paths, output_path, spacing=256):
+def file_hash(path):
+    """SHA-1 of a file's contents, used to spot inputs that changed since the last merge"""
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def parts_dir_for(output_path):
+    """Directory holding the per-cell fragments the merged VMF is assembled from"""
+    return output_path.replace('.vmf', '_parts')
+
+
+def export_parts(vmf, parts_dir, key):
+    """
+    Write a VMF's world solids and entities as text fragments, exactly as
+    VMF.export() would write them into the world block and after it
+    """
+    with open(os.path.join(parts_dir, key + '.solids'), 'w') as f:
+        for brush in vmf.brushes:
+            brush.export(f, ind='\t', include_groups=False)
+    with open(os.path.join(parts_dir, key + '.entities'), 'w') as f:
+        for ent in vmf.entities:
+            ent.export(f)
+
+
+def export_shell(vmf, parts_dir):
+    """Export the base VMF with no solids or entities; the merged VMF is built around it"""
+    vmf.brushes.clear()
+    vmf.entities.clear()
+    with open(os.path.join(parts_dir, 'shell.vmf'), 'w') as f:
+        vmf.export(f)
+
+
+def write_merged_vmf(output_path, parts_dir, keys):
+    """
+    Assemble the merged VMF from the shell plus each cell's fragments, in order:
+    solids go after the world keyvalues, entities after the world block
+    """
+    with open(os.path.join(parts_dir, 'shell.vmf'), 'r') as f:
+        shell = f.read()
+    world = shell.index('\nworld\n{\n') + len('\nworld\n{\n')
+    solids_at = world
+    for line in shell[world:].splitlines(keepends=True):
+        if not line.startswith('\t"'):
+            break
+        solids_at += len(line)
+    entities_at = shell.index('\n}\n', world) + len('\n}\n')
+
+    with open(output_path, 'w') as out:
+        out.write(shell[:solids_at])
+        for key in keys:
+            with open(os.path.join(parts_dir, key + '.solids'), 'r') as f:
+                shutil.copyfileobj(f, out)
+        out.write(shell[solids_at:entities_at])
+        for key in keys:
+            with open(os.path.join(parts_dir, key + '.entities'), 'r') as f:
+                shutil.copyfileobj(f, out)
+        out.write(shell[entities_at:])
+
+
+def load_previous_layout(layout_path, parts_dir, spacing):
+    """
+    Read the layout of an earlier merge, if it can be built on: the current
+    LAYOUT_VERSION with all its keys, same spacing, and every cell's fragments
+    still on disk. Returns None otherwise
+    """
+    if not layout_path or not os.path.exists(layout_path):
+        return None
+    try:
+        with open(layout_path, 'r') as f:
+            layout = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    if not isinstance(layout, dict) or layout.get('version') != LAYOUT_VERSION:
+        return None
+    if any(key not in layout for key in LAYOUT_KEYS):
+        return None
+    if layout['spacing'] != spacing or layout['idBlock'] != ID_BLOCK or layout['packing'] != PACKING:
+        return None
+    files = [os.path.join(parts_dir, 'shell.vmf')]
+    for item in layout['layout']:
+        if any(key not in item for key in LAYOUT_ITEM_KEYS):
+            return None
+        # Fragments are named after their slot, so new cells can't overwrite reused ones
+        if not item['part'].startswith(f"{item['slot']}_"):
+            return None
+        files += [os.path.join(parts_dir, item['part'] + ext) for ext in ('.solids', '.entities')]
+    if not all(os.path.exists(path) for path in files):
+        return None
+    return layout
+
+
+def occurrence_keys(paths):
     """
-    Merge multiple VMF files into a grid layout
+    (path, n) for the n-th time each path appears, so an input listed twice
+    gets two cells and keeps them across merges
+    """
+    seen = {}
+    keys = []
+    for path in paths:
+        keys.append((path, seen.get(path, 0)))
+        seen[path] = seen.get(path, 0) + 1
+    return keys
+
+
+def item_size(item):
+    """X/Y/Z size of a placed item, from its layout bounds"""
+    bounds = item['bounds']
+    return (bounds['maxX'] - bounds['minX'], bounds['maxY'] - bounds['minY'], bounds['maxZ'] - bounds['minZ'])
+
+
+def cell_rect(item):
+    """A layout item's cell as (x, y, width, height)"""
+    return item['cellX'], item['cellY'], item['cellWidth'], item['cellHeight']
+
+
+def fits(footprint, rect):
+    """Whether a (width, height) footprint fits inside a cell"""
+    return footprint[0] <= rect[2] + PACK_TOLERANCE and footprint[1] <= rect[3] + PACK_TOLERANCE
+
+
+def place_incremental(footprints, previous_rects, freed):
+    """
+    Place inputs around an earlier layout without moving anything that still fits
+    
+    Inputs keep their previous cell when their footprint fits it. The rest take
+    the smallest free cell they fit (from removed or outgrown inputs), or are
+    packed into a strip on top of the atlas
+    
+    Args:
+        footprints: {index: (width, height)} for every input
+        previous_rects: {index: cell} for inputs in the earlier layout
+        freed: Cells of inputs no longer merged
+    
+    Returns {index: (x, y, width, height)}
+    """
+    rects = {}
+    free = list(freed)
+    for i, rect in previous_rects.items():
+        if fits(footprints[i], rect):
+            rects[i] = rect
+        else:
+            free.append(rect)
+    
+    overflow = {}
+    for i in sorted((i for i in footprints if i not in rects), key=lambda i: (-footprints[i][0] * footprints[i][1], i)):
+        candidates = [rect for rect in free if fits(footprints[i], rect)]
+        if candidates:
+            rect = min(candidates, key=lambda rect: rect[2] * rect[3])
+            free.remove(rect)
+            rects[i] = rect
+        else:
+            overflow[i] = footprints[i]
+    
+    if overflow:
+        width, height = packed_extent(rects)
+        width = max(width, max(w for w, _h in overflow.values()))
+        positions = skyline_pack(overflow, width, top=height)
+        rects.update({i: positions[i] + overflow[i] for i in overflow})
+    return rects
+
+
+# Each cell's slot renumbers its solids, sides and entities into its own block
+# of IDs, so merged cells never collide and reused cells keep their IDs
+ID_BLOCK = 100000
+
+# Strip widths tried by pack_layout, as multiples of the side of a square
+# holding all the footprints' area
+PACK_WIDTH_FACTORS = (1.0, 1.15, 1.3, 1.5, 1.75, 2.0)
+
+# An incremental merge lays everything out again once holes and cells added on
+# top leave the atlas this many times the area of a fresh packing
+REPACK_SLACK = 1.5
+
+# Slack for float footprints when checking what fits
+PACK_TOLERANCE = 1e-6
+
+# Layout algorithm recorded in _layout.json; earlier layouts are laid out again
+PACKING = 'skyline'
+
+# _layout.json format. Bump when its keys change; a layout without this
+# version (or the keys it promises) triggers a full merge
+LAYOUT_VERSION = 2
+LAYOUT_KEYS = ('version', 'packing', 'spacing', 'idBlock', 'shell', 'layout')
+LAYOUT_ITEM_KEYS = ('name', 'index', 'slot', 'path', 'hash', 'part', 'bounds',
+                    'cellX', 'cellY', 'cellWidth', 'cellHeight')
+
+
+# Entity keyvalues holding space-separated side IDs
+SIDE_LIST_KEYS = ('sides', 'sides2')
+
+
+def scan_vmf(vmf_path):
+    """
+    Measure a VMF without parsing it: the bounds of its world brush plane
+    points and entity origins. Reads one line at a time
+    """
+    points = []
+    stack = []
+    block = None
+    
+    with open(vmf_path, 'r', encoding='utf-8', errors='replace') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            first = line[0]
+            if first == '"':
+                # Only two keys matter; skip the rest without splitting them
+                head = line[:8].lower()
+                if head.startswith('"plane"'):
+                    if stack[:1] == ['world'] and stack[-2:] == ['solid', 'side']:
+                        numbers = line[7:].replace('(', ' ').replace(')', ' ').replace('"', ' ').split()
+                        points.extend(numbers[i:i + 3] for i in range(0, len(numbers) - 2, 3))
+                elif head == '"origin"':
+                    if stack[-1:] == ['entity'] and len(stack) <= 2:
+                        points.append(line[8:].replace('"', ' ').split())
+            elif first == '{':
+                stack.append(block)
+            elif first == '}':
+                if stack:
+                    stack.pop()
+            else:
+                block = line.lower()
+    
+    coords = []
+    for point in points:
+        try:
+            x, y, z = (float(n) for n in point)
+        except ValueError:
+            continue
+        coords.append((x, y, z))
+    
+    # Default bounds if nothing found
+    if not coords:
+        bounds = (0, 128, 0, 128, 0, 128)
+    else:
+        xs, ys, zs = zip(*coords)
+        bounds = (min(xs), max(xs), min(ys), max(ys), min(zs), max(zs))
+    return {
+        'path': vmf_path,
+        'bounds': bounds,
+        'size': (bounds[1] - bounds[0], bounds[3] - bounds[2], bounds[5] - bounds[4])
+    }
+
+
+def renumber_ids(vmf, base):
+    """Give every solid, side and entity a fresh ID from base + 1 upwards"""
+    solids = list(vmf.brushes)
+    for ent in vmf.entities:
+        solids.extend(ent.solids)
+    if max(len(solids), len(vmf.entities)) >= ID_BLOCK:
+        raise ValueError(f"Too many solids or entities for one cell (limit {ID_BLOCK - 1})")
+    
+    side_ids = {}
+    side_count = 0
+    for solid_id, solid in enumerate(solids, base + 1):
+        solid.id = solid_id
+        for side in solid.sides:
+            side_count += 1
+            side_ids[str(side.id)] = str(base + side_count)
+            side.id = base + side_count
+    if side_count >= ID_BLOCK:
+        raise ValueError(f"Too many brush sides for one cell (limit {ID_BLOCK - 1})")
+    
+    for ent_id, ent in enumerate(vmf.entities, base + 1):
+        ent.id = ent_id
+        # Overlays and cubemaps point at brush sides by ID
+        for key in SIDE_LIST_KEYS:
+            if ent.get(key):
+                ent[key] = ' '.join(side_ids.get(side, side) for side in ent[key].split())
+
+
+def build_cell(job):
+    """
+    Parse one input, move it into its cell, renumber it into the cell's ID
+    block and write its fragments (and the shell, for the first input). Runs in
+    a worker process when merging in parallel; only timings come back, and the
+    parsed VMF is dropped before the next input is loaded
+    """
+    start = time.perf_counter()
+    vmf = VMF.parse(Path(job['path']))  # pyright: ignore[reportArgumentType]
+    parse_ms = (time.perf_counter() - start) * 1000
+    
+    if job['part']:
+        offset_vmf(vmf, Vec(*job['offset']))
+        renumber_ids(vmf, job['idBase'])
+        export_parts(vmf, job['partsDir'], job['part'])
+    if job['shell']:
+        export_shell(vmf, job['partsDir'])
+    
+    return {'parseMs': parse_ms, 'totalMs': (time.perf_counter() - start) * 1000}
+
+
+def build_cells(jobs, workers=1):
+    """Run build_cell over the jobs, one input at a time or across `workers` processes"""
+    if workers <= 1 or len(jobs) <= 1:
+        return [build_cell(job) for job in jobs]
+    
+    with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+        return list(pool.map(build_cell, jobs))
+
+
+def merge_vmfs_grid(vmf_paths, output_path, spacing=256, workers=1, hashes=None,
+                    previous_layout=None):
+    """
+    Merge multiple VMF files into a packed atlas layout
     
     Args:
         vmf_paths: List of VMF file paths to merge
         output_path: Output path for merged VMF
         spacing: Spacing between models in units
+        workers: Processes used to parse the inputs (default: 1). Each holds
+                 one parsed input, so peak memory grows with the worker count
+        hashes: Content hash of each input (default: SHA-1 of the file)
+        previous_layout: _layout.json of an earlier merge into output_path. Inputs
+                         whose hash is unchanged keep their cell and offsets and
+                         are not re-parsed; only changed and new inputs are placed.
+                         Passing it (even before the file exists) also keeps the
+                         per-cell fragments in <output>_parts for the next merge;
+                         without it they are deleted once the merged VMF is written
+    
+    Each input gets a cell the size of its X/Y footprint plus `spacing`, packed
+    with a skyline packer, rather than a square cell sized to the largest input
+    in any axis. The layout JSON records every cell's rectangle and the area
+    saved against that uniform grid
+    
+    Inputs are sized with a light line scan first, then parsed one at a time
+    (or one per worker) and written out as their cell's fragments, so peak
+    memory follows the largest single input rather than the whole set
     """
-    print(f"Merging {len(vmf_paths)} VMF files into grid layout...")
+    print(f"Merging {len(vmf_paths)} VMF files into packed layout...")
+    start = time.perf_counter()
+    if hashes is None:
+        hashes = [file_hash(vmf_path) for vmf_path in vmf_paths]
     
-    # Load all VMFs and get their bounds
-    vmf_data = []
-    max_width = max_height = max_depth = 0
+    parts_dir = parts_dir_for(output_path)
+    os.makedirs(parts_dir, exist_ok=True)
+    previous = load_previous_layout(previous_layout, parts_dir, spacing)
+    keys = occurrence_keys(vmf_paths)
+    previous_items = {}
+    if previous:
+        previous_layout_items = sorted(previous['layout'], key=lambda item: item['index'])
+        previous_keys = occurrence_keys([item['path'] for item in previous_layout_items])
+        previous_items = dict(zip(previous_keys, previous_layout_items))
+    current = set(keys)
+    removed = [item for key, item in previous_items.items() if key not in current]
     
-    for vmf_path in vmf_paths:
-        print(f"  Loading: {vmf_path}")
-        vmf = VMF.parse(Path(vmf_path))  # pyright: ignore[reportArgumentType]
-        
-        min_x, max_x, min_y, max_y, min_z, max_z = get_vmf_bounds(vmf)
-        width = max_x - min_x
-        height = max_y - min_y
-        depth = max_z - min_z
-        
-        max_width = max(max_width, width)
-        max_height = max(max_height, height)
-        max_depth = max(max_depth, depth)
-        
-        vmf_data.append({
-            'vmf': vmf,
-            'path': vmf_path,
-            'bounds': (min_x, max_x, min_y, max_y, min_z, max_z),
-            'size': (width, height, depth)
-        })
-        
-        print(f"    Size: {width:.0f}x{height:.0f}x{depth:.0f}")
+    # Unchanged inputs reuse their cell as-is; everything else is scanned, then parsed once
+    reused = {}
+    for i, (key, content_hash) in enumerate(zip(keys, hashes)):
+        item = previous_items.get(key)
+        if item and item['hash'] == content_hash:
+            reused[i] = item
+    
+    vmf_data = {i: scan_vmf(vmf_paths[i]) for i in range(len(vmf_paths)) if i not in reused}
     
-    # Calculate grid layout with square cells
-    cols, rows = calculate_grid_dimensions(len(vmf_data))
-    max_dimension = max(max_width, max_height, max_depth)
-    cell_size = max_dimension + spacing
+    # Footprints are each input's X/Y size plus the gutter; reused inputs are sized from their layout bounds
+    sizes = {i: data['size'] for i, data in vmf_data.items()}
+    sizes.update({i: item_size(item) for i, item in reused.items()})
+    footprints = {i: (size[0] + spacing, size[1] + spacing) for i, size in sizes.items()}
+    packed = pack_layout(footprints)
     
-    print(f"  Grid: {cols}x{rows}, Cell size: {cell_size:.0f} (square)")
+    if previous:
+        previous_rects = {i: cell_rect(previous_items[key]) for i, key in enumerate(keys) if key in previous_items}
+        freed = [cell_rect(item) for item in removed]
+        rects = place_incremental(footprints, previous_rects, freed)
+        # Holes and cells added on top only go so far before a fresh packing pays off
+        if math.prod(packed_extent(rects)) > math.prod(packed_extent(packed)) * REPACK_SLACK:
+            print(f"  Incremental placement is over {REPACK_SLACK}x the packed area, laying out every cell again")
+            previous = None
+    if previous:
+        slots = {i: previous_items[key]['slot'] for i, key in enumerate(keys) if key in previous_items}
+        taken = set(slots.values())
+        free = (slot for slot in range(len(vmf_paths) + len(taken)) if slot not in taken)
+        for i in range(len(vmf_paths)):
+            if i not in slots:
+                slots[i] = next(free)
+        print(f"  Reusing {len(reused)} unchanged cells, placing {len(vmf_data)}")
+    else:
+        rects = packed
+        slots = {i: i for i in range(len(vmf_paths))}
+        if reused:
+            vmf_data.update({i: scan_vmf(vmf_paths[i]) for i in reused})
+            reused = {}
+    scan_ms = (time.perf_counter() - start) * 1000
+    
+    for i in sorted(vmf_data):
+        width, height, depth = vmf_data[i]['size']
+        print(f"  Scanned: {vmf_data[i]['path']}")
+        print(f"    Size: {width:.0f}x{height:.0f}x{depth:.0f}")
     
-    # Create merged VMF (use first as base, but clear it)
-    merged_vmf = vmf_data[0]['vmf']
-    merged_vmf.brushes.clear()
-    merged_vmf.entities.clear()
+    atlas_width, atlas_height = packed_extent(rects)
+    area = atlas_width * atlas_height
+    uniform_area = grid_area(list(sizes.values()), spacing)
+    area_reduction = round((1 - area / uniform_area) * 100, 1)
+    print(f"  Packed: {atlas_width:.0f}x{atlas_height:.0f}, {area_reduction}% less area than a uniform grid")
     
-    # Merge each VMF with offset
+    # Place each VMF; its cell is built below
     grid_layout = []
+    jobs = []
     
-    for i, data in enumerate(vmf_data):
-        col = i % cols
-        row = i // cols
-        
-        # Calculate grid position
-        grid_x = col * cell_size
-        grid_y = row * cell_size
-        grid_z = 0
+    for i, vmf_path in enumerate(vmf_paths):
+        if i in reused:
+            grid_layout.append(dict(reused[i], index=i))
+            continue
+        data = vmf_data[i]
+        cell_x, cell_y, cell_width, cell_height = rects[i]
         
         # Center model in its cell by offsetting from its bounds
         min_x, max_x, min_y, max_y, min_z, max_z = data['bounds']
@@ -144,41 +548,39 @@ def merge_vmfs_grid(vmf_paths, output_path, spacing=256):
         model_center_y = (min_y + max_y) / 2
         
         # Calculate cell center
-        cell_center_x = grid_x + cell_size / 2
-        cell_center_y = grid_y + cell_size / 2
+        cell_center_x = cell_x + cell_width / 2
+        cell_center_y = cell_y + cell_height / 2
         
         # Offset to center the model in the cell (X/Y only, Z unchanged)
         offset_x = cell_center_x - model_center_x
         offset_y = cell_center_y - model_center_y
         offset_z = 0  # Do NOT modify height
         
-        offset_vec = Vec(offset_x, offset_y, offset_z)
+        print(f"  Placing {Path(vmf_path).stem} in {cell_width:.0f}x{cell_height:.0f} at ({cell_x:.0f}, {cell_y:.0f}) "
+              f"-> offset ({offset_x:.0f}, {offset_y:.0f}, {offset_z:.0f})")
         
-        print(f"  Placing {Path(data['path']).stem} at ({col}, {row}) -> offset ({offset_x:.0f}, {offset_y:.0f}, {offset_z:.0f})")
-        
-        # Load VMF fresh (don't reuse the cached one to avoid modifying shared objects)
-        vmf = VMF.parse(Path(data['path']))  # pyright: ignore[reportArgumentType]
-        offset_vmf(vmf, offset_vec)
-        
-        # Merge brushes
-        for brush in vmf.brushes:
-            merged_vmf.brushes.append(brush)
-        
-        # Merge entities
-        for ent in vmf.entities:
-            merged_vmf.entities.append(ent)
+        part = f"{slots[i]}_{hashes[i][:12]}"
+        jobs.append({
+            'path': vmf_path,
+            'offset': (offset_x, offset_y, offset_z),
+            'idBase': (slots[i] + 1) * ID_BLOCK,
+            'partsDir': parts_dir,
+            'part': part,
+            'shell': False
+        })
         
-        # Store grid info with final bounds after offsetting
+        # Store cell info with final bounds after offsetting
         grid_layout.append({
-            'name': Path(data['path']).stem,
+            'name': Path(vmf_path).stem,
             'index': i,
-            'col': col,
-            'row': row,
+            'slot': slots[i],
             'offsetX': offset_x,
             'offsetY': offset_y,
             'offsetZ': offset_z,
-            'cellX': grid_x,
-            'cellY': grid_y,
+            'cellX': cell_x,
+            'cellY': cell_y,
+            'cellWidth': cell_width,
+            'cellHeight': cell_height,
             'bounds': {
                 'minX': min_x + offset_x,
                 'maxX': max_x + offset_x,
@@ -186,38 +588,103 @@ def merge_vmfs_grid(vmf_paths, output_path, spacing=256):
                 'maxY': max_y + offset_y,
                 'minZ': min_z + offset_z,
                 'maxZ': max_z + offset_z
-            }
+            },
+            'path': vmf_path,
+            'hash': hashes[i],
+            'part': part
         })
     
+    # The first input supplies the merged VMF's settings (versioninfo, world keyvalues, ...)
+    shell = {'path': vmf_paths[0], 'hash': hashes[0]}
+    if 0 in vmf_data:
+        jobs[0]['shell'] = True
+    elif not previous or previous['shell'] != shell:
+        jobs.append({'path': vmf_paths[0], 'partsDir': parts_dir, 'part': None, 'shell': True})
+    
+    # Parse, offset and write out each cell, dropping each VMF as soon as it is written
+    build_start = time.perf_counter()
+    builds = build_cells(jobs, workers)
+    build_ms = (time.perf_counter() - build_start) * 1000
+    
+    # Cells are numbered by input position downstream, so a reused cell whose
+    # input moved to another position is dirty too
+    dirty_cells = sorted(set(vmf_data) | {i for i, item in reused.items() if item['index'] != i})
+    removed_cells = [item['name'] for item in removed] if previous else []
+    
     # Write merged VMF
-    with open(output_path, 'w') as f:
-        merged_vmf.export(f)
+    export_start = time.perf_counter()
+    write_merged_vmf(output_path, parts_dir, [item['part'] for item in grid_layout])
+    export_ms = (time.perf_counter() - export_start) * 1000
+    
+    # Drop fragments no cell uses any more, or all of them when no later merge
+    # will build on this one
+    if previous_layout is None:
+        shutil.rmtree(parts_dir, ignore_errors=True)
+    else:
+        keep = {item['part'] + ext for item in grid_layout for ext in ('.solids', '.entities')} | {'shell.vmf'}
+        for name in os.listdir(parts_dir):
+            if name not in keep:
+                os.remove(os.path.join(parts_dir, name))
     
     print(f"[OK] Merged VMF saved to: {output_path}")
     
-    # Write grid layout JSON for later splitting
+    # Write layout JSON for later splitting
     layout_path = output_path.replace('.vmf', '_layout.json')
     with open(layout_path, 'w') as f:
         json.dump({
-            'cols': cols,
-            'rows': rows,
-            'cellSize': cell_size,
+            'version': LAYOUT_VERSION,
+            'packing': PACKING,
+            'width': atlas_width,
+            'height': atlas_height,
+            'area': area,
+            'gridArea': uniform_area,
+            'areaReduction': area_reduction,
+            'spacing': spacing,
+            'idBlock': ID_BLOCK,
+            'shell': shell,
+            'dirtyCells': dirty_cells,
+            'removedCells': removed_cells,
             'layout': grid_layout
         }, f, indent=2)
     
-    print(f"[OK] Grid layout saved to: {layout_path}")
+    print(f"[OK] Layout saved to: {layout_path}")
+    if previous:
+        print(f"  Dirty cells: {len(dirty_cells)} of {len(grid_layout)}"
+              + (f", removed: {', '.join(removed_cells)}" if removed_cells else ""))
+    
+    timings = {
+        'parses': len(builds),
+        'workers': min(workers, max(len(builds), 1)),
+        'scanMs': round(scan_ms, 2),
+        'parseMs': round(sum(build['parseMs'] for build in builds), 2),
+        'buildMs': round(build_ms, 2),
+        'exportMs': round(export_ms, 2),
+        'totalMs': round((time.perf_counter() - start) * 1000, 2)
+    }
+    print(f"  Timing: scan {timings['scanMs']:.0f}ms, {timings['parses']} parses ({timings['parseMs']:.0f}ms CPU) "
+          f"built in {timings['buildMs']:.0f}ms on {timings['workers']} worker(s), "
+          f"export {timings['exportMs']:.0f}ms, total {timings['totalMs']:.0f}ms")
     
     return {
         'success': True,
         'output': output_path,
         'layout': layout_path,
-        'cols': cols,
-        'rows': rows,
-        'cellSize': cell_size
+        'width': atlas_width,
+        'height': atlas_height,
+        'area': area,
+        'gridArea': uniform_area,
+        'areaReduction': area_reduction,
+        'incremental': bool(previous),
+        'dirtyCells': dirty_cells,
+        'removedCells': removed_cells,
+        'timings': timings
     }
 
 
 if __name__ == '__main__':
+    # Needed for the parse pool in the PyInstaller-built executable
+    multiprocessing.freeze_support()
+    
     if len(sys.argv) < 3:
         print("Usage: merge.py <output.vmf> <input1.vmf> <input2.vmf> ...")
         print("       merge.py --json <config.json>")
@@ -231,7 +698,10 @@ if __name__ == '__main__':
         result = merge_vmfs_grid(
             config['inputs'],
             config['output'],
-            config.get('spacing', 384)
+            config.get('spacing', 384),
+            config.get('workers', 1),
+            config.get('hashes'),
+            config.get('previousLayout')
         )
         
         # Output result as JSON
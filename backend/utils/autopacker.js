@@ -1,4 +1,6 @@
+const { app } = require("electron")
 const fs = require("fs")
+const os = require("os")
 const path = require("path")
 const { execFile } = require("child_process")
 const { promisify } = require("util")
@@ -8,25 +10,55 @@ const {
     getPortal2SearchDirs,
     copyAssetToPackage,
     assetExistsInPortal2,
+    getAssetFileVariants,
 } = require("./vmfAssetExtractor")
 const { findPortal2Resources } = require("../data")
 const { isDev } = require("./isDev.js")
 
+/**
+ * Path to find_mdl_deps.exe
+ * Use isDev to pick the correct path - don't rely on fs.existsSync()
+ * because ASAR transparency makes files inside the archive appear to exist,
+ * but native executables can't run from inside ASAR
+ * @returns {string}
+ */
+function getFindMdlDepsExePath() {
+    return isDev
+        ? path.join(__dirname, "..", "libs", "areng_mdlDepend", "find_mdl_deps.exe")
+        : path.join(process.resourcesPath || "", "extraResources", "areng_mdlDepend", "find_mdl_deps.exe")
+}
+
+/**
+ * Extra search paths for find_mdl_deps.exe (full paths, semicolon-separated)
+ * @param {string} portal2Dir - Path to Portal 2 directory
+ * @param {string[]} searchDirs - Search directories (relative to portal2Dir)
+ * @returns {string}
+ */
+function getExtraSearchPaths(portal2Dir, searchDirs) {
+    return searchDirs
+        .filter(dir => !dir.includes("|") && !dir.includes("bee2")) // Skip special paths
+        .map(dir => path.join(portal2Dir, dir))
+        .filter(dir => fs.existsSync(dir))
+        .join(";")
+}
+
 /**
  * Get MDL material dependencies using find_mdl_deps.exe (srctools)
- * @param {string} mdlPath - Path to the MDL file (e.g., "models/props/cube.mdl")
+ * All models are resolved in a single process so the game filesystem
+ * (gameinfo search paths and VPKs) is only mounted once.
+ * @param {string[]} mdlPaths - Paths to the MDL files (e.g., "models/props/cube.mdl")
  * @param {string} portal2Dir - Path to Portal 2 directory
  * @param {string[]} searchDirs - Additional search directories (relative to portal2Dir)
- * @returns {Promise<string[]>} Array of material paths
+ * @returns {Promise<string[]>} Array of material paths for all models combined
  */
-async function getMdlMaterials(mdlPath, portal2Dir, searchDirs = []) {
+async function getMdlMaterials(mdlPaths, portal2Dir, searchDirs = []) {
+    if (mdlPaths.length === 0) {
+        return []
+    }
+
+    let listPath = null
     try {
-        // Use isDev to pick the correct path - don't rely on fs.existsSync()
-        // because ASAR transparency makes files inside the archive appear to exist,
-        // but native executables can't run from inside ASAR
-        const exePath = isDev
-            ? path.join(__dirname, "..", "libs", "areng_mdlDepend", "find_mdl_deps.exe")
-            : path.join(process.resourcesPath || "", "extraResources", "areng_mdlDepend", "find_mdl_deps.exe")
+        const exePath = getFindMdlDepsExePath()
 
         if (!fs.existsSync(exePath)) {
             console.log("find_mdl_deps.exe not found, skipping MDL material extraction")
@@ -37,23 +69,28 @@ async function getMdlMaterials(mdlPath, portal2Dir, searchDirs = []) {
         const gameDir = path.join(portal2Dir, "portal2")
 
         // Build extra search paths (full paths to directories)
-        const extraPaths = searchDirs
-            .filter(dir => !dir.includes("|") && !dir.includes("bee2")) // Skip special paths
-            .map(dir => path.join(portal2Dir, dir))
-            .filter(dir => fs.existsSync(dir))
-            .join(";")
+        const extraPaths = getExtraSearchPaths(portal2Dir, searchDirs)
+
+        // Pass the model list through a file to stay clear of command line length limits
+        listPath = path.join(
+            os.tmpdir(),
+            `beepee_mdl_list_${process.pid}_${Date.now()}.json`,
+        )
+        fs.writeFileSync(listPath, JSON.stringify(mdlPaths))
 
         // Build arguments
-        const args = [mdlPath, gameDir]
+        // Reuse resolved dependencies across runs (invalidated when the MDL changes)
+        const cachePath = path.join(app.getPath("userData"), "cache", "mdl_deps_cache.json")
+        const args = [gameDir, "--mdl-list", listPath, "--cache", cachePath]
         if (extraPaths) {
             args.push("--search-paths", extraPaths)
         }
 
-        console.log(`Running find_mdl_deps.exe with args:`, args)
+        console.log(`Running find_mdl_deps.exe for ${mdlPaths.length} models with args:`, args)
 
         // Run the executable
         const { stdout, stderr } = await execFileAsync(exePath, args, {
-            timeout: 30000,
+            timeout: 30000 + mdlPaths.length * 5000,
             maxBuffer: 10 * 1024 * 1024
         })
 
@@ -63,7 +100,16 @@ async function getMdlMaterials(mdlPath, portal2Dir, searchDirs = []) {
 
         // Parse JSON output
         const result = JSON.parse(stdout)
-        console.log(`find_mdl_deps.exe result:`, result)
+        if (result.cache) {
+            console.log(`find_mdl_deps.exe cache: ${result.cache.hits} hits, ${result.cache.misses} misses`)
+        }
+        for (const modelResult of result.results || []) {
+            if (modelResult.success) {
+                console.log(`Found ${modelResult.materials.length} materials for ${modelResult.mdlPath}`)
+            } else {
+                console.warn(`Failed to get MDL materials for ${modelResult.mdlPath}:`, modelResult.error)
+            }
+        }
         if (result.success && result.materials) {
             // Return material paths (they include materials/ prefix)
             // Strip extensions and deduplicate (srctools returns both .vmt and .vtf)
@@ -72,11 +118,229 @@ async function getMdlMaterials(mdlPath, portal2Dir, searchDirs = []) {
         }
         return []
     } catch (error) {
-        console.warn(`Failed to get MDL materials for ${mdlPath}:`, error.message)
+        console.warn(`Failed to get MDL materials for ${mdlPaths.length} models:`, error.message)
         return []
+    } finally {
+        if (listPath && fs.existsSync(listPath)) {
+            fs.unlinkSync(listPath)
+        }
+    }
+}
+
+/**
+ * Get the full asset closure of a VMF in one find_mdl_deps.exe --vmf call:
+ * brush and overlay materials, prop models, entity material/sound keyvalues
+ * and everything those models and materials pull in, resolved by srctools.
+ * Materials under materials/tools/, dev/ and skybox/ are left out unless
+ * includeToolMaterials is set: every Portal 2 install ships them, and the VMF
+ * text scan (extractAssetsFromVMF) skips them the same way.
+ * @param {string} vmfPath - Path to the VMF file
+ * @param {string} portal2Dir - Path to Portal 2 directory
+ * @param {string[]} searchDirs - Additional search directories (relative to portal2Dir)
+ * @param {Object} options - Options
+ * @param {boolean} options.includeToolMaterials - Keep tools/dev/skybox materials
+ * @returns {Promise<string[]|null>} Asset paths in the autopacker's form, or null if the call failed
+ */
+async function getVmfAssetClosure(vmfPath, portal2Dir, searchDirs = [], options = {}) {
+    const { includeToolMaterials = false } = options
+    const exePath = getFindMdlDepsExePath()
+    if (!fs.existsSync(exePath)) {
+        return null
+    }
+
+    try {
+        const args = [path.join(portal2Dir, "portal2"), "--vmf", vmfPath]
+        const extraPaths = getExtraSearchPaths(portal2Dir, searchDirs)
+        if (extraPaths) {
+            args.push("--search-paths", extraPaths)
+        }
+
+        console.log("Running find_mdl_deps.exe for the VMF asset closure:", args)
+        const { stdout, stderr } = await execFileAsync(exePath, args, {
+            timeout: 120000,
+            maxBuffer: 10 * 1024 * 1024
+        })
+        if (stderr) {
+            console.warn("find_mdl_deps.exe stderr:", stderr)
+        }
+
+        const result = JSON.parse(stdout)
+        if (!result.success) {
+            throw new Error(result.error)
+        }
+        for (const vmf of result.vmfs || []) {
+            if (!vmf.success) {
+                throw new Error(`${vmf.vmfPath}: ${vmf.error}`)
+            }
+        }
+
+        // Materials without extension and models by their .mdl, like the text scan
+        // produces; the other files a model or material needs are added when packing
+        const assets = new Set()
+        for (const material of result.materials) {
+            const name = material.replace(/\.(vmt|vtf)$/, "")
+            // Tool, dev and skybox textures are always available
+            if (includeToolMaterials || !/^materials\/(tools|dev|skybox)\//.test(name)) {
+                assets.add(name)
+            }
+        }
+        for (const model of result.models) {
+            if (model.endsWith(".mdl")) {
+                assets.add(model)
+            }
+        }
+        for (const file of result.other) {
+            assets.add(file)
+        }
+        return [...assets]
+    } catch (error) {
+        console.warn("VMF asset closure failed, scanning the VMF text instead:", error.message)
+        return null
     }
 }
 
+/**
+ * Find which assets Portal 2 loads from a loose search folder, using the
+ * content index from find_mdl_deps.exe (index-build / index-query).
+ * The index records the file the game filesystem would actually pick, so
+ * assets shipped in a VPK are skipped even when a loose copy also exists.
+ * The index is built on first use and refreshed by index-query whenever a
+ * VPK or search folder changes.
+ * @param {string[]} assets - Asset paths (e.g. "models/props/cube.mdl")
+ * @param {string} portal2Dir - Path to Portal 2 directory
+ * @param {string[]} searchDirs - Search directories (relative to portal2Dir)
+ * @returns {Promise<Set<string>|null>} Assets to pack, or null if the index is unavailable
+ */
+async function findLooseAssetsInPortal2(assets, portal2Dir, searchDirs) {
+    const exePath = getFindMdlDepsExePath()
+    if (assets.length === 0 || !fs.existsSync(exePath)) {
+        return null
+    }
+
+    let listPath = null
+    try {
+        const indexPath = path.join(app.getPath("userData"), "cache", "portal2_content_index.json")
+        if (!fs.existsSync(indexPath)) {
+            const args = ["index-build", path.join(portal2Dir, "portal2"), "--index", indexPath]
+            const extraPaths = getExtraSearchPaths(portal2Dir, searchDirs)
+            if (extraPaths) {
+                args.push("--search-paths", extraPaths)
+            }
+            console.log("Building Portal 2 content index:", args)
+            await execFileAsync(exePath, args, { timeout: 300000, maxBuffer: 10 * 1024 * 1024 })
+        }
+
+        // Every file that makes up each asset
+        const filesByAsset = new Map()
+        for (const asset of assets) {
+            const { baseAssetPath, extensions } = getAssetFileVariants(asset)
+            filesByAsset.set(asset, extensions.map(ext => baseAssetPath + ext))
+        }
+
+        listPath = path.join(
+            os.tmpdir(),
+            `beepee_asset_list_${process.pid}_${Date.now()}.json`,
+        )
+        fs.writeFileSync(listPath, JSON.stringify([...filesByAsset.values()].flat()))
+
+        const { stdout } = await execFileAsync(
+            exePath,
+            ["index-query", indexPath, "--paths-file", listPath],
+            { timeout: 300000, maxBuffer: 50 * 1024 * 1024 },
+        )
+        const result = JSON.parse(stdout)
+        if (!result.success) {
+            throw new Error(result.error)
+        }
+        if (result.rebuilt) {
+            console.log("Portal 2 content index was out of date and has been rebuilt")
+        }
+
+        // Pack an asset when the game picks any of its files up from a loose
+        // search folder (not a VPK, not BEE2's own folder)
+        const looseAssets = new Set()
+        for (const [asset, files] of filesByAsset) {
+            const loose = files.some(file => {
+                const entry = result.results[file]
+                return entry && entry.exists && entry.type === "folder" &&
+                    !path.relative(portal2Dir, entry.archive).includes("bee2")
+            })
+            if (loose) {
+                looseAssets.add(asset)
+            }
+        }
+        return looseAssets
+    } catch (error) {
+        console.warn("Portal 2 content index unavailable, checking files directly:", error.message)
+        return null
+    } finally {
+        if (listPath && fs.existsSync(listPath)) {
+            fs.unlinkSync(listPath)
+        }
+    }
+}
+
+/**
+ * Collect an instance's assets by scanning the VMF text, then resolve its
+ * models' materials with find_mdl_deps.exe. Used when the one-pass VMF
+ * closure (getVmfAssetClosure) is unavailable.
+ * @param {string} vmfPath - Path to the instance VMF file
+ * @param {string} portal2Dir - Path to Portal 2 directory
+ * @param {string[]} searchDirs - Additional search directories (relative to portal2Dir)
+ * @returns {Promise<string[]>} Asset paths with proper prefixes
+ */
+async function extractAssetsWithMdlMaterials(vmfPath, portal2Dir, searchDirs) {
+    // Extract assets from VMF
+    const assets = extractAssetsFromVMF(vmfPath)
+    console.log(`Extracted assets:`, assets)
+
+    // Combine all assets into a single list with proper prefixes
+    let allAssets = []
+
+    // Add models (already have models/ prefix)
+    if (assets.MODEL) {
+        allAssets = allAssets.concat(assets.MODEL)
+    }
+
+    // Add materials with materials/ prefix if missing
+    if (assets.MATERIAL) {
+        const materials = assets.MATERIAL.map(mat =>
+            mat.startsWith("materials/") ? mat : `materials/${mat}`
+        )
+        allAssets = allAssets.concat(materials)
+    }
+
+    // Add sounds with sound/ prefix if missing
+    if (assets.SOUND) {
+        const sounds = assets.SOUND.map(snd =>
+            snd.startsWith("sound/") ? snd : `sound/${snd}`
+        )
+        allAssets = allAssets.concat(sounds)
+    }
+
+    // Add scripts with scripts/ prefix if missing
+    if (assets.SCRIPT) {
+        const scripts = assets.SCRIPT.map(scr =>
+            scr.startsWith("scripts/") ? scr : `scripts/${scr}`
+        )
+        allAssets = allAssets.concat(scripts)
+    }
+
+    // Find dependent materials for models using srctools
+    const modelAssets = allAssets.filter(asset => asset.startsWith("models/"))
+    console.log(`Finding materials for ${modelAssets.length} models`)
+    const dependentAssets = await getMdlMaterials(modelAssets, portal2Dir, searchDirs)
+    console.log(`Found ${dependentAssets.length} dependent materials:`, dependentAssets)
+
+    // Combine main assets with dependent assets
+    allAssets = [...allAssets, ...dependentAssets]
+
+    // Remove duplicates
+    allAssets = [...new Set(allAssets)]
+
+    return allAssets
+}
+
 /**
  * Perform autopacking for an instance VMF file
  * @param {string} instancePath - Path to the instance VMF file
@@ -88,10 +352,6 @@ async function autopackInstance(instancePath, packageDir, itemName) {
     try {
         console.log(`Starting autopacking for instance: ${instancePath}`)
 
-        // Extract assets from VMF
-        const assets = extractAssetsFromVMF(instancePath)
-        console.log(`Extracted assets:`, assets)
-
         // Get Portal 2 directory
         const portal2Resources = await findPortal2Resources()
         if (!portal2Resources || !portal2Resources.root) {
@@ -112,61 +372,24 @@ async function autopackInstance(instancePath, packageDir, itemName) {
         const searchDirs = getPortal2SearchDirs(portal2Dir)
         console.log(`Portal 2 search directories:`, searchDirs)
 
-        // Combine all assets into a single list with proper prefixes
-        let allAssets = []
-
-        // Add models (already have models/ prefix)
-        if (assets.MODEL) {
-            allAssets = allAssets.concat(assets.MODEL)
-        }
-
-        // Add materials with materials/ prefix if missing
-        if (assets.MATERIAL) {
-            const materials = assets.MATERIAL.map(mat =>
-                mat.startsWith("materials/") ? mat : `materials/${mat}`
-            )
-            allAssets = allAssets.concat(materials)
-        }
-
-        // Add sounds with sound/ prefix if missing
-        if (assets.SOUND) {
-            const sounds = assets.SOUND.map(snd =>
-                snd.startsWith("sound/") ? snd : `sound/${snd}`
-            )
-            allAssets = allAssets.concat(sounds)
-        }
-
-        // Add scripts with scripts/ prefix if missing
-        if (assets.SCRIPT) {
-            const scripts = assets.SCRIPT.map(scr =>
-                scr.startsWith("scripts/") ? scr : `scripts/${scr}`
-            )
-            allAssets = allAssets.concat(scripts)
+        // One srctools pass resolves the VMF and everything it depends on
+        let allAssets = await getVmfAssetClosure(instancePath, portal2Dir, searchDirs)
+        if (allAssets) {
+            console.log(`VMF asset closure: ${allAssets.length} assets`)
+        } else {
+            allAssets = await extractAssetsWithMdlMaterials(instancePath, portal2Dir, searchDirs)
         }
 
-        // Find dependent materials for models using srctools
-        const dependentAssets = []
-        for (const asset of allAssets) {
-            if (asset.startsWith("models/")) {
-                console.log(`Finding materials for model: ${asset}`)
-                const dependentMaterials = await getMdlMaterials(asset, portal2Dir, searchDirs)
-                console.log(`Found ${dependentMaterials.length} materials for ${asset}:`, dependentMaterials)
-                dependentAssets.push(...dependentMaterials)
-            }
-        }
-
-        // Combine main assets with dependent assets
-        allAssets = [...allAssets, ...dependentAssets]
-
-        // Remove duplicates
-        allAssets = [...new Set(allAssets)]
-
         // Filter assets based on Portal 2 search paths
         // If asset exists in Portal 2 search paths, we should pack it
         // If it doesn't exist, it's either a base asset (in VPK) or missing
+        const looseAssets = await findLooseAssetsInPortal2(allAssets, portal2Dir, searchDirs)
         const assetsToPack = []
         for (const asset of allAssets) {
-            if (assetExistsInPortal2(asset, portal2Dir, searchDirs)) {
+            const needsPacking = looseAssets
+                ? looseAssets.has(asset)
+                : assetExistsInPortal2(asset, portal2Dir, searchDirs)
+            if (needsPacking) {
                 assetsToPack.push(asset)
                 console.log(`Asset needs packing (found in Portal 2 search paths): ${asset}`)
             } else {
@@ -1,5 +1,6 @@
 // MDL conversion using STUDIOMDL from Source SDK
 const fs = require("fs")
+const os = require("os")
 const path = require("path")
 const { exec, spawn } = require("child_process")
 const { promisify } = require("util")
@@ -8,6 +9,7 @@ const sharp = require("sharp")
 const { findPortal2Resources } = require("../data")
 const { convertImageToVTF } = require("./vtfConverter")
 const { isDev } = require("./isDev.js")
+const { getToolFlags } = require("./toolFlags.js")
 
 const execAsync = promisify(exec)
 
@@ -93,8 +95,11 @@ $sequence idle "${objFileName}" fps 30
  * Apply cartoonification to an image using the cartoon.exe tool
  * @param {string} inputPath - Path to the input image
  * @param {string} outputPath - Path for the cartoonified output
+ * @param {Object} options - Options
+ * @param {boolean} options.pow2 - Square the output to a power of two (64-512),
+ *   ready for convertImageToVTF without another resize
  */
-async function applyCartoonification(inputPath, outputPath) {
+async function applyCartoonification(inputPath, outputPath, options = {}) {
     const cartoonExePath = isDev
         ? path.join(__dirname, "..", "libs", "areng_cartoonify", "cartoon.exe")
         : path.join(
@@ -110,18 +115,27 @@ async function applyCartoonification(inputPath, outputPath) {
         return
     }
 
-    // Copy original file to output path FIRST
-    // Cartoon.exe modifies files IN-PLACE!
-    fs.copyFileSync(inputPath, outputPath)
-
-    return new Promise((resolve, reject) => {
-        // Get file size and modified time BEFORE cartoonification for validation
-        const statsBefore = fs.statSync(outputPath)
-        const sizeBefore = statsBefore.size
-        const mtimeBefore = statsBefore.mtime.getTime()
+    // Builds without --output treat every argument as an image to overwrite,
+    // so only name the input and output separately when --help lists it
+    const flags = await getToolFlags(cartoonExePath)
+    let args
+    if (flags.has("--output")) {
+        args = [inputPath, "--output", outputPath]
+        if (options.pow2 && flags.has("--pow2")) args.push("--pow2")
+        // Stock textures repeat across items, so reuse results for identical pixels
+        if (flags.has("--cache-dir")) {
+            const cacheDir = path.join(app.getPath("userData"), "cache", "cartoon")
+            args.push("--cache-dir", cacheDir)
+        }
+    } else {
+        // Copy original file to output path FIRST
+        // This cartoon.exe modifies files IN-PLACE!
+        fs.copyFileSync(inputPath, outputPath)
+        args = [outputPath]
+    }
 
-        // Run cartoon.exe on the OUTPUT file (not the original)
-        const child = spawn(cartoonExePath, [outputPath], {
+    return new Promise((resolve) => {
+        const child = spawn(cartoonExePath, args, {
             cwd: path.dirname(cartoonExePath),
             stdio: "pipe",
             windowsHide: true,
@@ -139,27 +153,19 @@ async function applyCartoonification(inputPath, outputPath) {
         })
 
         child.on("close", (code) => {
-            if (code === 0) {
-                // Verify the file was actually modified
-                const statsAfter = fs.statSync(outputPath)
-                const sizeAfter = statsAfter.size
-                const mtimeAfter = statsAfter.mtime.getTime()
-
-                // Check if file was actually modified (size or mtime changed)
-                if (sizeAfter === sizeBefore && mtimeAfter === mtimeBefore) {
-                    console.warn(`⚠️ Cartoon: ${path.basename(outputPath)} not modified, using original`)
-                }
+            // cartoon.exe reports per-image failures as ERROR lines, not exit codes
+            if (code === 0 && stdout.includes("SUCCESS:") && fs.existsSync(outputPath)) {
                 resolve()
             } else {
                 console.warn(`⚠️ Cartoon failed (code ${code}) for ${path.basename(outputPath)}, using original`)
-                // File was already copied, just use the original
+                fs.copyFileSync(inputPath, outputPath)
                 resolve()
             }
         })
 
         child.on("error", (error) => {
             console.warn(`⚠️ Cartoon spawn error: ${error.message}, using original`)
-            // File was already copied, just use the original
+            fs.copyFileSync(inputPath, outputPath)
             resolve()
         })
     })
@@ -688,6 +694,11 @@ async function copyMDLToPackage(
  * @param {string} packagePath - Root path of the package
  * @param {string} itemName - Name of the item
  * @param {Object} options - Conversion options
+ * @param {number} [options.collisionWeld] - 3DS weld tolerance (see convertObjTo3DS simplify.weld)
+ * @param {number} [options.collisionDecimate] - 3DS target triangle count
+ * @param {number} [options.collisionMaxError] - 3DS maximum surface deviation
+ * @param {string} [options.collisionShape] - 3DS shape: "mesh", "hull" or "box"
+ * @param {number} [options.collisionPieces] - Convex pieces for "hull"/"box"
  * @returns {Promise<Object>} - Object with MDL paths and metadata
  */
 async function convertAndInstallMDL(
@@ -778,6 +789,13 @@ async function convertAndInstallMDL(
             collisionRoll,
             collisionPitch,
             collisionYaw,
+            {
+                weld: options.collisionWeld,
+                decimate: options.collisionDecimate,
+                maxError: options.collisionMaxError,
+                collision: options.collisionShape,
+                pieces: options.collisionPieces,
+            },
         )
 
         // Copy 3DS to package (STAGING MODE or final location)
@@ -1072,6 +1090,29 @@ function mapVariableValuesToInstances(blocksOrVbsp, targetVariable, item = null)
     return valueInstanceMap
 }
 
+// convertObjTo3DS calls that arrive while a converter process is running are
+// queued and then share one process (its --manifest mode); a call that finds
+// the converter idle starts straight away
+let pending3DSBatch = []
+let running3DSBatch = false
+
+function getObjTo3DSConverterPath() {
+    return isDev
+        ? path.join(
+              __dirname,
+              "..",
+              "libs",
+              "areng_obj23ds",
+              "convert_obj_to_3ds.exe",
+          )
+        : path.join(
+              process.resourcesPath,
+              "extraResources",
+              "areng_obj23ds",
+              "convert_obj_to_3ds.exe",
+          )
+}
+
 /**
  * Convert OBJ file to 3DS format using Trimesh
  * @param {string} objPath - Path to the source OBJ file
@@ -1080,6 +1121,12 @@ function mapVariableValuesToInstances(blocksOrVbsp, targetVariable, item = null)
  * @param {number} roll - Roll rotation in degrees around X-axis (default: 90)
  * @param {number} pitch - Pitch rotation in degrees around Y-axis (default: 0)
  * @param {number} yaw - Yaw rotation in degrees around Z-axis (default: 0)
+ * @param {Object} simplify - Optional collision simplification
+ * @param {number} [simplify.weld] - Vertex weld tolerance (3DS units, 0 = exact duplicates)
+ * @param {number} [simplify.decimate] - Target triangle count
+ * @param {number} [simplify.maxError] - Maximum surface deviation (3DS units)
+ * @param {string} [simplify.collision] - "mesh", "hull" or "box"
+ * @param {number} [simplify.pieces] - Convex pieces for "hull"/"box"
  * @returns {Promise<string>} - Path to the created 3DS file
  */
 async function convertObjTo3DS(
@@ -1089,26 +1136,13 @@ async function convertObjTo3DS(
     roll = 90,
     pitch = 0,
     yaw = 0,
+    simplify = {},
 ) {
     if (!objPath || !fs.existsSync(objPath)) {
         throw new Error(`OBJ file not found: ${objPath}`)
     }
 
-    const converterExe = isDev
-        ? path.join(
-              __dirname,
-              "..",
-              "libs",
-              "areng_obj23ds",
-              "convert_obj_to_3ds.exe",
-          )
-        : path.join(
-              process.resourcesPath,
-              "extraResources",
-              "areng_obj23ds",
-              "convert_obj_to_3ds.exe",
-          )
-
+    const converterExe = getObjTo3DSConverterPath()
     if (!fs.existsSync(converterExe)) {
         throw new Error(`Trimesh converter not found at: ${converterExe}`)
     }
@@ -1117,27 +1151,166 @@ async function convertObjTo3DS(
     const outputDir = path.dirname(outputPath)
     await mkdirWithRetry(outputDir)
 
-    // Run the converter executable with scale and rotation parameters
-    const cmd = `"${converterExe}" "${objPath}" "${outputPath}" ${scale} ${roll} ${pitch} ${yaw}`
+    const job = { input: objPath, output: outputPath, scale, roll, pitch, yaw }
+    for (const key of ["weld", "decimate", "maxError", "collision", "pieces"]) {
+        if (simplify[key] != null) job[key] = simplify[key]
+    }
 
+    return new Promise((resolve, reject) => {
+        pending3DSBatch.push({ job, resolve, reject })
+        if (!running3DSBatch) run3DSBatches()
+    })
+}
+
+/**
+ * Drain the convertObjTo3DS queue, one converter process per batch
+ */
+async function run3DSBatches() {
+    running3DSBatch = true
     try {
-        const { stdout, stderr } = await execAsync(cmd, {
+        while (pending3DSBatch.length > 0) {
+            const batch = pending3DSBatch
+            pending3DSBatch = []
+            await run3DSBatch(batch)
+        }
+    } finally {
+        running3DSBatch = false
+    }
+}
+
+// Collision simplification flags in the order get3DSCommand passes them
+const SIMPLIFY_3DS_FLAGS = {
+    weld: "--weld",
+    decimate: "--decimate",
+    maxError: "--max-error",
+    collision: "--collision",
+    pieces: "--pieces",
+}
+const warned3DSFlags = new Set()
+
+/**
+ * Build the single-file converter command for one job
+ * Simplification options the installed converter doesn't list in --help are
+ * left off, so older builds still get their positional command line
+ * @param {Object} job - Job from convertObjTo3DS
+ * @param {Set<string>} flags - Flags the converter supports (getToolFlags)
+ */
+function get3DSCommand(job, flags) {
+    let cmd = `"${getObjTo3DSConverterPath()}" "${job.input}" "${job.output}" ${job.scale} ${job.roll} ${job.pitch} ${job.yaw}`
+    const unsupported = []
+    for (const [key, flag] of Object.entries(SIMPLIFY_3DS_FLAGS)) {
+        if (job[key] == null) continue
+        if (flags.has(flag)) {
+            cmd += ` ${flag} ${job[key]}`
+        } else {
+            unsupported.push(flag)
+        }
+    }
+    if (unsupported.some((flag) => !warned3DSFlags.has(flag))) {
+        unsupported.forEach((flag) => warned3DSFlags.add(flag))
+        console.warn(
+            `3DS converter build doesn't support ${unsupported.join(", ")}, converting without them`,
+        )
+    }
+    return cmd
+}
+
+/**
+ * Convert one job with the single-file command. Used for converter builds
+ * without --manifest, and when a manifest run produced no results.
+ */
+async function run3DSSingle({ job, resolve, reject }, flags) {
+    try {
+        const { stderr } = await execAsync(get3DSCommand(job, flags), {
             maxBuffer: 1024 * 1024 * 10, // 10MB buffer
             timeout: 60000, // 1 minute timeout
         })
-
         if (stderr) console.warn("3DS converter stderr:", stderr)
-
-        // Verify the file was created
-        if (!fs.existsSync(outputPath)) {
-            throw new Error(`3DS file was not created at: ${outputPath}`)
+        if (!fs.existsSync(job.output)) {
+            throw new Error(`3DS file was not created at: ${job.output}`)
         }
-
-        return outputPath
+        resolve(job.output)
     } catch (error) {
         console.error("3DS conversion failed:", error)
-        throw new Error(`3DS conversion failed: ${error.message}`)
+        reject(new Error(`3DS conversion failed: ${error.message}`))
+    }
+}
+
+/**
+ * Run a batch of convertObjTo3DS jobs through one converter process
+ */
+async function run3DSBatch(batch) {
+    const flags = await getToolFlags(getObjTo3DSConverterPath())
+    const manifestFlags = ["--manifest", "--jobs", ...Object.values(SIMPLIFY_3DS_FLAGS)]
+    if (!manifestFlags.every((flag) => flags.has(flag))) {
+        // Converter build from before batch mode
+        for (const entry of batch) await run3DSSingle(entry, flags)
+        return
     }
+
+    const manifestPath = path.join(
+        os.tmpdir(),
+        `beepee_3ds_jobs_${process.pid}_${Date.now()}.json`,
+    )
+    fs.writeFileSync(
+        manifestPath,
+        JSON.stringify(batch.map((entry) => entry.job)),
+    )
+
+    const jobs = Math.min(batch.length, os.cpus().length)
+    const cmd = `"${getObjTo3DSConverterPath()}" --manifest "${manifestPath}" --jobs ${jobs}`
+
+    let stdout = ""
+    try {
+        const result = await execAsync(cmd, {
+            maxBuffer: 1024 * 1024 * 10, // 10MB buffer
+            timeout: 60000 * batch.length, // 1 minute per model
+        })
+        stdout = result.stdout
+        if (result.stderr) console.warn("3DS converter stderr:", result.stderr)
+    } catch (error) {
+        // Exits 1 when any job failed; the per-job lines still say which
+        stdout = error.stdout || ""
+    } finally {
+        fs.rmSync(manifestPath, { force: true })
+    }
+
+    const results = new Map()
+    for (const line of stdout.split(/\r?\n/)) {
+        if (!line.trim()) continue
+        try {
+            const record = JSON.parse(line)
+            if (record.summary) {
+                console.log(
+                    `3DS batch: ${record.succeeded}/${record.total} converted in ${record.elapsedMs}ms`,
+                )
+            } else {
+                results.set(record.index, record)
+            }
+        } catch {
+            // Not a result line
+        }
+    }
+
+    if (results.size === 0) {
+        // No per-job lines at all: the batch run itself failed
+        console.warn(
+            "3DS batch run produced no results, converting one file at a time",
+        )
+        for (const entry of batch) await run3DSSingle(entry, flags)
+        return
+    }
+
+    batch.forEach(({ job, resolve, reject }, index) => {
+        const record = results.get(index)
+        if (record?.success && fs.existsSync(job.output)) {
+            resolve(job.output)
+            return
+        }
+        const reason = record?.error || `3DS file was not created at: ${job.output}`
+        console.error("3DS conversion failed:", reason)
+        reject(new Error(`3DS conversion failed: ${reason}`))
+    })
 }
 
 /**
@@ -0,0 +1,62 @@
+// Command-line flags of the bundled areng_ tools
+// The tools ship as frozen executables that are rebuilt separately from this
+// code, so callers check which flags the installed build accepts before
+// passing new ones and keep the original command line for older builds
+const fs = require("fs")
+const { execFile } = require("child_process")
+
+const flagCache = new Map()
+
+/**
+ * Get the long options a tool lists in its --help output
+ * Builds without argparse print an error or their own usage line instead,
+ * which gives an empty set
+ * @param {string} exePath - Path to the tool executable
+ * @returns {Promise<Set<string>>} - e.g. Set { "--manifest", "--jobs" }
+ */
+function getToolFlags(exePath) {
+    let stat
+    try {
+        stat = fs.statSync(exePath)
+    } catch {
+        return Promise.resolve(new Set())
+    }
+
+    // Probe once per build, not once per call
+    const key = `${exePath}|${stat.size}|${stat.mtimeMs}`
+    if (!flagCache.has(key)) {
+        const probe = new Promise((resolve) => {
+            execFile(
+                exePath,
+                ["--help"],
+                { timeout: 30000, windowsHide: true },
+                (error, stdout) => {
+                    const text = (stdout || "").trim()
+                    if (error || !text.startsWith("usage:")) {
+                        resolve(new Set())
+                        return
+                    }
+                    resolve(new Set(text.match(/--[a-z][a-z0-9-]*/g)))
+                },
+            )
+        })
+        flagCache.set(key, probe)
+    }
+    return flagCache.get(key)
+}
+
+/**
+ * Check that a tool accepts every one of the given flags
+ * @param {string} exePath - Path to the tool executable
+ * @param {...string} flags - Long options, e.g. "--manifest"
+ * @returns {Promise<boolean>}
+ */
+async function toolSupports(exePath, ...flags) {
+    const supported = await getToolFlags(exePath)
+    return flags.every((flag) => supported.has(flag))
+}
+
+module.exports = {
+    getToolFlags,
+    toolSupports,
+}
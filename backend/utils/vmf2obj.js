@@ -1,9 +1,11 @@
 const fs = require("fs")
 const path = require("path")
+const os = require("os")
 const https = require("https")
 const { app } = require("electron")
 const { findPortal2Resources } = require("../data")
 const { convertTexturesForModel } = require("./tgaConverter")
+const { getToolFlags } = require("./toolFlags.js")
 
 // JRE download configuration
 const JRE_VERSION = "17"
@@ -351,16 +353,35 @@ async function applyCartoonishToTextures(outputDir, { debug } = {}) {
 
     const { spawn } = require("child_process")
 
+    // Older cartoon.exe builds take every argument as an image path, so only
+    // pass the options this build lists in --help
+    const flags = await getToolFlags(exePath)
+    const options = []
+    // Reuse results for textures already cartoonified with identical pixels
+    if (flags.has("--cache-dir")) {
+        options.push(
+            "--cache-dir",
+            path.join(app.getPath("userData"), "cache", "cartoon"),
+        )
+    }
+    // Square textures to the power-of-two size the VTF step converts at, so
+    // convertImageToVTF can use them as they are
+    if (flags.has("--pow2")) options.push("--pow2")
+
     // Run in chunks to avoid excessively long command lines
     const chunkSize = 50
     let processed = 0
 
     for (let i = 0; i < pngFiles.length; i += chunkSize) {
         const chunk = pngFiles.slice(i, i + chunkSize)
-        const cmd = [
-            // cartoon.exe expects image paths as arguments
-            ...chunk,
-        ]
+        const cmd = [...options]
+        if (flags.has("--jobs")) {
+            // Spread the chunk across worker processes, one per core
+            const jobs = Math.max(1, Math.min(chunk.length, os.cpus().length))
+            cmd.push("--jobs", String(jobs))
+        }
+        // cartoon.exe expects image paths as arguments
+        cmd.push(...chunk)
 
         if (debug) {
             console.log("Running cartoon.exe on", chunk.length, "textures")
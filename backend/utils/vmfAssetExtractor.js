@@ -146,6 +146,44 @@ function findDependentMaterials(modelPath, portal2Dir) {
     return dependentMaterials
 }
 
+// Sound formats the Source engine plays
+const SOUND_EXTENSIONS = [".wav", ".mp3", ".ogg"]
+
+/**
+ * Work out which files make up an asset (e.g. a model's .mdl, .phy, .vvd, .dx90.vtx)
+ * @param {string} assetPath - Asset path (e.g. "models/props/cube.mdl")
+ * @returns {{baseAssetPath: string, extensions: string[]}} Path without extension, and the extensions to try
+ */
+function getAssetFileVariants(assetPath) {
+    // Determine file extensions based on asset type
+    let extensions = []
+    let baseAssetPath = assetPath
+
+    if (assetPath.startsWith("materials/")) {
+        extensions = [".vtf", ".vmt"]
+    } else if (assetPath.startsWith("models/")) {
+        // Strip .mdl extension from the path before adding extensions
+        baseAssetPath = assetPath.replace(".mdl", "")
+        extensions = [".mdl", ".phy", ".vvd", ".dx90.vtx"]
+    } else if (assetPath.startsWith("scripts/")) {
+        extensions = [".nut"]
+    } else if (assetPath.startsWith("messages/")) {
+        const ext = path.extname(assetPath)
+        extensions = [ext]
+    } else if (assetPath.startsWith("sound/")) {
+        // Sound keyvalues usually carry their own extension
+        const ext = path.extname(assetPath)
+        if (SOUND_EXTENSIONS.includes(ext.toLowerCase())) {
+            baseAssetPath = assetPath.slice(0, -ext.length)
+            extensions = [ext]
+        } else {
+            extensions = SOUND_EXTENSIONS
+        }
+    }
+
+    return { baseAssetPath, extensions }
+}
+
 /**
  * Check if an asset exists in Portal 2 search paths (from gameinfo.txt)
  * @param {string} assetPath - Asset path to check
@@ -155,24 +193,7 @@ function findDependentMaterials(modelPath, portal2Dir) {
  */
 function assetExistsInPortal2(assetPath, portal2Dir, searchDirs) {
     try {
-        // Determine file extensions based on asset type
-        let extensions = []
-        let baseAssetPath = assetPath
-        
-        if (assetPath.startsWith("materials/")) {
-            extensions = [".vtf", ".vmt"]
-        } else if (assetPath.startsWith("models/")) {
-            // Strip .mdl extension from the path before adding extensions
-            baseAssetPath = assetPath.replace(".mdl", "")
-            extensions = [".mdl", ".phy", ".vvd", ".dx90.vtx"]
-        } else if (assetPath.startsWith("scripts/")) {
-            extensions = [".nut"]
-        } else if (assetPath.startsWith("messages/")) {
-            const ext = path.extname(assetPath)
-            extensions = [ext]
-        } else if (assetPath.startsWith("sounds/")) {
-            extensions = [".wav", ".mp3"]
-        }
+        const { baseAssetPath, extensions } = getAssetFileVariants(assetPath)
         
         // Check if asset exists in Portal 2 search paths
         // If it exists here, Portal 2 can find it, so we should pack it
@@ -276,23 +297,7 @@ function copyAssetToPackage(assetPath, portal2Dir, packageDir, searchDirs) {
 
     try {
         // Determine file extensions based on asset type
-        let extensions = []
-        let baseAssetPath = assetPath
-        
-        if (assetPath.startsWith("materials/")) {
-            extensions = [".vtf", ".vmt"]
-        } else if (assetPath.startsWith("models/")) {
-            // Strip .mdl extension from the path before adding extensions
-            baseAssetPath = assetPath.replace(".mdl", "")
-            extensions = [".mdl", ".phy", ".vvd", ".dx90.vtx"]
-        } else if (assetPath.startsWith("scripts/")) {
-            extensions = [".nut"]
-        } else if (assetPath.startsWith("messages/")) {
-            const ext = path.extname(assetPath)
-            extensions = [ext]
-        } else if (assetPath.startsWith("sounds/")) {
-            extensions = [".wav", ".mp3"]
-        }
+        const { baseAssetPath, extensions } = getAssetFileVariants(assetPath)
 
         // Search for the asset in Portal 2 directories
         for (const searchDir of searchDirs) {
@@ -347,4 +352,5 @@ module.exports = {
     getPortal2SearchDirs,
     copyAssetToPackage,
     assetExistsInPortal2,
+    getAssetFileVariants,
 }
@@ -1,7 +1,10 @@
 // VMF Atlas - Merge multiple VMF instances into a single grid layout
 const fs = require("fs")
+const os = require("os")
 const path = require("path")
+const crypto = require("crypto")
 const { isDev } = require("./isDev.js")
+const { toolSupports } = require("./toolFlags.js")
 
 /**
  * Get the path to the VMF merge executable
@@ -31,6 +34,53 @@ function getMergeExePath() {
     )
 }
 
+/**
+ * Get the path to the OBJ to 3DS converter, which also splits atlas OBJs
+ * @returns {string} Path to convert_obj_to_3ds.exe
+ */
+function getObjTo3DSExePath() {
+    return isDev
+        ? path.join(
+              __dirname,
+              "..",
+              "libs",
+              "areng_obj23ds",
+              "convert_obj_to_3ds.exe",
+          )
+        : path.join(
+              process.resourcesPath,
+              "extraResources",
+              "areng_obj23ds",
+              "convert_obj_to_3ds.exe",
+          )
+}
+
+// Atlases smaller than this are parsed serially; a parse process takes longer
+// to start than a small VMF takes to parse
+const MIN_PARALLEL_MERGE_INPUTS = 8
+// A parsed VMF takes about ten times its file size in memory, on top of the
+// interpreter and srctools in each worker process
+const MERGE_PARSE_MEMORY_FACTOR = 12
+const MERGE_WORKER_OVERHEAD = 100 * 1024 * 1024
+
+/**
+ * Pick how many processes the merge uses to parse its inputs
+ * Each worker holds one parsed input at a time, so the count is limited by
+ * free memory for the largest input as well as by CPU cores
+ * @param {Array<{path: string}>} files - VMF files being merged
+ * @returns {number} - Worker count, 1 for small atlases
+ */
+function getMergeWorkerCount(files) {
+    if (files.length < MIN_PARALLEL_MERGE_INPUTS) return 1
+
+    const largest = Math.max(
+        ...files.map((file) => fs.statSync(file.path).size),
+    )
+    const perWorker = largest * MERGE_PARSE_MEMORY_FACTOR + MERGE_WORKER_OVERHEAD
+    const byMemory = Math.floor(os.freemem() / perWorker)
+    return Math.max(1, Math.min(files.length, os.cpus().length - 1, byMemory))
+}
+
 /**
  * Calculate grid dimensions for N items (tries to make it roughly square)
  * @param {number} count - Number of items to arrange
@@ -166,12 +216,16 @@ function offsetVMFText(vmfContent, offsetX, offsetY, offsetZ) {
 }
 
 /**
- * Merge multiple VMF files into a single VMF with grid layout
+ * Merge multiple VMF files into a single VMF with a packed atlas layout
  * Uses Python srctools for proper texture locking
+ * Each VMF gets a cell sized to its own X/Y footprint plus spacing; bounds
+ * reports the atlas size and its areaReduction against a uniform grid
  * @param {Array<{path: string, name: string}>} vmfFiles - Array of VMF file info
  * @param {string} outputPath - Where to save the merged VMF
  * @param {Object} options - Options
- * @returns {Promise<{success: boolean, gridLayout: Array, bounds: Object}>}
+ * @returns {Promise<{success: boolean, gridLayout: Array, bounds: Object, dirtyCells: Array<number>}>}
+ *   When the previous _layout.json is still next to outputPath only changed VMFs
+ *   are re-merged; dirtyCells lists the layout indices whose contents changed
  */
 async function mergeVMFsIntoGrid(vmfFiles, outputPath, options = {}) {
     const spacing = options.spacing || 384 // Default spacing between models (very large gap for clean splitting)
@@ -195,6 +249,8 @@ async function mergeVMFsIntoGrid(vmfFiles, outputPath, options = {}) {
             continue
         }
 
+        // Lets the merge reuse cells whose VMF is unchanged since the last run
+        file.hash = crypto.createHash("sha1").update(content).digest("hex")
         validFiles.push(file)
     }
 
@@ -208,10 +264,16 @@ async function mergeVMFsIntoGrid(vmfFiles, outputPath, options = {}) {
 
     // Create JSON config for merge script
     const configPath = outputPath.replace(".vmf", "_merge_config.json")
+    const layoutPath = outputPath.replace(".vmf", "_layout.json")
     const config = {
         inputs: validFiles.map((f) => f.path),
+        hashes: validFiles.map((f) => f.hash),
         output: outputPath,
         spacing: spacing,
+        workers: getMergeWorkerCount(validFiles),
+        // Given even before the first merge, so merge.py keeps the per-cell
+        // fragments the next incremental merge builds on
+        previousLayout: layoutPath,
     }
     fs.writeFileSync(configPath, JSON.stringify(config, null, 2))
 
@@ -262,7 +324,6 @@ async function mergeVMFsIntoGrid(vmfFiles, outputPath, options = {}) {
                 const result = JSON.parse(lastLine)
 
                 // Load the layout JSON file created by Python
-                const layoutPath = outputPath.replace(".vmf", "_layout.json")
                 if (!fs.existsSync(layoutPath)) {
                     throw new Error("Layout file not created by merge script")
                 }
@@ -275,10 +336,11 @@ async function mergeVMFsIntoGrid(vmfFiles, outputPath, options = {}) {
                 const gridLayout = layoutData.layout.map((item) => ({
                     name: item.name,
                     index: item.index,
-                    col: item.col,
-                    row: item.row,
+                    slot: item.slot,
                     cellX: item.cellX,
                     cellY: item.cellY,
+                    cellWidth: item.cellWidth,
+                    cellHeight: item.cellHeight,
                     offsetX: item.offsetX,
                     offsetY: item.offsetY,
                     offsetZ: item.offsetZ,
@@ -293,19 +355,28 @@ async function mergeVMFsIntoGrid(vmfFiles, outputPath, options = {}) {
                 }))
 
                 console.log(`✅ Merged VMF saved to: ${outputPath}`)
+                if (result.incremental) {
+                    console.log(
+                        `   Incremental: ${result.dirtyCells.length} of ${gridLayout.length} cells changed`,
+                    )
+                }
                 console.log(
-                    `   Grid: ${layoutData.cols}×${layoutData.rows}, Cell size: ${Math.round(layoutData.cellSize)} (square)`,
+                    `   Packed: ${Math.round(layoutData.width)}×${Math.round(layoutData.height)}, ${layoutData.areaReduction}% less area than a uniform grid`,
                 )
 
                 resolve({
                     success: true,
                     gridLayout,
+                    layoutPath,
+                    incremental: !!result.incremental,
+                    dirtyCells: result.dirtyCells || [],
+                    removedCells: result.removedCells || [],
                     bounds: {
-                        cols: layoutData.cols,
-                        rows: layoutData.rows,
-                        cellSize: layoutData.cellSize,
-                        totalWidth: layoutData.cols * layoutData.cellSize,
-                        totalHeight: layoutData.rows * layoutData.cellSize,
+                        totalWidth: layoutData.width,
+                        totalHeight: layoutData.height,
+                        area: layoutData.area,
+                        gridArea: layoutData.gridArea,
+                        areaReduction: layoutData.areaReduction,
                     },
                 })
             } catch (parseError) {
@@ -333,11 +404,11 @@ async function mergeVMFsIntoGrid(vmfFiles, outputPath, options = {}) {
 
 /**
  * Split a combined OBJ back into individual models based on grid layout
- * Uses proper grid-based cell assignment - each model occupies a square cell
+ * Uses cell-based assignment - each model occupies its own packed cell
  * @param {string} objPath - Path to the combined OBJ file
  * @param {Array} gridLayout - Grid layout info from mergeVMFsIntoGrid
  * @param {string} outputDir - Directory to save individual OBJs
- * @param {number} cellSize - Size of each grid cell (should match the cellSize from merge)
+ * @param {number} cellSize - Cell size for layouts without per-cell cellWidth/cellHeight
  * @param {Object} options - Additional options
  * @param {string} options.namePrefix - Prefix for output files (e.g., "itemname" -> "itemname_0.obj")
  * @returns {Promise<Array<{name: string, objPath: string, index: number}>>}
@@ -473,15 +544,12 @@ async function splitOBJByGrid(objPath, gridLayout, outputDir, cellSize = 256, op
 
     console.log(`  Found ${clusters.length} distinct mesh components.`)
 
-    // Each cell is a square of size cellSize, positioned at (col*cellSize, row*cellSize)
-    console.log(`  📊 Cell size: ${cellSize}`)
-
-    // Build grid cell boundaries based on the grid positions from merge script
+    // Each cell is the rectangle the merge script packed it into
     const cellBoundaries = gridLayout.map((cell) => ({
         minX: cell.cellX,
-        maxX: cell.cellX + cellSize,
+        maxX: cell.cellX + (cell.cellWidth ?? cellSize),
         minY: cell.cellY,
-        maxY: cell.cellY + cellSize,
+        maxY: cell.cellY + (cell.cellHeight ?? cellSize),
     }))
 
     // Assign each cluster to a cell based on where the majority of its vertices are
@@ -551,9 +619,9 @@ async function splitOBJByGrid(objPath, gridLayout, outputDir, cellSize = 256, op
         let best = -1,
             bestDist = Infinity
         for (let cellIdx = 0; cellIdx < gridLayout.length; cellIdx++) {
-            const cell = gridLayout[cellIdx]
-            const centerX = cell.cellX + cellSize / 2
-            const centerY = cell.cellY + cellSize / 2
+            const b = cellBoundaries[cellIdx]
+            const centerX = (b.minX + b.maxX) / 2
+            const centerY = (b.minY + b.maxY) / 2
             const dx = cx - centerX
             const dy = cy - centerY
             const d2 = dx * dx + dy * dy
@@ -773,10 +841,116 @@ async function splitOBJByGrid(objPath, gridLayout, outputDir, cellSize = 256, op
     return results
 }
 
+/**
+ * Whether the bundled converter build can split atlases (--split-layout)
+ * Builds from before the splitter only convert single files; split those
+ * atlases with splitOBJByGrid instead
+ * @returns {Promise<boolean>}
+ */
+async function canSplitAtlas() {
+    return toolSupports(
+        getObjTo3DSExePath(),
+        "--split-layout",
+        "--split-format",
+        "--name-prefix",
+    )
+}
+
+/**
+ * Split a combined OBJ back into individual models with the bundled converter
+ * Streams the atlas once, binning each face into the layout cell holding its
+ * centroid, so memory stays proportional to one cell instead of the whole atlas
+ * @param {string} objPath - Path to the combined OBJ file
+ * @param {string} layoutPath - The _layout.json written by mergeVMFsIntoGrid
+ * @param {string} outputDir - Directory to save individual models
+ * @param {Object} options - Additional options
+ * @param {string} options.namePrefix - Prefix for output files (e.g., "itemname" -> "itemname_0.obj")
+ * @param {string} options.format - "obj" (default) or "3ds" for collision meshes
+ * @param {Array<number>} options.dirtyCells - Layout indices changed since the
+ *   last split into outputDir (mergeVMFsIntoGrid's dirtyCells); the other cells
+ *   keep their files from that split. Omit to split every cell
+ * @returns {Promise<Array<{name: string, objPath: string, index: number, reused: boolean}>>}
+ */
+async function splitAtlasOBJ(objPath, layoutPath, outputDir, options = {}) {
+    const { namePrefix = null, format = "obj", dirtyCells = null } = options
+    const { spawn } = require("child_process")
+    const converterExe = getObjTo3DSExePath()
+
+    if (!fs.existsSync(converterExe)) {
+        throw new Error(`Atlas splitter not found at: ${converterExe}`)
+    }
+
+    const args = [
+        objPath,
+        outputDir,
+        "--split-layout",
+        layoutPath,
+        "--split-format",
+        format,
+    ]
+    if (namePrefix) args.push("--name-prefix", namePrefix)
+    if (dirtyCells && (await toolSupports(converterExe, "--split-cells"))) {
+        args.push("--split-cells", dirtyCells.join(","))
+    }
+
+    console.log(`✂️  Splitting combined OBJ with the bundled splitter...`)
+
+    return new Promise((resolve, reject) => {
+        const splitProcess = spawn(converterExe, args, { windowsHide: true })
+
+        let stdout = ""
+        let stderr = ""
+        splitProcess.stdout.on("data", (data) => {
+            stdout += data.toString()
+        })
+        splitProcess.stderr.on("data", (data) => {
+            stderr += data.toString()
+        })
+
+        splitProcess.on("close", (code) => {
+            const lines = stdout.trim().split(/\r?\n/)
+            if (code !== 0) {
+                const error = lines.reverse().find((line) => line.startsWith("ERROR"))
+                return reject(
+                    new Error(`Atlas split failed: ${error || stderr || "Unknown error"}`),
+                )
+            }
+
+            try {
+                const result = JSON.parse(lines[lines.length - 1])
+                const reused = result.cells.filter((cell) => cell.reused).length
+                console.log(
+                    `✅ Split into ${result.cells.length} individual models (${reused} unchanged) in ${Math.round(result.elapsedMs)}ms`,
+                )
+                resolve(
+                    result.cells.map((cell) => ({
+                        name: cell.name,
+                        originalName: cell.originalName,
+                        objPath: cell.path,
+                        mtlPath: cell.mtlPath,
+                        index: cell.index,
+                        reused: !!cell.reused,
+                    })),
+                )
+            } catch (parseError) {
+                reject(
+                    new Error(`Failed to parse split result: ${parseError.message}`),
+                )
+            }
+        })
+
+        splitProcess.on("error", (error) => {
+            reject(new Error(`Failed to run atlas splitter: ${error.message}`))
+        })
+    })
+}
+
 module.exports = {
     calculateGridDimensions,
     getVMFBoundsFromText,
     offsetVMFText,
     mergeVMFsIntoGrid,
     splitOBJByGrid,
+    canSplitAtlas,
+    splitAtlasOBJ,
 }
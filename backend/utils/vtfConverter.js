@@ -45,7 +45,7 @@ async function prepareImageForVTF(imagePath, tempPath) {
     try {
         // Get image metadata
         const metadata = await sharp(imagePath).metadata()
-        const { width, height } = metadata
+        const { width, height, format } = metadata
 
         // Find the larger dimension and round up to next power of 2, but cap it for smaller VTF files
         const maxDimension = Math.max(width, height)
@@ -54,6 +54,11 @@ async function prepareImageForVTF(imagePath, tempPath) {
         // Cap the maximum size to keep VTF files smaller (max 512x512 instead of going higher)
         targetSize = Math.min(targetSize, 512)
 
+        // Already prepared, e.g. by cartoon.exe --pow2
+        if (format === "png" && width === targetSize && height === targetSize) {
+            return imagePath
+        }
+
         // Resize to square power-of-2 dimensions by stretching to fit
         await sharp(imagePath)
             .resize(targetSize, targetSize, {